@@ -1,6 +1,12 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from xero_python.api_client.oauth2 import OAuth2Token
 from xero_integration.xero.validators import validate_possible_phonenumber
 from phonenumber_field.modelfields import PhoneNumberField
+from phonenumber_field.phonenumber import PhoneNumber
 
 
 class CustomOAuth2Token(OAuth2Token):
@@ -39,3 +45,61 @@ class PossiblePhoneNumberField(PhoneNumberField):
     """Less strict field for phone numbers written to database."""
 
     default_validators = [validate_possible_phonenumber]
+
+
+class ValidatedPhoneNumber(PhoneNumber):
+    """
+    Phone number that has already passed the possible/valid checks when it
+    was parsed, so saving or printing it does not validate it again.
+    """
+
+    def is_valid(self):
+        return True
+
+
+def estimated_count(queryset) -> int | None:
+    """
+    Ask PostgreSQL's planner how many rows ``queryset`` returns, without
+    running it. Unfiltered querysets use the table statistics, filtered ones
+    the row estimate of their plan.
+
+    Returns:
+        int | None: The estimate, or None on other databases or when the
+        table has never been analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that skips ``COUNT(*)`` on large tables. When PostgreSQL
+    estimates at least ``exact_count_limit`` rows the estimate is used as the
+    count, so the last page numbers are approximate. Smaller results, and
+    other databases, are counted exactly.
+    """
+
+    exact_count_limit = 10_000
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, "query"):
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= self.exact_count_limit:
+                return estimate
+        return super().count
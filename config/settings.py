@@ -89,11 +89,29 @@ DATABASES = {
     }
 }
 
+# Use the Postgres service from docker-compose when its database is configured.
+if os.getenv("POSTGRES_DB"):
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.getenv("POSTGRES_DB"),
+        "USER": os.getenv("POSTGRES_USER", "postgres"),
+        "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+        "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+        "PORT": os.getenv("POSTGRES_PORT", "5432"),
+    }
+
+
+# The Xero tokens, their refresh lock and the contact list versions live in
+# this cache, so it must be shared by every web and worker process.
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "",
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_URL,
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        },
     }
 }
 
@@ -201,6 +219,21 @@ CELERY_TASK_TIME_LIMIT = 5 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 60
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-schedule
+CELERY_BEAT_SCHEDULE = {
+    # Seconds between refreshes of the connected organisations from the
+    # identity API; XERO_TENANTS_CACHE_TTL is still read as a fallback.
+    "sync-xero-tenants": {
+        "task": "xero_integration.xero.tasks.schedule_tenant_syncs_task",
+        "schedule": int(
+            os.getenv("XERO_TENANTS_REFRESH_INTERVAL", os.getenv("XERO_TENANTS_CACHE_TTL", str(15 * 60)))
+        ),
+    },
+    "refresh-xero-token": {
+        "task": "xero_integration.xero.tasks.refresh_xero_token_task",
+        "schedule": 5 * 60,
+    },
+}
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#worker-send-task-events
 CELERY_WORKER_SEND_TASK_EVENTS = True
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#std-setting-task_send_sent_event
@@ -214,10 +247,81 @@ XERO_B64_SECRET_KEY = base64.b64encode(
     bytes(f"{CLIENT_ID}:{CLIENT_SECRET}", "utf-8")
 )
 WEBHOOK_KEY = os.getenv("XERO_WEBHOOK_KEY")
+# Seconds webhook events are collected for before their contacts are fetched.
+XERO_WEBHOOK_DEBOUNCE = int(os.getenv("XERO_WEBHOOK_DEBOUNCE", "10"))
+# ContactIDs requested per get_contacts call when processing webhook events.
+XERO_WEBHOOK_FETCH_BATCH_SIZE = 50
 STATE = secrets.token_urlsafe(32)
 REDIRECT_URI = os.getenv("XERO_REDIRECT_URI")
 
+# Global switch for pushing local contact edits to Xero. To pause it for a
+# block of code, use xero_integration.xero.utils.suppress_xero_sync instead.
 SYNC_XERO_SIGNALS = True
+# Seconds local edits are collected for before they are pushed to Xero.
+XERO_OUTBOUND_DEBOUNCE = int(os.getenv("XERO_OUTBOUND_DEBOUNCE", "30"))
+# Dirty contacts loaded per push when flushing local edits.
+XERO_OUTBOUND_FLUSH_SIZE = 500
+# Refresh the access token this many seconds before it expires. Keep it
+# above the refresh-xero-token beat interval.
+XERO_TOKEN_REFRESH_MARGIN = int(os.getenv("XERO_TOKEN_REFRESH_MARGIN", str(10 * 60)))
+# Longest a process waits for, or holds, the token refresh lock.
+XERO_TOKEN_REFRESH_LOCK_TIMEOUT = 30
+# Xero's per-tenant API limits, enforced across all processes through Redis.
+XERO_RATE_LIMIT_PER_MINUTE = 60
+XERO_RATE_LIMIT_PER_DAY = 5000
+XERO_RATE_LIMIT_CONCURRENCY = 5
+# Seconds an in-flight call holds a concurrency slot if its process dies.
+XERO_RATE_LIMIT_LEASE_TTL = 60
+# Longest a call queues for budget before XeroRateLimitExceeded is raised,
+# which tasks retry later. Must stay well under CELERY_TASK_SOFT_TIME_LIMIT,
+# or the wait ends the task with SoftTimeLimitExceeded instead.
+XERO_RATE_LIMIT_MAX_WAIT = int(os.getenv("XERO_RATE_LIMIT_MAX_WAIT", "30"))
+# Times a call answered with 429 is retried after its Retry-After period.
+XERO_RATE_LIMIT_RETRIES = 3
+# Contacts sent per update_or_create_contacts call when pushing to Xero.
+XERO_PUSH_BATCH_SIZE = 50
+# Log every Xero request and response through the SDK's debug logging.
+# Slow and verbose, so only meant for troubleshooting.
+XERO_API_DEBUG = os.getenv("XERO_API_DEBUG", "0") == "1"
+# Threads each process runs independent Xero calls on, such as the batches
+# of a push or of a webhook fetch. Calls for one tenant still share its
+# XERO_RATE_LIMIT_CONCURRENCY slots.
+XERO_API_POOL_THREADS = int(os.getenv("XERO_API_POOL_THREADS", "4"))
+# Keep-alive connections each process keeps open to Xero. Keep it at least
+# XERO_API_POOL_THREADS, or concurrent calls discard their connections.
+XERO_API_CONNECTION_POOL_MAXSIZE = int(os.getenv("XERO_API_CONNECTION_POOL_MAXSIZE", "8"))
+# Expose Prometheus metrics at /metrics and from each Celery worker. The
+# instrumentation is a no-op while this is off.
+XERO_METRICS_ENABLED = os.getenv("XERO_METRICS_ENABLED", "0") == "1"
+# Port a Celery worker serves its metrics on.
+XERO_METRICS_WORKER_PORT = int(os.getenv("XERO_METRICS_WORKER_PORT", "9808"))
+# Each connected organisation has its own periodic sync task. It starts at
+# XERO_TENANT_SYNC_INTERVAL seconds and adapts to how often the
+# organisation's contacts change, aiming for about XERO_SYNC_TARGET_CHANGES
+# changed contacts per sync, within XERO_SYNC_INTERVAL_MIN and
+# XERO_SYNC_INTERVAL_MAX seconds.
+XERO_TENANT_SYNC_INTERVAL = int(os.getenv("XERO_TENANT_SYNC_INTERVAL", str(15 * 60)))
+XERO_SYNC_INTERVAL_MIN = int(os.getenv("XERO_SYNC_INTERVAL_MIN", str(5 * 60)))
+XERO_SYNC_INTERVAL_MAX = int(os.getenv("XERO_SYNC_INTERVAL_MAX", str(6 * 60 * 60)))
+XERO_SYNC_TARGET_CHANGES = int(os.getenv("XERO_SYNC_TARGET_CHANGES", "100"))
+# Seconds after which a sync run that never finished stops blocking the
+# tenant's scheduled syncs.
+XERO_SYNC_RUN_TIMEOUT = int(os.getenv("XERO_SYNC_RUN_TIMEOUT", str(6 * 60 * 60)))
+# Key downstream services send in an X-Api-Key header to use the contacts
+# read API at /xero/api/contacts/. Without one, only staff sessions can.
+XERO_READ_API_KEY = os.getenv("XERO_READ_API_KEY")
+# Contacts per read API page, by default and at most.
+XERO_READ_API_PAGE_SIZE = 100
+XERO_READ_API_MAX_PAGE_SIZE = 500
+# Contacts per ingest chunk. Each chunk is written by its own task, in one
+# transaction, with one INSERT ... ON CONFLICT statement.
+XERO_SYNC_CHUNK_SIZE = int(os.getenv("XERO_SYNC_CHUNK_SIZE", "250"))
+# Contacts requested per get_contacts call (Xero allows up to 1000).
+XERO_CONTACTS_PAGE_SIZE = int(os.getenv("XERO_CONTACTS_PAGE_SIZE", "1000"))
+# Seconds a fetched page is kept in Redis for the ingest tasks, which are
+# sent a reference to it rather than the contacts. Must cover the longest
+# time a page can wait in the queue, including retries.
+XERO_PAYLOAD_TTL = int(os.getenv("XERO_PAYLOAD_TTL", str(24 * 60 * 60)))
 
 if DEBUG:
     # allow oauth2 loop to run over http (used for local testing only)
@@ -1,29 +1,112 @@
 from django.contrib import admin
-from .models import Contact, ContactAddress, ContactPhoneNumber, ContactPerson
+from django.db.models import F
+from commons.utils import EstimatedCountPaginator
+from .tasks import push_xero_contacts_task, retry_failed_chunks_task, retryable_sync_runs
+from .models import Contact, ContactAddress, ContactPhoneNumber, ContactPerson, SyncRun, XeroTenant
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows: no COUNT(*) of the
+    whole table, estimated counts for large results, and prefix or exact
+    search_fields that the search indexes can serve.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(Contact)
-class ContactAdmin(admin.ModelAdmin):
-    search_fields = ["name", "email"]
-    list_display = ["name", "email", "is_supplier", "is_customer"]
-    list_filter = ["is_supplier", "is_customer"]
+class ContactAdmin(LargeTableAdmin):
+    search_fields = ["^name", "=email"]
+    list_display = ["name", "email", "tenant", "is_supplier", "is_customer"]
+    list_filter = ["tenant", "is_supplier", "is_customer"]
+    list_select_related = ["tenant"]
+    actions = ["push_to_xero"]
+
+    @admin.action(description="Push selected contacts to Xero")
+    def push_to_xero(self, request, queryset):
+        contact_ids = [str(pk) for pk in queryset.values_list("pk", flat=True)]
+        push_xero_contacts_task.apply_async(args=[contact_ids])
+        self.message_user(request, f"Queued {len(contact_ids)} contacts for pushing to Xero.")
 
 @admin.register(ContactAddress)
-class ContactAddressAdmin(admin.ModelAdmin):
+class ContactAddressAdmin(LargeTableAdmin):
     autocomplete_fields = ["company_name"]
     list_display = ["company_name", "address_type", "city", "country"]
     list_filter = ["address_type", "country"]
-    search_fields = ["company_name__name", "city", "address_line1"]
+    list_select_related = ["company_name"]
+    search_fields = ["^company_name__name", "^city"]
 
 @admin.register(ContactPhoneNumber)
-class ContactPhoneNumberAdmin(admin.ModelAdmin):
+class ContactPhoneNumberAdmin(LargeTableAdmin):
     autocomplete_fields = ["company_name"]
     list_display = ["company_name", "phone_label", "phone_number"]
     list_filter = ["phone_label"]
-    search_fields = ["company_name__name", "phone_number"]
+    list_select_related = ["company_name"]
+    search_fields = ["^company_name__name", "^phone_number"]
 
 @admin.register(ContactPerson)
-class ContactPersonAdmin(admin.ModelAdmin):
+class ContactPersonAdmin(LargeTableAdmin):
     autocomplete_fields = ["company_name"]
     list_display = ["full_name", "company_name", "job_title", "email", "primary_contact"]
     list_filter = ["primary_contact"]
-    search_fields = ["first_name", "last_name", "company_name__name", "email"]
+    list_select_related = ["company_name"]
+    search_fields = ["^first_name", "^last_name", "=email", "^company_name__name"]
+
+@admin.register(XeroTenant)
+class XeroTenantAdmin(admin.ModelAdmin):
+    list_display = ["name", "tenant_id", "is_active", "contacts_modified_since", "last_synced_at", "sync_interval"]
+    list_filter = ["is_active"]
+    search_fields = ["name", "tenant_id"]
+    readonly_fields = [
+        "tenant_id",
+        "tenant_type",
+        "connection_id",
+        "token_key",
+        "sync_interval",
+        "created_at",
+        "updated_at",
+    ]
+
+
+@admin.register(SyncRun)
+class SyncRunAdmin(admin.ModelAdmin):
+    list_display = [
+        "created_at",
+        "status",
+        "trigger",
+        "full_sync",
+        "duration",
+        "contacts_fetched",
+        "contacts_created",
+        "contacts_updated",
+        "contacts_skipped",
+        "contacts_failed",
+        "fetch_seconds",
+        "transform_seconds",
+        "write_seconds",
+        "api_calls",
+        "db_queries",
+        "peak_rss_kb",
+    ]
+    list_filter = ["status", "trigger", "full_sync"]
+    search_fields = ["tenant_id"]
+    date_hierarchy = "created_at"
+    actions = ["retry_failed_chunks"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Retry the failed chunks of selected runs")
+    def retry_failed_chunks(self, request, queryset):
+        run_ids = [str(pk) for pk in retryable_sync_runs(queryset).values_list("pk", flat=True)]
+        for run_id in run_ids:
+            retry_failed_chunks_task.apply_async(args=[run_id])
+        self.message_user(request, f"Queued {len(run_ids)} runs for retrying their failed chunks.")
+
+    @admin.display(description="Duration", ordering=F("finished_at") - F("started_at"))
+    def duration(self, obj):
+        if obj.started_at and obj.finished_at:
+            return obj.finished_at - obj.started_at
+        return None
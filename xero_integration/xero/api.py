@@ -0,0 +1,186 @@
+import base64
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.db.models import Prefetch, QuerySet
+
+from .models import Contact, ContactAddress, ContactPerson, ContactPhoneNumber
+from .versions import contacts_version, tenant_pk_for
+
+
+class InvalidQuery(ValueError):
+    """Raised for a read API request with malformed parameters."""
+
+
+# Contact columns the read API can return, keyed by their field name in the
+# response.
+CONTACT_FIELDS = {
+    "id": "id",
+    "xero_contact_id": "xero_contact_id",
+    "name": "name",
+    "email": "email",
+    "website": "website",
+    "description": "description",
+    "is_supplier": "is_supplier",
+    "is_customer": "is_customer",
+}
+# Related rows the read API can return, with the related name and model
+# fields they are loaded from.
+RELATED_FIELDS = {
+    "phones": ("contact_phonenumbers", ContactPhoneNumber, ["phone_label", "phone_number"]),
+    "addresses": (
+        "contact_addresses",
+        ContactAddress,
+        [
+            "address_type",
+            "address_line1",
+            "address_line2",
+            "address_line3",
+            "address_line4",
+            "city",
+            "region",
+            "postal_code",
+            "country",
+        ],
+    ),
+    "persons": (
+        "primary_contact_people",
+        ContactPerson,
+        ["first_name", "last_name", "job_title", "email", "phone", "primary_contact"],
+    ),
+}
+ALL_FIELDS = [*CONTACT_FIELDS, "tenant", *RELATED_FIELDS]
+
+
+def parse_fields(value: str | None) -> list[str]:
+    """
+    The response fields requested as ``?fields=a,b``, all of them if none
+    are. ``id`` is always included.
+
+    Raises:
+        InvalidQuery: If an unknown field is requested.
+    """
+    if not value:
+        return ALL_FIELDS
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = sorted(set(fields) - set(ALL_FIELDS))
+    if unknown:
+        raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}")
+    return [field for field in ALL_FIELDS if field == "id" or field in fields]
+
+
+def parse_limit(value: str | None) -> int:
+    if not value:
+        return settings.XERO_READ_API_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidQuery("limit must be an integer")
+    if not 1 <= limit <= settings.XERO_READ_API_MAX_PAGE_SIZE:
+        raise InvalidQuery(f"limit must be between 1 and {settings.XERO_READ_API_MAX_PAGE_SIZE}")
+    return limit
+
+
+def encode_cursor(contact_id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(contact_id.bytes).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> uuid.UUID:
+    """
+    Raises:
+        InvalidQuery: If the cursor was not made by ``encode_cursor``.
+    """
+    try:
+        return uuid.UUID(bytes=base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise InvalidQuery("Invalid cursor")
+
+
+def contacts_etag(request, tenant_id: str | None = None, contact_id=None) -> str | None:
+    """
+    Weak ETag of a read API response: the version of the contacts it
+    covers, and a digest of what was asked for. Computed from the cache
+    alone, so an unchanged response costs no query.
+
+    The version is read before the contacts are, so a change made while a
+    response is built can only make its ETag stale, never too new.
+    """
+    tenant_id = tenant_id or request.GET.get("tenant")
+    if tenant_id:
+        tenant_pk = tenant_pk_for(tenant_id)
+        if tenant_pk is None:
+            return None
+        version = contacts_version(tenant_pk)
+    else:
+        version = contacts_version(all_tenants=True)
+    query = sorted(request.GET.lists())
+    digest = hashlib.blake2b(repr((str(contact_id), query)).encode(), digest_size=8).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+
+def contacts_queryset(fields: list[str]) -> QuerySet:
+    """
+    Contacts with only the requested columns loaded and the requested
+    related rows prefetched, one query per relation.
+    """
+    columns = [CONTACT_FIELDS[field] for field in fields if field in CONTACT_FIELDS]
+    queryset = Contact.objects.only(*columns)
+    if "tenant" in fields:
+        queryset = queryset.select_related("tenant").only(*columns, "tenant__tenant_id")
+    for field in fields:
+        if field in RELATED_FIELDS:
+            related_name, model, model_fields = RELATED_FIELDS[field]
+            queryset = queryset.prefetch_related(
+                Prefetch(related_name, queryset=model.objects.only("company_name", *model_fields))
+            )
+    return queryset
+
+
+def serialize_phone(phone: ContactPhoneNumber) -> dict:
+    return {"label": phone.phone_label, "number": str(phone.phone_number)}
+
+
+def serialize_address(address: ContactAddress) -> dict:
+    return {
+        "type": address.address_type,
+        "address_line1": address.address_line1,
+        "address_line2": address.address_line2,
+        "address_line3": address.address_line3,
+        "address_line4": address.address_line4,
+        "city": address.city,
+        "region": address.region,
+        "postal_code": address.postal_code,
+        "country": address.country.code or None,
+    }
+
+
+def serialize_person(person: ContactPerson) -> dict:
+    return {
+        "first_name": person.first_name,
+        "last_name": person.last_name,
+        "job_title": person.job_title,
+        "email": person.email,
+        "phone": str(person.phone) if person.phone else None,
+        "primary": person.primary_contact,
+    }
+
+
+RELATED_SERIALIZERS = {
+    "phones": serialize_phone,
+    "addresses": serialize_address,
+    "persons": serialize_person,
+}
+
+
+def serialize_contact(contact: Contact, fields: list[str]) -> dict:
+    data = {}
+    for field in fields:
+        if field in CONTACT_FIELDS:
+            data[field] = getattr(contact, CONTACT_FIELDS[field])
+        elif field == "tenant":
+            data[field] = contact.tenant.tenant_id if contact.tenant else None
+        else:
+            related_name = RELATED_FIELDS[field][0]
+            data[field] = [RELATED_SERIALIZERS[field](row) for row in getattr(contact, related_name).all()]
+    return data
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class XeroConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "xero_integration.xero"
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
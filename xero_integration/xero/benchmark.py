@@ -0,0 +1,154 @@
+import copy
+import random
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from .ledger import count_queries, peak_rss_kb
+
+
+# Value pools for synthetic contacts. Countries include the spellings and
+# typos seen in real Xero data, so the alias and unknown-country paths run.
+COMPANY_WORDS = ["Acme", "Global", "Sunrise", "Coastal", "Summit", "Golden", "Prime", "Harbour", "Unity", "Apex"]
+COMPANY_SUFFIXES = ["Ltd", "Limited", "Enterprises", "Trading", "Holdings", "& Sons", "Services"]
+FIRST_NAMES = ["Ama", "Kofi", "Yaw", "Akosua", "John", "Mary", "Kwame", "Efua", "David", "Sarah"]
+LAST_NAMES = ["Mensah", "Owusu", "Boateng", "Smith", "Asante", "Osei", "Brown", "Addo"]
+CITIES = ["Accra", "Kumasi", "Tema", "London", "Lagos", "Takoradi"]
+COUNTRIES = ["Ghana", "Ghana", "Ghana", "United Kingdom", "UK", "Nigeria", "USA", "Ghana ", "Gahna", ""]
+PHONE_TYPES = ["DEFAULT", "MOBILE", "DDI", "FAX"]
+PHONE_PREFIXES = [("233", "24"), ("233", "30"), ("", "024"), ("44", "20"), ("234", "803")]
+
+
+def generate_contact(rng: random.Random, index: int, max_phones: int = 4, max_addresses: int = 2, max_persons: int = 4) -> dict:
+    """
+    Build one contact shaped like ``serialize()`` output of a Xero contact.
+
+    Args:
+        rng (random.Random): Source of randomness, for reproducible payloads.
+        index (int): Position of the contact, used to keep names unique.
+        max_phones (int): Most phones a contact can have.
+        max_addresses (int): Most addresses a contact can have.
+        max_persons (int): Most additional contact persons a contact can have.
+
+    Returns:
+        dict: The contact payload.
+    """
+    name = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)} {index}"
+    slug = name.lower().replace(" ", "").replace("&", "")
+    contact = {
+        "ContactID": str(uuid.UUID(int=rng.getrandbits(128))),
+        "Name": name,
+        "EmailAddress": f"info@{slug}.com" if rng.random() < 0.8 else "",
+        "Website": f"https://{slug}.com" if rng.random() < 0.3 else "",
+        "IsSupplier": rng.random() < 0.4,
+        "IsCustomer": rng.random() < 0.7,
+        "UpdatedDateUTC": (datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index)).isoformat(),
+        "Phones": [],
+        "Addresses": [],
+        "ContactPersons": [],
+    }
+    if rng.random() < 0.7:
+        contact["FirstName"] = rng.choice(FIRST_NAMES)
+        contact["LastName"] = rng.choice(LAST_NAMES)
+
+    for phone_type in rng.sample(PHONE_TYPES, rng.randint(0, min(max_phones, len(PHONE_TYPES)))):
+        country_code, area_code = rng.choice(PHONE_PREFIXES)
+        contact["Phones"].append(
+            {
+                "PhoneType": phone_type,
+                "PhoneCountryCode": country_code,
+                "PhoneAreaCode": area_code,
+                "PhoneNumber": str(rng.randint(1000000, 9999999)),
+            }
+        )
+    for address_type in rng.sample(["POBOX", "STREET"], rng.randint(0, min(max_addresses, 2))):
+        contact["Addresses"].append(
+            {
+                "AddressType": address_type,
+                "AddressLine1": f"{rng.randint(1, 999)} {rng.choice(LAST_NAMES)} Street",
+                "City": rng.choice(CITIES),
+                "PostalCode": f"GA-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+                "Country": rng.choice(COUNTRIES),
+            }
+        )
+    for _ in range(rng.randint(0, max_persons)):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        contact["ContactPersons"].append(
+            {
+                "FirstName": first_name,
+                "LastName": last_name,
+                "EmailAddress": f"{first_name}.{last_name}@{slug}.com".lower(),
+                "IncludeInEmails": rng.random() < 0.5,
+            }
+        )
+    return contact
+
+
+def generate_contacts(count: int, seed: int = 0, **kwargs) -> list[dict]:
+    """Build ``count`` reproducible contacts. ``kwargs`` go to ``generate_contact``."""
+    rng = random.Random(seed)
+    return [generate_contact(rng, index, **kwargs) for index in range(count)]
+
+
+def mutate_contacts(contacts: list[dict], change_ratio: float, seed: int = 0) -> list[dict]:
+    """
+    Return a copy of ``contacts`` in which ``change_ratio`` of them were edited
+    the way users edit contacts in Xero: a new email, a changed phone number,
+    a moved address or a person added or removed.
+    """
+    rng = random.Random(seed)
+    contacts = copy.deepcopy(contacts)
+    for contact in rng.sample(contacts, round(len(contacts) * change_ratio)):
+        edit = rng.choice(["email", "phone", "address", "person"])
+        if edit == "phone" and contact["Phones"]:
+            rng.choice(contact["Phones"])["PhoneNumber"] = str(rng.randint(1000000, 9999999))
+        elif edit == "address" and contact["Addresses"]:
+            rng.choice(contact["Addresses"])["AddressLine1"] = f"{rng.randint(1, 999)} New Road"
+        elif edit == "person" and contact["ContactPersons"]:
+            contact["ContactPersons"].pop()
+        elif edit == "person":
+            contact["ContactPersons"].append({"FirstName": rng.choice(FIRST_NAMES), "LastName": "Newhire"})
+        else:
+            contact["EmailAddress"] = f"accounts{rng.randint(1, 99)}@example.com"
+        contact["UpdatedDateUTC"] = datetime.now(timezone.utc).isoformat()
+    return contacts
+
+
+@contextmanager
+def measure(contacts: int, trace_memory: bool = False):
+    """
+    Measure the block as one benchmark result. Yields the result dict, which
+    is filled in when the block exits.
+
+    ``process_peak_rss_kb`` is the peak RSS of the whole process so far,
+    which later blocks only raise, and ``rss_growth_kb`` how much this
+    block raised it. Use ``trace_memory`` for the block's own peak.
+
+    Args:
+        contacts (int): Number of contacts the block processes.
+        trace_memory (bool): Also report the peak Python allocation of the
+            block. Accurate per scenario, but slows the block down.
+    """
+    result = {"contacts": contacts}
+    if trace_memory:
+        tracemalloc.start()
+    peak_rss_before = peak_rss_kb()
+    start = time.perf_counter()
+    with count_queries() as queries:
+        yield result
+    seconds = time.perf_counter() - start
+    if trace_memory:
+        result["peak_alloc_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    result.update(
+        {
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(contacts / seconds, 1) if seconds else None,
+            "queries": queries["count"],
+            "queries_per_contact": round(queries["count"] / contacts, 3) if contacts else None,
+            "process_peak_rss_kb": peak_rss_kb(),
+            "rss_growth_kb": peak_rss_kb() - peak_rss_before,
+        }
+    )
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def check_rate_limit_wait(app_configs, **kwargs):
+    """
+    A task waiting for rate-limit budget must give up, and be retried,
+    before Celery's soft time limit kills it.
+    """
+    soft_limit = getattr(settings, "CELERY_TASK_SOFT_TIME_LIMIT", None)
+    if soft_limit and settings.XERO_RATE_LIMIT_MAX_WAIT >= soft_limit:
+        return [
+            Error(
+                f"XERO_RATE_LIMIT_MAX_WAIT ({settings.XERO_RATE_LIMIT_MAX_WAIT}s) must be less than "
+                f"CELERY_TASK_SOFT_TIME_LIMIT ({soft_limit}s).",
+                hint="Lower XERO_RATE_LIMIT_MAX_WAIT, or raise the soft time limit.",
+                id="xero.E001",
+            )
+        ]
+    return []
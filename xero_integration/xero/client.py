@@ -0,0 +1,329 @@
+import atexit
+import base64
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+from django.conf import settings
+from django.core.cache import cache
+from xero_python.accounting import AccountingApi
+from xero_python.api_client import ApiClient
+from xero_python.api_client.configuration import Configuration
+from xero_python.exceptions import ApiException
+from xero_python.identity import IdentityApi
+
+from commons.utils import CustomOAuth2Token
+from .ledger import record_api_call
+from .metrics import METRICS_ENABLED, count_token_refresh, observe_api_call
+from .models import XeroTenant
+from .ratelimit import rate_limiter
+
+
+logger = logging.getLogger(__name__)
+
+# Tokens from before tenants were tracked live under TOKEN_CACHE_KEY. New
+# ones are stored per Xero user, and LATEST_TOKEN_KEY names the most
+# recently authorized one.
+TOKEN_CACHE_KEY = "token"
+LATEST_TOKEN_KEY = "xero:token:latest"
+TOKEN_REFRESH_LOCK_KEY = "xero:token:refresh-lock"
+
+# Cache key of the token API calls in the current context are made with.
+_token_cache_key: ContextVar[str | None] = ContextVar("xero_token_cache_key", default=None)
+
+# The SDK refreshes through configuration.oauth2_token, one object shared
+# by every thread, so refreshes in this process take turns.
+_refresh_lock = threading.Lock()
+
+
+class XeroApiClient(ApiClient):
+    """
+    ApiClient that refreshes an expiring access token through
+    ``refresh_xero_token`` before authenticating a request, so an inline
+    refresh goes through the same single-flight lock as the background one
+    instead of racing other processes from inside the SDK.
+    """
+
+    def update_params_for_auth(self, headers, querys, auth_settings):
+        """
+        Sign the request with the current context's token.
+
+        The SDK would load the token into the shared
+        ``configuration.oauth2_token`` and read it back, so concurrent calls
+        made with different users' tokens could be signed with each
+        other's. The header is built from the token itself instead.
+        """
+        if not auth_settings:
+            return
+        buffer = self.configuration.oauth2_token.expiration_buffer
+        token = obtain_xero_oauth2_token()
+        if token_expires_within(token, buffer):
+            token = refresh_xero_token(margin=buffer)
+        if token and token.get("access_token"):
+            headers["Authorization"] = f"{token.get('token_type') or 'Bearer'} {token['access_token']}"
+
+    def request(self, method, url, query_params=None, headers=None, *args, **kwargs):
+        """
+        Send tenant-scoped calls through the shared rate limiter and retry
+        them after the ``Retry-After`` period when Xero answers 429.
+        """
+        record_api_call()
+        tenant_id = (headers or {}).get("xero-tenant-id")
+        if not tenant_id:
+            return self.timed_request(method, url, query_params, headers, *args, **kwargs)
+
+        for attempt in range(settings.XERO_RATE_LIMIT_RETRIES + 1):
+            with rate_limiter.slot(tenant_id):
+                try:
+                    response = self.timed_request(method, url, query_params, headers, *args, **kwargs)
+                except ApiException as e:
+                    if e.status != 429 or e.http_resp is None:
+                        raise
+                    rate_limiter.record_response(tenant_id, e.http_resp.urllib3_response.headers, status=429)
+                    if attempt == settings.XERO_RATE_LIMIT_RETRIES:
+                        raise
+                    continue
+            rate_limiter.record_response(tenant_id, response.urllib3_response.headers)
+            return response
+
+    def close(self) -> None:
+        """Shut the thread pool down, if it was started."""
+        if self._pool:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def timed_request(self, method, url, *args, **kwargs):
+        if not METRICS_ENABLED:
+            return super().request(method, url, *args, **kwargs)
+        start, status = time.perf_counter(), "error"
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            status = response.status
+            return response
+        except ApiException as e:
+            status = e.status
+            raise
+        finally:
+            observe_api_call(method, url, status, time.perf_counter() - start)
+
+
+
+def token_cache_key_for(token: dict) -> str:
+    """
+    The cache key a newly authorized token is stored under: one per Xero
+    user, read from the ``xero_userid`` claim of the access token.
+    """
+    try:
+        payload = token["access_token"].split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return f"xero:token:{claims['xero_userid']}"
+    except (KeyError, IndexError, ValueError):
+        return TOKEN_CACHE_KEY
+
+
+def active_token_key() -> str:
+    return _token_cache_key.get() or cache.get(LATEST_TOKEN_KEY) or TOKEN_CACHE_KEY
+
+
+@contextmanager
+def use_token_key(key: str | None):
+    """Make API calls inside the block with the token stored under ``key``."""
+    token = _token_cache_key.set(key or None)
+    try:
+        yield
+    finally:
+        _token_cache_key.reset(token)
+
+
+def use_xero_tenant(tenant):
+    """Make API calls inside the block with the token of ``tenant``."""
+    return use_token_key(tenant.token_key)
+
+
+def obtain_xero_oauth2_token():
+    token = cache.get(active_token_key())
+    if token:
+        return token["token"]
+    return None
+
+
+def store_xero_oauth2_token(token):
+    token = dict(token)
+    # The SDK can only refresh tokens whose scope is a list, but the
+    # authorization response carries it as a space separated string.
+    if isinstance(token.get("scope"), str):
+        token["scope"] = token["scope"].split()
+    store_token = {
+        "token": token,
+        "modified": True
+    }
+    # The refresh token outlives the access token, so never expire the entry.
+    cache.set(active_token_key(), store_token, timeout=None)
+    logger.info("Stored Xero token expiring at %s", token.get("expires_at"))
+
+
+def build_api_client() -> XeroApiClient:
+    """
+    Build an API client configured from the ``XERO_API_*`` settings.
+
+    Its urllib3 pool keeps up to ``XERO_API_CONNECTION_POOL_MAXSIZE``
+    keep-alive connections to Xero, and ``map_concurrently`` runs calls on
+    its ``XERO_API_POOL_THREADS`` threads. The SDK's debug logging of every
+    request and response is only enabled with ``XERO_API_DEBUG``.
+    """
+    configuration = Configuration(
+        debug=settings.XERO_API_DEBUG,
+        oauth2_token=CustomOAuth2Token(
+            client_id=settings.CLIENT_ID,
+            client_secret=settings.CLIENT_SECRET,
+        ),
+    )
+    # Read by the REST client when it creates its connection pool.
+    configuration.connection_pool_maxsize = settings.XERO_API_CONNECTION_POOL_MAXSIZE
+    client = XeroApiClient(
+        configuration,
+        pool_threads=settings.XERO_API_POOL_THREADS,
+        oauth2_token_getter=obtain_xero_oauth2_token,
+        oauth2_token_saver=store_xero_oauth2_token,
+    )
+    # The SDK only closes the pool when the client is garbage collected,
+    # which at interpreter exit happens after the pool's modules are gone.
+    atexit.register(client.close)
+    return client
+
+
+api_client = build_api_client()
+
+
+def map_concurrently(func, items: list, client: XeroApiClient | None = None) -> list:
+    """
+    Call ``func`` on every item on the API client's thread pool, the one the
+    SDK uses for ``async_req`` calls, and return the results in order.
+
+    Each call runs in a copy of the caller's context, so it uses the
+    caller's token and counts towards its API call ledger, and calls for one
+    tenant still share its rate limit. Keep database work out of ``func``:
+    the pool threads do not share the caller's connection or transaction.
+
+    Raises:
+        Exception: The first exception raised by a call, once all of them
+            have finished.
+    """
+    client = client or api_client
+    if len(items) < 2 or client.pool_threads < 2:
+        return [func(item) for item in items]
+    results = [client.pool.apply_async(copy_context().run, (func, item)) for item in items]
+    for result in results:
+        result.wait()
+    return [result.get() for result in results]
+
+
+def store_authorized_token(token: dict) -> list:
+    """
+    Store the token from a completed authorization under its user's key,
+    make it the latest one, and record the organisations it connects.
+
+    Returns:
+        list[XeroTenant]: The connected tenants.
+    """
+    token_key = token_cache_key_for(token)
+    with use_token_key(token_key):
+        store_xero_oauth2_token(token)
+        cache.set(LATEST_TOKEN_KEY, token_key, timeout=None)
+        return sync_xero_tenants()
+
+
+def token_expires_within(token: dict | None, seconds: float) -> bool:
+    """Return whether ``token`` expires in the next ``seconds`` seconds."""
+    if not token or token.get("expires_at") is None:
+        return False
+    return float(token["expires_at"]) <= time.time() + seconds
+
+
+def refresh_xero_token(margin: float = 0, force: bool = False):
+    """
+    Refresh the current context's token if it expires within ``margin``
+    seconds.
+
+    Runs under a lock shared by every web and worker process, and re-reads
+    the token once the lock is held, so concurrent callers refresh it once
+    and the rest pick up the result rather than spending the rotated
+    refresh token again.
+
+    Returns:
+        dict | None: The current token, or None if there is no stored token.
+    """
+    with cache.lock(
+        f"{TOKEN_REFRESH_LOCK_KEY}:{active_token_key()}",
+        timeout=settings.XERO_TOKEN_REFRESH_LOCK_TIMEOUT,
+        blocking_timeout=settings.XERO_TOKEN_REFRESH_LOCK_TIMEOUT,
+    ):
+        token = obtain_xero_oauth2_token()
+        if not token:
+            return None
+        if not force and not token_expires_within(token, margin):
+            return token
+        logger.info("Refreshing Xero token expiring at %s", token.get("expires_at"))
+        try:
+            with _refresh_lock:
+                token = api_client.refresh_oauth2_token()
+        except Exception:
+            count_token_refresh("failure")
+            raise
+        count_token_refresh("success")
+        return token
+
+
+def sync_xero_tenants() -> list:
+    """
+    Record the organisations the current token is connected to.
+
+    Connected organisations are created or reactivated and linked to the
+    token. Organisations that were linked to it but are no longer connected
+    are deactivated.
+
+    Returns:
+        list[XeroTenant]: The connected tenants.
+    """
+    token_key = active_token_key()
+    tenants = []
+    for connection in IdentityApi(api_client).get_connections():
+        if connection.tenant_type != "ORGANISATION":
+            continue
+        tenant, _ = XeroTenant.objects.update_or_create(
+            tenant_id=str(connection.tenant_id),
+            defaults={
+                "name": connection.tenant_name or "",
+                "tenant_type": connection.tenant_type,
+                "connection_id": str(connection.id),
+                "token_key": token_key,
+                "is_active": True,
+            },
+        )
+        tenants.append(tenant)
+    XeroTenant.objects.filter(token_key=token_key, is_active=True).exclude(
+        pk__in=[tenant.pk for tenant in tenants]
+    ).update(is_active=False)
+    return tenants
+
+
+def default_xero_tenant():
+    """
+    The organisation contacts without a tenant are pushed to: the first one
+    connected.
+    """
+    return XeroTenant.objects.filter(is_active=True).first()
+
+
+def get_contacts_page(accounting_api: AccountingApi, tenant_id: str, page: int, **kwargs):
+    """Fetch one page of ``XERO_CONTACTS_PAGE_SIZE`` contacts."""
+    return accounting_api.get_contacts(
+        xero_tenant_id=tenant_id,
+        page=page,
+        page_size=settings.XERO_CONTACTS_PAGE_SIZE,
+        **kwargs,
+    )
@@ -0,0 +1,398 @@
+import json
+import uuid
+from collections import Counter
+from io import StringIO
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Contact, ContactAddress, ContactPerson, ContactPhoneNumber, XeroTenant
+from .utils import save_contact_info, suppress_xero_sync, transform_contact
+from .versions import bump_contacts_version
+
+WHITESPACE = " \t\n\r"
+
+
+class JsonStream:
+    """
+    Incremental JSON reader over a text file. Values are decoded one at a
+    time with ``JSONDecoder.raw_decode`` from a buffer that only ever holds
+    the unread part of the current read plus the value being decoded.
+    """
+
+    decoder = json.JSONDecoder()
+
+    def __init__(self, file, read_size: int = 1 << 20):
+        self.file = file
+        self.read_size = read_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read more input. Returns False at the end of the file."""
+        if self.eof:
+            return False
+        data = self.file.read(self.read_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or "" at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} but found {self.peek()!r}")
+        self.pos += 1
+
+    def decode(self):
+        """Decode the next complete value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next read.
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_contacts(file, read_size: int = 1 << 20):
+    """
+    Yield the contacts in a Xero contacts export one at a time.
+
+    Accepts the JSON that ``serialize()`` produces for a ``Contacts`` model
+    (a document with a ``Contacts`` list, or several of them, one per line),
+    JSON lines with one contact per line, and a top-level list of contacts.
+    Only one contact is held in memory at a time, whatever the file size.
+
+    Args:
+        file: A text file object.
+        read_size (int): Characters read from the file at a time.
+    """
+    stream = JsonStream(file, read_size)
+    while char := stream.peek():
+        if char == "[":
+            yield from iter_json_array(stream)
+        elif char == "{":
+            yield from iter_json_object_contacts(stream)
+        else:
+            raise ValueError(f"Expected a JSON object or list but found {char!r}")
+
+
+def iter_json_array(stream: JsonStream):
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.pos += 1
+        return
+    while True:
+        yield stream.decode()
+        if stream.peek() == "]":
+            stream.pos += 1
+            return
+        stream.expect(",")
+
+
+def iter_json_object_contacts(stream: JsonStream):
+    """
+    Yield the contacts of one top-level object: the items of its
+    ``Contacts`` list if it has one, or else the object itself.
+    """
+    stream.expect("{")
+    fields, has_contacts = {}, False
+    while stream.peek() != "}":
+        if fields or has_contacts:
+            stream.expect(",")
+        key = stream.decode()
+        stream.expect(":")
+        if key == "Contacts" and stream.peek() == "[":
+            has_contacts = True
+            yield from iter_json_array(stream)
+        else:
+            fields[key] = stream.decode()
+    stream.pos += 1
+    if not has_contacts:
+        yield fields
+
+
+def dedupe_batch(contacts: list[dict]) -> list[dict]:
+    """Keep the last occurrence of each ContactID in a batch."""
+    return list({contact["ContactID"]: contact for contact in contacts if contact.get("ContactID")}.values())
+
+
+def count_renamed(contacts: list[dict]) -> int:
+    """
+    Count the contacts of a batch stored under a disambiguated name, because
+    another contact of the tenant has their name.
+    """
+    return (
+        Contact.objects.filter(xero_contact_id__in=[contact["ContactID"] for contact in contacts])
+        .exclude(name=F("xero_name"))
+        .count()
+    )
+
+
+def import_batch_with_orm(contacts: list[dict], tenant: XeroTenant | None = None) -> dict:
+    """
+    Import a batch through ``save_contact_info``, which stores contacts whose
+    name is already taken under ``disambiguated_name``.
+    """
+    contacts = dedupe_batch(contacts)
+    result = save_contact_info({"Contacts": contacts}, chunk_size=len(contacts) or None, tenant=tenant)
+    return {**result, "renamed": count_renamed(contacts)}
+
+
+def copy_text(value) -> str:
+    """Format a value for ``COPY ... FROM STDIN`` in text format."""
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class PostgresContactImporter:
+    """
+    Imports batches of contacts on PostgreSQL with ``COPY`` and set-based SQL.
+
+    Each batch is copied into UNLOGGED staging tables, one per target table,
+    and merged in one transaction:
+
+    - contacts are upserted on ``xero_contact_id`` with one
+      ``INSERT ... ON CONFLICT``, leaving rows with an unchanged
+      ``sync_fingerprint`` and name alone. A contact whose name belongs to a
+      different contact, or to an earlier one in the batch, is stored under
+      the name ``disambiguated_name`` would give it;
+    - the phones, addresses and people of every inserted or updated contact
+      are replaced with one ``DELETE`` and one ``INSERT ... SELECT`` per
+      table.
+
+    Raw SQL does not send signals, so nothing is queued for pushing to Xero.
+    Use as a context manager; the staging tables are dropped on exit.
+    """
+
+    CHILD_MODELS = {
+        "address": ContactAddress,
+        "phone": ContactPhoneNumber,
+        "person": ContactPerson,
+    }
+    CHILD_ROWS = {"address": "addresses", "phone": "phones", "person": "persons"}
+    CONTACT_COLUMNS = [
+        "xero_contact_id",
+        "name",
+        "xero_name",
+        "email",
+        "website",
+        "is_supplier",
+        "is_customer",
+        "sync_fingerprint",
+    ]
+    CHILD_COLUMNS = {
+        "address": [
+            "address_type",
+            "address_line1",
+            "address_line2",
+            "address_line3",
+            "address_line4",
+            "city",
+            "region",
+            "postal_code",
+            "country",
+        ],
+        "phone": ["phone_label", "phone_number"],
+        "person": ["job_title", "first_name", "last_name", "email", "phone", "primary_contact"],
+    }
+
+    def __init__(self, connection, tenant: XeroTenant | None = None):
+        self.connection = connection
+        self.tenant = tenant
+        suffix = uuid.uuid4().hex[:8]
+        self.tables = {name: f"xero_import_{suffix}_{name}" for name in ("contact", "changed", *self.CHILD_MODELS)}
+
+    def __enter__(self):
+        with self.connection.cursor() as cursor:
+            for name, table in self.tables.items():
+                cursor.execute(f'CREATE UNLOGGED TABLE "{table}" ({self.staging_columns_sql(name)})')
+        return self
+
+    def __exit__(self, *exc_info):
+        with self.connection.cursor() as cursor:
+            for table in self.tables.values():
+                cursor.execute(f'DROP TABLE IF EXISTS "{table}"')
+
+    def staging_columns_sql(self, name: str) -> str:
+        if name == "changed":
+            return "id uuid PRIMARY KEY, xero_contact_id text, inserted boolean"
+        if name == "contact":
+            model, columns, definitions = Contact, self.CONTACT_COLUMNS, []
+        else:
+            model, columns, definitions = self.CHILD_MODELS[name], self.CHILD_COLUMNS[name], ['"xero_contact_id" text']
+        for column in columns:
+            is_boolean = model._meta.get_field(column).get_internal_type() == "BooleanField"
+            definitions.append(f'"{column}" {"boolean" if is_boolean else "text"}')
+        return ", ".join(definitions)
+
+    def prep(self, model, column: str, value):
+        return model._meta.get_field(column).get_db_prep_save(value, self.connection)
+
+    def copy_rows(self, cursor, name: str, columns: list[str], rows) -> None:
+        buffer = StringIO()
+        for row in rows:
+            buffer.write("\t".join(copy_text(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        cursor.copy_expert(f'COPY "{self.tables[name]}" ({column_list}) FROM STDIN', buffer)
+
+    def stage(self, cursor, records: dict) -> None:
+        self.copy_rows(
+            cursor,
+            "contact",
+            self.CONTACT_COLUMNS,
+            (
+                [self.prep(Contact, column, record["fields"][column]) for column in self.CONTACT_COLUMNS]
+                for record in records.values()
+            ),
+        )
+        for name, model in self.CHILD_MODELS.items():
+            columns = self.CHILD_COLUMNS[name]
+            self.copy_rows(
+                cursor,
+                name,
+                ["xero_contact_id", *columns],
+                (
+                    [xero_contact_id, *(self.prep(model, column, row.get(column)) for column in columns)]
+                    for xero_contact_id, record in records.items()
+                    for row in record[self.CHILD_ROWS[name]].values()
+                ),
+            )
+        for table in self.tables.values():
+            cursor.execute(f'ANALYZE "{table}"')
+
+    def defaults(self, model, staged: list[str]) -> tuple[list[str], list]:
+        """Columns the staging tables do not carry, with their model defaults."""
+        columns, values = [], []
+        for field in model._meta.concrete_fields:
+            if field.primary_key or field.column in staged or field.name == "company_name":
+                continue
+            columns.append(field.column)
+            values.append(field.get_db_prep_save(field.get_default(), self.connection))
+        return columns, values
+
+    def merge(self, cursor) -> dict:
+        contact_table = Contact._meta.db_table
+        stage, changed = self.tables["contact"], self.tables["changed"]
+        tenant_pk = self.tenant.pk if self.tenant else None
+        max_length = Contact._meta.get_field("name").max_length
+        # The SQL equivalent of utils.disambiguated_name.
+        disambiguated = (
+            f"left(s.name, {max_length} - 3 - length(left(s.xero_contact_id, 8))) "
+            "|| ' [' || left(s.xero_contact_id, 8) || ']'"
+        )
+
+        extra_columns, extra_values = self.defaults(Contact, [*self.CONTACT_COLUMNS, "tenant_id"])
+        columns = ", ".join(f'"{column}"' for column in ["id", "tenant_id", *self.CONTACT_COLUMNS, *extra_columns])
+        staged = ", ".join(
+            f"CASE WHEN s.clashes THEN {disambiguated} ELSE s.name END" if column == "name" else f's."{column}"'
+            for column in self.CONTACT_COLUMNS
+        )
+        defaults = "".join(", %s" for _ in extra_values)
+        updates = ", ".join(
+            f'"{column}" = EXCLUDED."{column}"' for column in ["tenant_id", *self.CONTACT_COLUMNS[1:]]
+        )
+        cursor.execute(
+            f"""
+            WITH named AS (
+                SELECT s.*, EXISTS (
+                    SELECT 1 FROM "{contact_table}" o WHERE o.name = s.name
+                    AND o.tenant_id IS NOT DISTINCT FROM %s
+                    AND o.xero_contact_id IS DISTINCT FROM s.xero_contact_id
+                ) AS taken
+                FROM "{stage}" s
+            ), upserted AS (
+                INSERT INTO "{contact_table}" AS c ({columns})
+                SELECT gen_random_uuid(), %s, {staged}{defaults} FROM (
+                    SELECT n.*, n.taken OR row_number() OVER (
+                        PARTITION BY n.name ORDER BY n.taken, n.xero_contact_id
+                    ) > 1 AS clashes
+                    FROM named n
+                ) s
+                ON CONFLICT (xero_contact_id) DO UPDATE SET {updates}
+                WHERE c.sync_fingerprint IS DISTINCT FROM EXCLUDED.sync_fingerprint
+                OR c.tenant_id IS DISTINCT FROM EXCLUDED.tenant_id
+                OR c.name IS DISTINCT FROM EXCLUDED.name
+                RETURNING c.id, c.xero_contact_id, (c.xmax = 0) AS inserted
+            )
+            INSERT INTO "{changed}" SELECT * FROM upserted
+            """,
+            [tenant_pk, tenant_pk, *extra_values],
+        )
+
+        for name, model in self.CHILD_MODELS.items():
+            child_table = model._meta.db_table
+            child_columns = self.CHILD_COLUMNS[name]
+            extra_columns, extra_values = self.defaults(model, child_columns)
+            columns = ", ".join(f'"{column}"' for column in ["company_name_id", *child_columns, *extra_columns])
+            staged = ", ".join(f's."{column}"' for column in child_columns)
+            defaults = "".join(", %s" for _ in extra_values)
+            cursor.execute(f'DELETE FROM "{child_table}" WHERE company_name_id IN (SELECT id FROM "{changed}")')
+            cursor.execute(
+                f"""
+                INSERT INTO "{child_table}" ({columns})
+                SELECT ch.id, {staged}{defaults} FROM "{self.tables[name]}" s
+                JOIN "{changed}" ch ON ch.xero_contact_id = s.xero_contact_id
+                """,
+                extra_values,
+            )
+
+        cursor.execute(f'SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM "{changed}"')
+        created, updated = cursor.fetchone()
+        return {"created": created, "updated": updated}
+
+    def import_batch(self, contacts: list[dict]) -> dict:
+        """
+        Import a batch of contacts.
+
+        Returns:
+            dict: Number of contacts ``created``, ``updated``, ``skipped`` as
+            unchanged and stored under a disambiguated name (``renamed``),
+            and how often each unrecognised country value was seen
+            (``unknown_countries``).
+        """
+        contacts = dedupe_batch(contacts)
+        unknown_countries = Counter()
+        records = {contact["ContactID"]: transform_contact(contact, unknown_countries) for contact in contacts}
+
+        with suppress_xero_sync(), transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                for table in self.tables.values():
+                    cursor.execute(f'TRUNCATE "{table}"')
+                self.stage(cursor, records)
+                result = self.merge(cursor)
+
+        if result["created"] or result["updated"]:
+            bump_contacts_version(self.tenant.pk if self.tenant else None)
+        result["skipped"] = len(records) - result["created"] - result["updated"]
+        result["renamed"] = count_renamed(contacts)
+        result["unknown_countries"] = dict(unknown_countries)
+        return result
@@ -0,0 +1,115 @@
+import resource
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Greatest
+
+from .models import SyncRun
+
+
+_api_call_counter: ContextVar[dict | None] = ContextVar("xero_api_call_counter", default=None)
+
+# SyncRun columns that hold the time spent in each phase of a sync.
+PHASE_FIELDS = {
+    "token": "token_seconds",
+    "tenant": "tenant_seconds",
+    "fetch": "fetch_seconds",
+    "serialize": "serialize_seconds",
+    "transform": "transform_seconds",
+    "write": "write_seconds",
+}
+
+
+class PhaseTimer:
+    """Accumulates wall-clock time per sync phase."""
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the queries this thread runs on the default database inside the
+    block. Yields a dict whose ``count`` is updated as queries run.
+    """
+    counter = {"count": 0}
+
+    def wrapper(execute, sql, params, many, context):
+        counter["count"] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+@contextmanager
+def count_api_calls():
+    """
+    Count the Xero API calls made in the current context inside the block.
+    Yields a dict whose ``count`` is updated as calls are made.
+    """
+    counter = {"count": 0}
+    token = _api_call_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _api_call_counter.reset(token)
+
+
+def record_api_call() -> None:
+    counter = _api_call_counter.get()
+    if counter is not None:
+        counter["count"] += 1
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process, in KiB (Linux reports KiB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def record_sync_run_metrics(
+    run_id,
+    durations: dict | None = None,
+    api_calls: int = 0,
+    db_queries: int = 0,
+    peak_rss: int = 0,
+    error: str = "",
+    **counts,
+) -> None:
+    """
+    Add one task's share of the work to a sync run.
+
+    Several tasks report into the same run concurrently, so every value is
+    applied as an increment, or as a maximum for ``peak_rss``.
+
+    Args:
+        run_id: The SyncRun's primary key.
+        durations (dict, optional): Seconds per phase, keyed as in PHASE_FIELDS.
+        api_calls (int): Xero API calls made.
+        db_queries (int): Database queries run.
+        peak_rss (int): Peak RSS of the reporting process in KiB.
+        error (str): Text to append to the run's error log.
+        **counts: Other SyncRun counters to increment, e.g. ``pages_done=1``.
+    """
+    updates = {field: F(field) + value for field, value in counts.items()}
+    for phase, seconds in (durations or {}).items():
+        updates[PHASE_FIELDS[phase]] = F(PHASE_FIELDS[phase]) + seconds
+    updates["api_calls"] = F("api_calls") + api_calls
+    updates["db_queries"] = F("db_queries") + db_queries
+    updates["peak_rss_kb"] = Greatest(F("peak_rss_kb"), peak_rss)
+    if error:
+        updates["error"] = Concat(F("error"), Value(error))
+    SyncRun.objects.filter(pk=run_id).update(**updates)
@@ -0,0 +1,95 @@
+import json
+import platform
+
+import django
+from celery import current_app
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from xero_integration.xero.benchmark import generate_contacts, measure, mutate_contacts
+from xero_integration.xero.payloads import store_payload
+from xero_integration.xero.tasks import sync_xero_contacts_task
+from xero_integration.xero.utils import save_contact_info
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the contact ingest path with synthetic Xero payloads and print the "
+        "results as JSON. Runs against a throwaway test database of the configured "
+        "backend, so set POSTGRES_DB to benchmark Postgres instead of SQLite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000], help="Contacts per run, e.g. 1000 10000 100000")
+        parser.add_argument("--change-ratio", type=float, default=0.1, help="Share of contacts edited between syncs")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Overrides XERO_SYNC_CHUNK_SIZE")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--trace-memory", action="store_true", help="Report peak Python allocations per scenario (slower)")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"]:
+            settings.XERO_SYNC_CHUNK_SIZE = options["chunk_size"]
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Chunk tasks run inline, one after another, so only the task overhead
+        # and chord bookkeeping are measured on top of save_contact_info.
+        always_eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        try:
+            results = [
+                result
+                for size in options["sizes"]
+                for result in self.benchmark_size(size, options)
+            ]
+        finally:
+            current_app.conf.task_always_eager = always_eager
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = json.dumps(
+            {
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "chunk_size": settings.XERO_SYNC_CHUNK_SIZE,
+                "change_ratio": options["change_ratio"],
+                "results": results,
+            },
+            indent=2,
+        )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(report + "\n")
+        else:
+            self.stdout.write(report)
+
+    def benchmark_size(self, size: int, options: dict) -> list[dict]:
+        """
+        Run every scenario for ``size`` contacts, starting from an empty
+        database: a first sync, a re-sync with no changes, a re-sync where
+        ``change_ratio`` of the contacts changed, and the same through the
+        Celery page task, including storing the page for it.
+        """
+        call_command("flush", interactive=False, verbosity=0)
+        seed, change_ratio = options["seed"], options["change_ratio"]
+        contacts = generate_contacts(size, seed=seed)
+        scenarios = [
+            ("initial", save_contact_info, contacts),
+            ("unchanged", save_contact_info, contacts),
+            ("changed", save_contact_info, mutate_contacts(contacts, change_ratio, seed=seed + 1)),
+            (
+                "changed_task",
+                lambda payload: sync_xero_contacts_task(store_payload(payload)),
+                mutate_contacts(contacts, change_ratio, seed=seed + 2),
+            ),
+        ]
+
+        results = []
+        for scenario, ingest, payload in scenarios:
+            with measure(size, trace_memory=options["trace_memory"]) as result:
+                ingest({"Contacts": payload})
+            results.append({"size": size, "scenario": scenario, **result})
+            self.stderr.write(f"{size:>7} {scenario:<13} {result['rows_per_second']:>10} rows/s {result['queries_per_contact']:>7} queries/contact")
+        return results
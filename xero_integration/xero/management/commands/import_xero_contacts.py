@@ -0,0 +1,80 @@
+import sys
+import time
+from collections import Counter
+from contextlib import nullcontext
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from xero_integration.xero.importer import PostgresContactImporter, import_batch_with_orm, iter_json_contacts
+from xero_integration.xero.models import XeroTenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a Xero contacts export without going through Celery. Reads JSON lines, "
+        "or the JSON serialize() produces, incrementally. On PostgreSQL each batch is "
+        "loaded with COPY and merged with set-based SQL; other databases use the ORM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Export file, or - for stdin")
+        parser.add_argument("--batch-size", type=int, default=20000, help="Contacts merged per transaction")
+        parser.add_argument("--orm", action="store_true", help="Use the ORM path on PostgreSQL too")
+        parser.add_argument("--tenant", help="Xero tenant ID the export belongs to")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+        options["tenant"] = self.resolve_tenant(options["tenant"])
+        if options["path"] == "-":
+            self.import_file(sys.stdin, options)
+            return
+        try:
+            with open(options["path"], encoding="utf-8") as f:
+                self.import_file(f, options)
+        except OSError as e:
+            raise CommandError(e)
+
+    def resolve_tenant(self, tenant_id):
+        if tenant_id:
+            try:
+                return XeroTenant.objects.get(tenant_id=tenant_id)
+            except XeroTenant.DoesNotExist:
+                raise CommandError(f"Unknown Xero tenant {tenant_id}")
+        tenants = list(XeroTenant.objects.filter(is_active=True)[:2])
+        if len(tenants) > 1:
+            raise CommandError("Several organisations are connected, pass --tenant")
+        return tenants[0] if tenants else None
+
+    def import_file(self, f, options):
+        use_copy = connection.vendor == "postgresql" and not options["orm"]
+        tenant = options["tenant"]
+        totals = Counter()
+        unknown_countries = Counter()
+        start = time.perf_counter()
+        contacts = iter_json_contacts(f)
+
+        try:
+            with PostgresContactImporter(connection, tenant) if use_copy else nullcontext() as importer:
+                while batch := list(islice(contacts, options["batch_size"])):
+                    result = importer.import_batch(batch) if importer else import_batch_with_orm(batch, tenant)
+                    totals.update({key: result[key] for key in ("created", "updated", "skipped", "renamed")})
+                    totals["read"] += len(batch)
+                    unknown_countries.update(result["unknown_countries"])
+                    self.stderr.write(
+                        f"{totals['read']} contacts read, {totals['read'] / (time.perf_counter() - start):.0f}/s"
+                    )
+        except ValueError as e:
+            raise CommandError(f"Invalid JSON after {totals['read']} contacts: {e}")
+
+        self.stdout.write(
+            "Imported {read} contacts in {seconds:.1f}s: {created} created, {updated} updated, "
+            "{skipped} unchanged, {renamed} stored under a disambiguated name.".format(
+                seconds=time.perf_counter() - start,
+                **{key: totals[key] for key in ("read", "created", "updated", "skipped", "renamed")},
+            )
+        )
+        if unknown_countries:
+            self.stdout.write(f"Unrecognised countries: {dict(unknown_countries)}")
@@ -0,0 +1,165 @@
+import logging
+import os
+import re
+import time
+from contextlib import ExitStack
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+from .ledger import count_queries
+
+
+logger = logging.getLogger(__name__)
+
+# Every helper below returns straight away when this is False, so the
+# instrumented code paths cost one attribute lookup when metrics are off.
+METRICS_ENABLED = bool(settings.XERO_METRICS_ENABLED and prometheus_client)
+
+if settings.XERO_METRICS_ENABLED and not prometheus_client:
+    logger.warning("XERO_METRICS_ENABLED is set but prometheus_client is not installed")
+
+GUID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+if METRICS_ENABLED:
+    API_REQUEST_SECONDS = prometheus_client.Histogram(
+        "xero_api_request_seconds",
+        "Latency of Xero API calls.",
+        ["method", "endpoint", "status"],
+    )
+    TOKEN_REFRESHES = prometheus_client.Counter(
+        "xero_token_refreshes_total",
+        "Xero OAuth2 token refreshes.",
+        ["outcome"],
+    )
+    RATE_LIMITED = prometheus_client.Counter(
+        "xero_rate_limited_total",
+        "Xero API calls answered with 429, by the limit that was hit.",
+        ["problem"],
+    )
+    INGEST_CONTACTS = prometheus_client.Counter(
+        "xero_ingest_contacts_total",
+        "Contacts ingested from Xero, by outcome.",
+        ["outcome"],
+    )
+    INGEST_SECONDS = prometheus_client.Histogram(
+        "xero_ingest_seconds",
+        "Time spent ingesting a batch of contacts, by phase.",
+        ["phase"],
+    )
+    INGEST_ROWS_PER_SECOND = prometheus_client.Histogram(
+        "xero_ingest_rows_per_second",
+        "Contacts ingested per second, per batch.",
+        buckets=(10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000),
+    )
+    TASK_DB_QUERIES = prometheus_client.Histogram(
+        "xero_task_db_queries",
+        "Database queries run by one Celery task.",
+        ["task"],
+        buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000),
+    )
+    TASK_QUEUE_LAG_SECONDS = prometheus_client.Histogram(
+        "xero_task_queue_lag_seconds",
+        "Time from a Celery task being enqueued to it starting.",
+        ["task"],
+        buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+    )
+
+
+def metrics_registry():
+    """
+    The registry to expose. Under a multi-process server or a prefork Celery
+    worker, ``PROMETHEUS_MULTIPROC_DIR`` must be set so the processes'
+    samples are merged.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+@lru_cache(maxsize=256)
+def api_endpoint(url: str) -> str:
+    """The URL path with IDs replaced, so each endpoint is one label value."""
+    return GUID_RE.sub("{id}", urlsplit(url).path)
+
+
+def observe_api_call(method: str, url: str, status, seconds: float) -> None:
+    if not METRICS_ENABLED:
+        return
+    API_REQUEST_SECONDS.labels(method, api_endpoint(url), str(status)).observe(seconds)
+
+
+def count_token_refresh(outcome: str) -> None:
+    if not METRICS_ENABLED:
+        return
+    TOKEN_REFRESHES.labels(outcome).inc()
+
+
+def count_rate_limited(problem: str | None) -> None:
+    if not METRICS_ENABLED:
+        return
+    RATE_LIMITED.labels(problem or "unknown").inc()
+
+
+def observe_ingest(counts: dict, timings: dict) -> None:
+    """
+    Record one ``save_contact_info`` call.
+
+    Args:
+        counts (dict): Number of contacts per outcome, e.g. ``created``.
+        timings (dict): Seconds spent per phase.
+    """
+    if not METRICS_ENABLED:
+        return
+    for outcome, count in counts.items():
+        INGEST_CONTACTS.labels(outcome).inc(count)
+    for phase, seconds in timings.items():
+        INGEST_SECONDS.labels(phase).observe(seconds)
+    seconds = sum(timings.values())
+    if seconds:
+        INGEST_ROWS_PER_SECOND.observe(sum(counts.values()) / seconds)
+
+
+if METRICS_ENABLED:
+    from celery import signals
+
+    # Query counters of the tasks running in this process, by task ID.
+    _task_query_counters: dict[str, tuple[ExitStack, dict]] = {}
+
+    @signals.before_task_publish.connect
+    def stamp_enqueue_time(headers=None, **kwargs):
+        if headers is not None:
+            headers.setdefault("enqueued_at", time.time())
+
+    @signals.task_prerun.connect
+    def start_task_metrics(task_id=None, task=None, **kwargs):
+        enqueued_at = getattr(task.request, "enqueued_at", None)
+        if enqueued_at:
+            TASK_QUEUE_LAG_SECONDS.labels(task.name).observe(max(time.time() - enqueued_at, 0))
+        stack = ExitStack()
+        _task_query_counters[task_id] = (stack, stack.enter_context(count_queries()))
+
+    @signals.task_postrun.connect
+    def finish_task_metrics(task_id=None, task=None, **kwargs):
+        stack, queries = _task_query_counters.pop(task_id, (None, None))
+        if stack is not None:
+            stack.close()
+            TASK_DB_QUERIES.labels(task.name).observe(queries["count"])
+
+    @signals.worker_ready.connect
+    def start_worker_exporter(**kwargs):
+        prometheus_client.start_http_server(settings.XERO_METRICS_WORKER_PORT, registry=metrics_registry())
+
+    @signals.worker_process_shutdown.connect
+    def mark_worker_process_dead(pid=None, **kwargs):
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+def blank_xero_contact_id_to_null(apps, schema_editor):
+    # Unsynced contacts used "" as a placeholder, which would collide once the
+    # column is unique. NULLs are never equal, so they can coexist.
+    Contact = apps.get_model("xero", "Contact")
+    Contact.objects.filter(xero_contact_id="").update(xero_contact_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contact',
+            name='xero_contact_id',
+            field=models.CharField(blank=True, default=None, help_text='Xero Contact ID', max_length=255, null=True, verbose_name='Xero Contact ID'),
+        ),
+        migrations.RunPython(blank_xero_contact_id_to_null, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='contact',
+            name='xero_contact_id',
+            field=models.CharField(blank=True, default=None, help_text='Xero Contact ID', max_length=255, null=True, unique=True, verbose_name='Xero Contact ID'),
+        ),
+    ]
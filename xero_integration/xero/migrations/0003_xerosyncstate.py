@@ -0,0 +1,26 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0002_contact_xero_contact_id_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XeroSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant_id', models.CharField(max_length=255, unique=True, verbose_name='Xero Tenant ID')),
+                ('contacts_modified_since', models.DateTimeField(blank=True, help_text="Latest UpdatedDateUTC seen for this tenant's contacts", null=True, verbose_name='Contacts modified since')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sync state',
+                'verbose_name_plural': 'Sync states',
+            },
+        ),
+    ]
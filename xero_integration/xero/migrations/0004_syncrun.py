@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:40
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0003_xerosyncstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tenant_id', models.CharField(blank=True, default='', max_length=255, verbose_name='Xero Tenant ID')),
+                ('full_sync', models.BooleanField(default=False, verbose_name='Full sync')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='PENDING', max_length=10, verbose_name='Status')),
+                ('pages_total', models.PositiveIntegerField(blank=True, help_text='Number of pages fetched, known once fetching has finished', null=True, verbose_name='Pages total')),
+                ('pages_done', models.PositiveIntegerField(default=0, verbose_name='Pages ingested')),
+                ('contacts_fetched', models.PositiveIntegerField(default=0, verbose_name='Contacts fetched')),
+                ('contacts_created', models.PositiveIntegerField(default=0, verbose_name='Contacts created')),
+                ('contacts_updated', models.PositiveIntegerField(default=0, verbose_name='Contacts updated')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Sync run',
+                'verbose_name_plural': 'Sync runs',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0004_syncrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, help_text="Hash of the contact's Xero data as last synced", max_length=64, verbose_name='Sync fingerprint'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='contacts_skipped',
+            field=models.PositiveIntegerField(default=0, help_text='Contacts left untouched because their Xero data had not changed', verbose_name='Contacts skipped'),
+        ),
+    ]
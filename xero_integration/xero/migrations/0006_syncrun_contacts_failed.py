@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0005_contact_sync_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncrun',
+            name='contacts_failed',
+            field=models.PositiveIntegerField(default=0, verbose_name='Contacts failed'),
+        ),
+    ]
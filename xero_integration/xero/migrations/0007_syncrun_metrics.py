@@ -0,0 +1,67 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0006_syncrun_contacts_failed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncrun',
+            name='api_calls',
+            field=models.PositiveIntegerField(default=0, verbose_name='API calls'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='db_queries',
+            field=models.PositiveIntegerField(default=0, verbose_name='DB queries'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='fetch_seconds',
+            field=models.FloatField(default=0, verbose_name='Fetch'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='peak_rss_kb',
+            field=models.PositiveBigIntegerField(default=0, help_text='Largest peak resident set size of any process that worked on the run', verbose_name='Peak RSS (KiB)'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='serialize_seconds',
+            field=models.FloatField(default=0, verbose_name='Serialize'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='tenant_seconds',
+            field=models.FloatField(default=0, verbose_name='Tenant lookup'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='token_seconds',
+            field=models.FloatField(default=0, verbose_name='Token'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='transform_seconds',
+            field=models.FloatField(default=0, verbose_name='Transform'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='trigger',
+            field=models.CharField(choices=[('MANUAL', 'Manual'), ('SCHEDULED', 'Scheduled')], default='MANUAL', max_length=10, verbose_name='Trigger'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='write_seconds',
+            field=models.FloatField(default=0, verbose_name='Write'),
+        ),
+        migrations.AddIndex(
+            model_name='syncrun',
+            index=models.Index(fields=['-created_at'], name='xero_syncrun_created_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:53
+
+from django.db import migrations, models
+
+# The admin's "^field" and "=field" searches compare UPPER(field) with LIKE
+# and =. On PostgreSQL only an expression index with a pattern operator
+# class can serve both; other databases scan.
+SEARCH_INDEXES = [
+    ("xero_contact_name_search_idx", "xero_contact", "name"),
+    ("xero_contact_email_search_idx", "xero_contact", "email"),
+    ("xero_address_city_search_idx", "xero_contactaddress", "city"),
+    ("xero_phone_number_search_idx", "xero_contactphonenumber", "phone_number"),
+    ("xero_person_first_search_idx", "xero_contactperson", "first_name"),
+    ("xero_person_last_search_idx", "xero_contactperson", "last_name"),
+    ("xero_person_email_search_idx", "xero_contactperson", "email"),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table, column in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" (UPPER("{column}"::text) text_pattern_ops)'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0007_syncrun_metrics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['is_supplier'], name='xero_contact_supplier_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['is_customer'], name='xero_contact_customer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactaddress',
+            index=models.Index(fields=['address_type'], name='xero_address_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactaddress',
+            index=models.Index(fields=['country'], name='xero_address_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactperson',
+            index=models.Index(fields=['primary_contact'], name='xero_person_primary_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactphonenumber',
+            index=models.Index(fields=['phone_label', 'phone_number'], name='xero_phone_label_number_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
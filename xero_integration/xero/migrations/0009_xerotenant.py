@@ -0,0 +1,84 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def sync_states_to_tenants(apps, schema_editor):
+    # Watermarks move onto the tenant. A single-organisation install also
+    # gets its existing contacts assigned to that organisation.
+    XeroSyncState = apps.get_model("xero", "XeroSyncState")
+    XeroTenant = apps.get_model("xero", "XeroTenant")
+    Contact = apps.get_model("xero", "Contact")
+    for state in XeroSyncState.objects.all():
+        XeroTenant.objects.create(
+            tenant_id=state.tenant_id,
+            contacts_modified_since=state.contacts_modified_since,
+        )
+    if XeroTenant.objects.count() == 1:
+        Contact.objects.filter(xero_contact_id__isnull=False).update(tenant=XeroTenant.objects.get())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0008_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XeroTenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tenant_id', models.CharField(max_length=255, unique=True, verbose_name='Xero Tenant ID')),
+                ('name', models.CharField(blank=True, default='', max_length=255, verbose_name='Name')),
+                ('tenant_type', models.CharField(blank=True, default='ORGANISATION', max_length=50, verbose_name='Tenant type')),
+                ('connection_id', models.CharField(blank=True, default='', max_length=255, verbose_name='Connection ID')),
+                ('token_key', models.CharField(blank=True, default='', help_text='Cache key of the OAuth2 token that grants access to this organisation', max_length=255, verbose_name='Token key')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('contacts_modified_since', models.DateTimeField(blank=True, help_text="Latest UpdatedDateUTC seen for this tenant's contacts", null=True, verbose_name='Contacts modified since')),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True, verbose_name='Last synced at')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Xero tenant',
+                'verbose_name_plural': 'Xero tenants',
+                'ordering': ('created_at',),
+            },
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='tenant',
+            field=models.ForeignKey(blank=True, help_text='Organisation the contact belongs to, empty until it is synced', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='contacts', to='xero.xerotenant', verbose_name='Xero tenant'),
+        ),
+        migrations.RunPython(sync_states_to_tenants, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='XeroSyncState',
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='name',
+            field=models.CharField(help_text='Name of organization', max_length=255, verbose_name='Name'),
+        ),
+        migrations.AddIndex(
+            model_name='syncrun',
+            index=models.Index(fields=['tenant_id', 'status'], name='xero_syncrun_tenant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xerotenant',
+            index=models.Index(fields=['is_active', 'created_at'], name='xero_tenant_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['tenant', 'id'], name='xero_contact_tenant_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='contact',
+            constraint=models.UniqueConstraint(fields=('tenant', 'name'), name='xero_contact_tenant_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='contact',
+            constraint=models.UniqueConstraint(condition=models.Q(('tenant__isnull', True)), fields=('name',), name='xero_contact_untenanted_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0009_xerotenant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xerotenant',
+            name='sync_interval',
+            field=models.PositiveIntegerField(blank=True, help_text='Seconds between scheduled syncs, adapted to how often its contacts change', null=True, verbose_name='Sync interval'),
+        ),
+    ]
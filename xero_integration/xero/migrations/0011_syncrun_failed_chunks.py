@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0010_xerotenant_sync_interval'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncrun',
+            name='failed_chunks',
+            field=models.JSONField(blank=True, default=list, help_text='Stored pages and offsets of the chunks that could not be ingested, for retrying them', verbose_name='Failed chunks'),
+        ),
+        migrations.AddField(
+            model_name='syncrun',
+            name='watermark',
+            field=models.DateTimeField(blank=True, help_text='Latest UpdatedDateUTC fetched, applied to the tenant once the run succeeds', null=True, verbose_name='Watermark'),
+        ),
+    ]
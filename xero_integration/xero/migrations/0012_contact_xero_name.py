@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('xero', '0011_syncrun_failed_chunks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='xero_name',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Name of the contact in Xero as last synced, which the local name extends when it clashed', max_length=255, verbose_name='Xero name'),
+        ),
+    ]
@@ -10,18 +10,36 @@ class Contact(models.Model):
     Contact is same as the organisation.
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant = models.ForeignKey(
+        "XeroTenant",
+        verbose_name=_("Xero tenant"),
+        on_delete=models.PROTECT,
+        related_name="contacts",
+        blank=True,
+        null=True,
+        help_text="Organisation the contact belongs to, empty until it is synced",
+    )
     xero_contact_id = models.CharField(
         _("Xero Contact ID"),
         max_length=255,
         blank=True,
-        default="",
+        null=True,
+        unique=True,
+        default=None,
         help_text="Xero Contact ID",
     )
     name = models.CharField(
         _("Name"),
         max_length=255,
         help_text="Name of organization",
-        unique=True,
+    )
+    xero_name = models.CharField(
+        _("Xero name"),
+        max_length=255,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Name of the contact in Xero as last synced, which the local name extends when it clashed",
     )
     email = models.EmailField(
         _("Email"),
@@ -38,6 +56,30 @@ class Contact(models.Model):
     website = models.URLField(_("Website"), blank=True, null=True)
     is_supplier = models.BooleanField(_("supplier"), default=False)
     is_customer = models.BooleanField(_("customer"), default=False)
+    sync_fingerprint = models.CharField(
+        _("Sync fingerprint"),
+        max_length=64,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Hash of the contact's Xero data as last synced",
+    )
+
+    class Meta:
+        constraints = [
+            # Names are unique within an organisation, as in Xero.
+            models.UniqueConstraint(fields=["tenant", "name"], name="xero_contact_tenant_name_uniq"),
+            models.UniqueConstraint(
+                fields=["name"],
+                condition=models.Q(tenant__isnull=True),
+                name="xero_contact_untenanted_name_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["is_supplier"], name="xero_contact_supplier_idx"),
+            models.Index(fields=["is_customer"], name="xero_contact_customer_idx"),
+            models.Index(fields=["tenant", "id"], name="xero_contact_tenant_id_idx"),
+        ]
 
     def __str__(self) -> str:
         return str(self.name)
@@ -125,6 +167,10 @@ class ContactAddress(models.Model):
 
     class Meta:
         ordering = ("pk",)
+        indexes = [
+            models.Index(fields=["address_type"], name="xero_address_type_idx"),
+            models.Index(fields=["country"], name="xero_address_country_idx"),
+        ]
         verbose_name = _("Address")
         verbose_name_plural = _("Address")
 
@@ -153,6 +199,8 @@ class ContactPhoneNumber(models.Model):
         verbose_name = _("Phone number")
         verbose_name_plural = _("Phone numbers")
         ordering = ("phone_label", "phone_number")
+        # Serves both the phone_label filter and the default ordering.
+        indexes = [models.Index(fields=["phone_label", "phone_number"], name="xero_phone_label_number_idx")]
 
     def __str__(self) -> str:
         return f"{self.phone_label}: {self.phone_number}"
@@ -180,6 +228,7 @@ class ContactPerson(models.Model):
         return f"{str(self.full_name)} {self.company_name.name}"
 
     class Meta:
+        indexes = [models.Index(fields=["primary_contact"], name="xero_person_primary_idx")]
         verbose_name = _("Contact Person")
         verbose_name_plural = _("Contact Persons")
 
@@ -188,3 +237,126 @@ class ContactPerson(models.Model):
             self.email = None
         super().save(*args, **kwargs)
 
+
+
+class XeroTenant(models.Model):
+    """
+    A connected Xero organisation, with the token that grants access to it
+    and its sync bookkeeping.
+    """
+    tenant_id = models.CharField(_("Xero Tenant ID"), max_length=255, unique=True)
+    name = models.CharField(_("Name"), max_length=255, blank=True, default="")
+    tenant_type = models.CharField(_("Tenant type"), max_length=50, blank=True, default="ORGANISATION")
+    connection_id = models.CharField(_("Connection ID"), max_length=255, blank=True, default="")
+    token_key = models.CharField(
+        _("Token key"),
+        max_length=255,
+        blank=True,
+        default="",
+        help_text="Cache key of the OAuth2 token that grants access to this organisation",
+    )
+    is_active = models.BooleanField(_("Active"), default=True)
+    contacts_modified_since = models.DateTimeField(
+        _("Contacts modified since"),
+        blank=True,
+        null=True,
+        help_text="Latest UpdatedDateUTC seen for this tenant's contacts",
+    )
+    last_synced_at = models.DateTimeField(_("Last synced at"), blank=True, null=True)
+    sync_interval = models.PositiveIntegerField(
+        _("Sync interval"),
+        blank=True,
+        null=True,
+        help_text="Seconds between scheduled syncs, adapted to how often its contacts change",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("created_at",)
+        indexes = [models.Index(fields=["is_active", "created_at"], name="xero_tenant_active_idx")]
+        verbose_name = _("Xero tenant")
+        verbose_name_plural = _("Xero tenants")
+
+    def __str__(self) -> str:
+        return self.name or self.tenant_id
+
+
+class SyncRun(models.Model):
+    """
+    A contact sync job. Web requests create the row and enqueue the job;
+    the Celery tasks doing the work record their progress here.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", _("Pending")
+        RUNNING = "RUNNING", _("Running")
+        SUCCEEDED = "SUCCEEDED", _("Succeeded")
+        FAILED = "FAILED", _("Failed")
+
+    class Trigger(models.TextChoices):
+        MANUAL = "MANUAL", _("Manual")
+        SCHEDULED = "SCHEDULED", _("Scheduled")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tenant_id = models.CharField(_("Xero Tenant ID"), max_length=255, blank=True, default="")
+    trigger = models.CharField(_("Trigger"), max_length=10, choices=Trigger.choices, default=Trigger.MANUAL)
+    full_sync = models.BooleanField(_("Full sync"), default=False)
+    status = models.CharField(_("Status"), max_length=10, choices=Status.choices, default=Status.PENDING)
+    pages_total = models.PositiveIntegerField(
+        _("Pages total"),
+        blank=True,
+        null=True,
+        help_text="Number of pages fetched, known once fetching has finished",
+    )
+    pages_done = models.PositiveIntegerField(_("Pages ingested"), default=0)
+    contacts_fetched = models.PositiveIntegerField(_("Contacts fetched"), default=0)
+    contacts_created = models.PositiveIntegerField(_("Contacts created"), default=0)
+    contacts_updated = models.PositiveIntegerField(_("Contacts updated"), default=0)
+    contacts_skipped = models.PositiveIntegerField(
+        _("Contacts skipped"),
+        default=0,
+        help_text="Contacts left untouched because their Xero data had not changed",
+    )
+    contacts_failed = models.PositiveIntegerField(_("Contacts failed"), default=0)
+    failed_chunks = models.JSONField(
+        _("Failed chunks"),
+        default=list,
+        blank=True,
+        help_text="Stored pages and offsets of the chunks that could not be ingested, for retrying them",
+    )
+    watermark = models.DateTimeField(
+        _("Watermark"),
+        blank=True,
+        null=True,
+        help_text="Latest UpdatedDateUTC fetched, applied to the tenant once the run succeeds",
+    )
+    # Seconds spent in each phase, summed over every task of the run.
+    token_seconds = models.FloatField(_("Token"), default=0)
+    tenant_seconds = models.FloatField(_("Tenant lookup"), default=0)
+    fetch_seconds = models.FloatField(_("Fetch"), default=0)
+    serialize_seconds = models.FloatField(_("Serialize"), default=0)
+    transform_seconds = models.FloatField(_("Transform"), default=0)
+    write_seconds = models.FloatField(_("Write"), default=0)
+    api_calls = models.PositiveIntegerField(_("API calls"), default=0)
+    db_queries = models.PositiveIntegerField(_("DB queries"), default=0)
+    peak_rss_kb = models.PositiveBigIntegerField(
+        _("Peak RSS (KiB)"),
+        default=0,
+        help_text="Largest peak resident set size of any process that worked on the run",
+    )
+    error = models.TextField(_("Error"), blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["-created_at"], name="xero_syncrun_created_idx"),
+            models.Index(fields=["tenant_id", "status"], name="xero_syncrun_tenant_idx"),
+        ]
+        verbose_name = _("Sync run")
+        verbose_name_plural = _("Sync runs")
+
+    def __str__(self) -> str:
+        return f"{self.get_status_display()} sync {self.pk}"
@@ -0,0 +1,174 @@
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import QuerySet
+from xero_python.accounting import AccountingApi
+from xero_python.accounting import Address as XeroAddress
+from xero_python.accounting import Contact as XeroContact
+from xero_python.accounting import ContactPerson as XeroContactPerson
+from xero_python.accounting import Contacts as XeroContacts
+from xero_python.accounting import Phone as XeroPhone
+
+from .client import map_concurrently
+from .models import Contact, ContactAddress, ContactPhoneNumber, XeroTenant
+from .utils import disambiguated_name
+from .versions import bump_contacts_version
+
+
+logger = logging.getLogger(__name__)
+
+# Local labels Xero has no equivalent for are sent as its closest type.
+XERO_PHONE_TYPES = {
+    ContactPhoneNumber.PhoneLabel.DEFAULT: "DEFAULT",
+    ContactPhoneNumber.PhoneLabel.PERSONAL: "DEFAULT",
+    ContactPhoneNumber.PhoneLabel.HOME: "DEFAULT",
+    ContactPhoneNumber.PhoneLabel.MOBILE: "MOBILE",
+    ContactPhoneNumber.PhoneLabel.FAX: "FAX",
+    ContactPhoneNumber.PhoneLabel.DDI: "DDI",
+}
+XERO_ADDRESS_TYPES = {
+    ContactAddress.AddressTypes.POBOX: "POBOX",
+    ContactAddress.AddressTypes.POSTAL: "POBOX",
+}
+
+
+def build_xero_phone(phone: ContactPhoneNumber) -> XeroPhone:
+    phone_number = phone.phone_number
+    xero_phone = XeroPhone(phone_type=XERO_PHONE_TYPES.get(phone.phone_label, "DEFAULT"))
+    if getattr(phone_number, "is_valid", None) and phone_number.is_valid():
+        xero_phone.phone_country_code = str(phone_number.country_code)
+        xero_phone.phone_number = str(phone_number.national_number)
+    else:
+        xero_phone.phone_number = str(phone_number)
+    return xero_phone
+
+
+def build_xero_address(address: ContactAddress) -> XeroAddress:
+    return XeroAddress(
+        address_type=XERO_ADDRESS_TYPES.get(address.address_type, "STREET"),
+        address_line1=address.address_line1,
+        address_line2=address.address_line2,
+        address_line3=address.address_line3,
+        address_line4=address.address_line4,
+        city=address.city,
+        region=address.region,
+        postal_code=address.postal_code,
+        country=address.country.name if address.country else "",
+    )
+
+
+def xero_contact_name(contact: Contact) -> str:
+    """
+    The name to send for a contact: its Xero name while the local name is
+    still that name disambiguated, so the suffix never reaches Xero.
+    """
+    if contact.xero_name and contact.xero_contact_id:
+        if contact.name == disambiguated_name(contact.xero_name, contact.xero_contact_id):
+            return contact.xero_name
+    return contact.name
+
+
+def build_xero_contact(contact: Contact) -> XeroContact:
+    """
+    Build the Xero payload for a contact whose phones, addresses and people
+    have been prefetched.
+    """
+    people = list(contact.primary_contact_people.all())
+    primary = next((person for person in people if person.primary_contact), None)
+    xero_contact = XeroContact(
+        name=xero_contact_name(contact),
+        email_address=contact.email,
+        website=contact.website or "",
+        is_supplier=contact.is_supplier,
+        is_customer=contact.is_customer,
+        phones=[build_xero_phone(phone) for phone in contact.contact_phonenumbers.all()],
+        addresses=[build_xero_address(address) for address in contact.contact_addresses.all()],
+        # Xero accepts at most five additional people per contact.
+        contact_persons=[
+            XeroContactPerson(
+                first_name=person.first_name,
+                last_name=person.last_name,
+                email_address=person.email or "",
+            )
+            for person in people
+            if person is not primary
+        ][:5],
+    )
+    if contact.xero_contact_id:
+        xero_contact.contact_id = contact.xero_contact_id
+    if primary:
+        xero_contact.first_name = primary.first_name
+        xero_contact.last_name = primary.last_name
+    return xero_contact
+
+
+def push_contacts_to_xero(contacts: QuerySet, tenant: XeroTenant, api_client) -> dict:
+    """
+    Create or update local contacts in Xero, ``XERO_PUSH_BATCH_SIZE`` contacts
+    per ``update_or_create_contacts`` call. Up to the client's
+    ``pool_threads`` batches are sent at once.
+
+    Xero returns one result per contact, in the order they were sent, so the
+    new ContactIDs, and the tenant of contacts that had none, are written
+    back to the local rows by position with one ``bulk_update`` per batch.
+    Contacts rejected by Xero are logged and counted but do not fail the
+    rest of the batch.
+
+    Args:
+        contacts (QuerySet): The ``Contact`` rows to push.
+        tenant (XeroTenant): The organisation to push them to.
+        api_client: The Xero ApiClient to send requests with.
+
+    Returns:
+        dict: Number of contacts ``pushed`` and ``failed``.
+    """
+    batch_size = settings.XERO_PUSH_BATCH_SIZE
+    concurrency = max(api_client.pool_threads or 1, 1)
+    accounting_api = AccountingApi(api_client)
+    contacts = contacts.prefetch_related(
+        "contact_phonenumbers", "contact_addresses", "primary_contact_people"
+    ).order_by("pk")
+    pushed = failed = 0
+
+    def send(payload):
+        return accounting_api.update_or_create_contacts(
+            xero_tenant_id=tenant.tenant_id,
+            contacts=payload,
+            summarize_errors=False,
+        )
+
+    rows = contacts.iterator(chunk_size=batch_size * concurrency)
+    while batches := [batch for batch in (list(islice(rows, batch_size)) for _ in range(concurrency)) if batch]:
+        # Payloads are built here, where the prefetched rows live, and only
+        # the calls run on the client's threads.
+        payloads = [XeroContacts(contacts=[build_xero_contact(contact) for contact in batch]) for batch in batches]
+        for batch, result in zip(batches, map_concurrently(send, payloads, api_client)):
+            batch_pushed, batch_failed = save_pushed_contacts(tenant, batch, result)
+            pushed, failed = pushed + batch_pushed, failed + batch_failed
+
+    return {"pushed": pushed, "failed": failed}
+
+
+def save_pushed_contacts(tenant: XeroTenant, batch: list[Contact], result) -> tuple[int, int]:
+    changed, moved_from, failed = [], set(), 0
+    for contact, xero_contact in zip(batch, result.contacts):
+        if xero_contact.has_validation_errors:
+            failed += 1
+            logger.warning(
+                "Xero rejected contact %s: %s",
+                contact.pk,
+                "; ".join(error.message for error in xero_contact.validation_errors or []),
+            )
+        elif xero_contact.contact_id:
+            xero_contact_id = str(xero_contact.contact_id)
+            if xero_contact_id != contact.xero_contact_id or contact.tenant_id != tenant.pk:
+                if contact.tenant_id != tenant.pk:
+                    moved_from.add(contact.tenant_id)
+                contact.xero_contact_id, contact.tenant_id = xero_contact_id, tenant.pk
+                changed.append(contact)
+
+    Contact.objects.bulk_update(changed, ["xero_contact_id", "tenant"])
+    if moved_from:
+        bump_contacts_version(*moved_from, tenant.pk)
+    return len(batch) - failed, failed
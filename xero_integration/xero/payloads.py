@@ -0,0 +1,45 @@
+import json
+import uuid
+import zlib
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+
+class PayloadMissing(LookupError):
+    """Raised when a stored payload has expired or was already deleted."""
+
+
+def store_payload(data) -> str:
+    """
+    Store a JSON-serialisable payload in Redis, zlib-compressed, for
+    ``XERO_PAYLOAD_TTL`` seconds.
+
+    Tasks are sent the returned reference instead of the payload, so bulk
+    data is written to Redis once rather than into every broker message
+    and result backend entry that mentions it.
+
+    Returns:
+        str: The reference to pass to ``load_payload``.
+    """
+    ref = f"xero:payload:{uuid.uuid4().hex}"
+    blob = zlib.compress(json.dumps(data, separators=(",", ":")).encode(), level=6)
+    get_redis_connection("default").set(ref, blob, ex=settings.XERO_PAYLOAD_TTL)
+    return ref
+
+
+def load_payload(ref: str):
+    """
+    Return the payload stored under ``ref``.
+
+    Raises:
+        PayloadMissing: If the payload has expired or been deleted.
+    """
+    blob = get_redis_connection("default").get(ref)
+    if blob is None:
+        raise PayloadMissing(f"Payload {ref} has expired or was deleted")
+    return json.loads(zlib.decompress(blob))
+
+
+def delete_payload(ref: str) -> None:
+    get_redis_connection("default").delete(ref)
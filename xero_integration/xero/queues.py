@@ -0,0 +1,52 @@
+from django_redis import get_redis_connection
+
+
+def webhook_contacts_queue_key(tenant_id: str) -> str:
+    return f"xero:webhook:contacts:{tenant_id}"
+
+
+def webhook_contacts_scheduled_key(tenant_id: str) -> str:
+    return f"xero:webhook:contacts:{tenant_id}:scheduled"
+
+
+OUTBOUND_CONTACTS_QUEUE_KEY = "xero:outbound:contacts"
+OUTBOUND_CONTACTS_SCHEDULED_KEY = "xero:outbound:contacts:scheduled"
+
+
+def push_ids(queue_key: str, ids) -> None:
+    """
+    Add IDs to a Redis set. Repeated IDs collapse into one entry, which is
+    what coalesces bursts of events for the same record.
+    """
+    ids = list(ids)
+    if ids:
+        get_redis_connection("default").sadd(queue_key, *ids)
+
+
+def pop_ids(queue_key: str, count: int) -> list[str]:
+    """Remove and return up to ``count`` IDs from a Redis set."""
+    ids = get_redis_connection("default").spop(queue_key, count) or []
+    return [value.decode() if isinstance(value, bytes) else value for value in ids]
+
+
+def schedule_once(scheduled_key: str, task, args, countdown: int) -> bool:
+    """
+    Enqueue ``task`` to run in ``countdown`` seconds unless a run is already
+    pending for ``scheduled_key``. Every call made in the meantime is
+    folded into that single run.
+
+    The task clears the key with ``clear_schedule`` before it drains its
+    queue, so anything pushed after that schedules a fresh run.
+
+    Returns:
+        bool: Whether a new run was enqueued.
+    """
+    # The key expires on its own in case the task is lost before clearing it.
+    if not get_redis_connection("default").set(scheduled_key, 1, nx=True, ex=countdown + 300):
+        return False
+    task.apply_async(args=args, countdown=countdown)
+    return True
+
+
+def clear_schedule(scheduled_key: str) -> None:
+    get_redis_connection("default").delete(scheduled_key)
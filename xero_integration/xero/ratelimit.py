@@ -0,0 +1,196 @@
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from .metrics import count_rate_limited
+
+
+logger = logging.getLogger(__name__)
+
+
+class XeroRateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than XERO_RATE_LIMIT_MAX_WAIT."""
+
+    def __init__(self, tenant_id: str, wait: float):
+        self.tenant_id = tenant_id
+        self.wait = wait
+        super().__init__(f"Xero rate limit for tenant {tenant_id} is exhausted for {wait:.0f}s")
+
+
+# Atomically takes one call from a tenant's budget, or returns how long to
+# wait before trying again. The per-minute limit is a sliding-window log:
+# a sorted set of the tenant's call times over the last 60 seconds, so no
+# rolling minute ever holds more calls than Xero allows. Returns strings
+# because Redis truncates Lua numbers to integers.
+#
+# KEYS: minute window, in-flight leases, daily counter, blocked-until
+# ARGV: now, per-minute limit, concurrency limit, daily limit, lease id,
+#       lease ttl
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+
+local blocked_until = tonumber(redis.call('GET', KEYS[4]) or '0')
+if blocked_until > now then
+    return tostring(blocked_until - now)
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then
+    return '0.05'
+end
+
+if tonumber(redis.call('GET', KEYS[3]) or '0') >= tonumber(ARGV[4]) then
+    return tostring(math.max(redis.call('TTL', KEYS[3]), 1))
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - 60)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return tostring(math.max(tonumber(oldest[2]) + 60 - now, 0.05))
+end
+
+redis.call('ZADD', KEYS[1], now, ARGV[5])
+redis.call('EXPIRE', KEYS[1], 61)
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[6]), ARGV[5])
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[6]) + 60)
+if redis.call('INCR', KEYS[3]) == 1 then
+    redis.call('EXPIRE', KEYS[3], 86400)
+end
+return '0'
+"""
+
+# Makes the minute window hold at least as many calls as Xero counted,
+# when other clients of the organisation have used part of its budget.
+# The calls only this window is missing are logged as made now, the
+# earliest they can be assumed to leave Xero's window.
+#
+# KEYS: minute window
+# ARGV: now, per-minute limit, calls remaining according to Xero, id prefix
+SYNC_MINUTE_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - 60)
+local missing = tonumber(ARGV[2]) - tonumber(ARGV[3]) - redis.call('ZCARD', KEYS[1])
+for i = 1, missing do
+    redis.call('ZADD', KEYS[1], now, ARGV[4] .. i)
+end
+redis.call('EXPIRE', KEYS[1], 61)
+return math.max(missing, 0)
+"""
+
+
+class XeroRateLimiter:
+    """
+    Limiter for Xero's per-tenant limits, kept in Redis so every web and
+    worker process draws from the same budget.
+
+    Covers the per-minute limit, with a sliding window of call times, the
+    concurrent-call limit and the daily limit. The budget is corrected from
+    the ``X-MinLimit-Remaining`` and ``X-DayLimit-Remaining`` headers of
+    every response, and a ``Retry-After`` from a 429 pauses all calls for
+    the tenant.
+    """
+
+    def __init__(self):
+        self._acquire = None
+        self._sync_minute = None
+
+    @property
+    def redis(self):
+        return get_redis_connection("default")
+
+    @staticmethod
+    def keys(tenant_id: str) -> list[str]:
+        prefix = f"xero:ratelimit:{tenant_id}"
+        return [f"{prefix}:window", f"{prefix}:inflight", f"{prefix}:day", f"{prefix}:blocked"]
+
+    def try_acquire(self, tenant_id: str, lease_id: str) -> float:
+        """Take one call from the budget. Returns 0, or the seconds to wait."""
+        if self._acquire is None:
+            self._acquire = self.redis.register_script(ACQUIRE_SCRIPT)
+        wait = self._acquire(
+            keys=self.keys(tenant_id),
+            args=[
+                time.time(),
+                settings.XERO_RATE_LIMIT_PER_MINUTE,
+                settings.XERO_RATE_LIMIT_CONCURRENCY,
+                settings.XERO_RATE_LIMIT_PER_DAY,
+                lease_id,
+                settings.XERO_RATE_LIMIT_LEASE_TTL,
+            ],
+        )
+        return float(wait)
+
+    def release(self, tenant_id: str, lease_id: str) -> None:
+        self.redis.zrem(self.keys(tenant_id)[1], lease_id)
+
+    @contextmanager
+    def slot(self, tenant_id: str):
+        """
+        Block until the tenant has budget for one call, and hold one of its
+        concurrent-call slots for the duration of the block.
+
+        Raises:
+            XeroRateLimitExceeded: If the wait would exceed XERO_RATE_LIMIT_MAX_WAIT.
+        """
+        lease_id = uuid.uuid4().hex
+        deadline = time.monotonic() + settings.XERO_RATE_LIMIT_MAX_WAIT
+        while wait := self.try_acquire(tenant_id, lease_id):
+            if time.monotonic() + wait > deadline:
+                raise XeroRateLimitExceeded(tenant_id, wait)
+            time.sleep(wait)
+        try:
+            yield
+        finally:
+            self.release(tenant_id, lease_id)
+
+    def record_response(self, tenant_id: str, headers, status: int | None = None) -> None:
+        """
+        Sync the tenant's budget with the limits Xero reported.
+
+        Args:
+            tenant_id (str): The Xero tenant ID.
+            headers: Case-insensitive response headers.
+            status (int, optional): The response status code.
+        """
+        minute_key, _, day_key, blocked_key = self.keys(tenant_id)
+
+        minute_remaining = headers.get("X-MinLimit-Remaining")
+        if minute_remaining is not None:
+            # Other clients of the same organisation also use its budget.
+            if self._sync_minute is None:
+                self._sync_minute = self.redis.register_script(SYNC_MINUTE_SCRIPT)
+            self._sync_minute(
+                keys=[minute_key],
+                args=[
+                    time.time(),
+                    settings.XERO_RATE_LIMIT_PER_MINUTE,
+                    int(minute_remaining),
+                    f"external:{uuid.uuid4().hex}:",
+                ],
+            )
+
+        pipe = self.redis.pipeline()
+        day_remaining = headers.get("X-DayLimit-Remaining")
+        if day_remaining is not None:
+            # Only correct a running count, so the key keeps its 24h expiry.
+            used = max(settings.XERO_RATE_LIMIT_PER_DAY - int(day_remaining), 0)
+            pipe.set(day_key, used, xx=True, keepttl=True)
+
+        if status == 429:
+            retry_after = float(headers.get("Retry-After") or 60)
+            logger.warning(
+                "Xero rate limit hit for tenant %s (%s), pausing for %ss",
+                tenant_id,
+                headers.get("X-Rate-Limit-Problem"),
+                retry_after,
+            )
+            pipe.set(blocked_key, time.time() + retry_after, ex=int(retry_after) + 1)
+            count_rate_limited(headers.get("X-Rate-Limit-Problem"))
+        pipe.execute()
+
+
+rate_limiter = XeroRateLimiter()
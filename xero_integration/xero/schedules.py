@@ -0,0 +1,108 @@
+import json
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django_celery_beat.models import IntervalSchedule, PeriodicTask, PeriodicTasks
+
+from .models import XeroTenant
+
+
+SYNC_TASK = "xero_integration.xero.tasks.sync_tenant_contacts_task"
+
+
+def sync_task_name(tenant_id: str) -> str:
+    return f"xero-sync-contacts:{tenant_id}"
+
+
+def tenant_sync_interval(tenant: XeroTenant) -> int:
+    """Seconds between the tenant's scheduled syncs."""
+    return tenant.sync_interval or settings.XERO_TENANT_SYNC_INTERVAL
+
+
+def next_sync_interval(current: int, changes: int, elapsed: timedelta) -> int:
+    """
+    Pick the interval after a sync that saw ``changes`` modified contacts
+    over the ``elapsed`` time since the previous one.
+
+    The target is the interval in which ``XERO_SYNC_TARGET_CHANGES``
+    contacts change at the observed rate, and a sync that saw no change
+    targets the longest interval. To damp one-off bursts the interval only
+    moves halfway there, in log scale, per sync. The result is rounded to
+    whole minutes, to bound the schedules beat has to track, and kept
+    between ``XERO_SYNC_INTERVAL_MIN`` and ``XERO_SYNC_INTERVAL_MAX``.
+
+    Args:
+        current (int): The current interval in seconds.
+        changes (int): Contacts modified since the previous sync.
+        elapsed (timedelta): Time since the previous sync.
+
+    Returns:
+        int: The next interval in seconds.
+    """
+    if changes:
+        target = elapsed.total_seconds() * settings.XERO_SYNC_TARGET_CHANGES / changes
+    else:
+        target = settings.XERO_SYNC_INTERVAL_MAX
+    interval = math.sqrt(current * max(target, 1))
+    interval = round(interval / 60) * 60
+    return int(min(max(interval, settings.XERO_SYNC_INTERVAL_MIN), settings.XERO_SYNC_INTERVAL_MAX))
+
+
+def schedule_tenant_sync(tenant: XeroTenant) -> PeriodicTask:
+    """
+    Create or update the tenant's periodic sync task so it matches its
+    interval and is enabled only while the tenant is active.
+    """
+    interval, _ = IntervalSchedule.objects.get_or_create(
+        every=tenant_sync_interval(tenant),
+        period=IntervalSchedule.SECONDS,
+    )
+    name = sync_task_name(tenant.tenant_id)
+    values = {
+        "task": SYNC_TASK,
+        "interval_id": interval.pk,
+        "args": json.dumps([tenant.tenant_id]),
+        "enabled": tenant.is_active,
+        "description": f"Sync the contacts of {tenant}",
+    }
+    periodic_task = PeriodicTask.objects.filter(name=name).first()
+    # Every save makes beat reload all schedules, so skip no-op saves.
+    if periodic_task and all(getattr(periodic_task, field) == value for field, value in values.items()):
+        return periodic_task
+    periodic_task, _ = PeriodicTask.objects.update_or_create(name=name, defaults=values)
+    return periodic_task
+
+
+def adapt_sync_interval(tenant: XeroTenant, changes: int, elapsed: timedelta) -> int:
+    """
+    Move the tenant's sync interval towards the rate its contacts change at
+    and reschedule it.
+
+    Returns:
+        int: The new interval in seconds.
+    """
+    interval = next_sync_interval(tenant_sync_interval(tenant), changes, elapsed)
+    if interval != tenant.sync_interval:
+        with transaction.atomic():
+            XeroTenant.objects.filter(pk=tenant.pk).update(sync_interval=interval)
+            tenant.sync_interval = interval
+            schedule_tenant_sync(tenant)
+    return interval
+
+
+def reconcile_tenant_schedules() -> None:
+    """
+    Give every active tenant an enabled sync schedule, and disable the
+    schedules of tenants that are gone or no longer connected.
+    """
+    tenants = list(XeroTenant.objects.all())
+    for tenant in tenants:
+        schedule_tenant_sync(tenant)
+    stale = PeriodicTask.objects.filter(task=SYNC_TASK, enabled=True).exclude(
+        name__in=[sync_task_name(tenant.tenant_id) for tenant in tenants]
+    )
+    # Unlike save(), update() does not tell beat that schedules changed.
+    if stale.update(enabled=False):
+        PeriodicTasks.update_changed()
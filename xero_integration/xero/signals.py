@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Contact, ContactAddress, ContactPerson, ContactPhoneNumber
+from .queues import OUTBOUND_CONTACTS_QUEUE_KEY, OUTBOUND_CONTACTS_SCHEDULED_KEY, push_ids, schedule_once
+from .tasks import flush_outbound_contacts_task
+from .utils import xero_sync_enabled
+from .versions import bump_contacts_version
+
+
+def mark_contact_dirty(contact_id) -> None:
+    """
+    Queue a contact to be pushed to Xero once the current transaction
+    commits, and schedule a debounced flush if none is pending.
+    """
+    if not xero_sync_enabled():
+        return
+
+    def enqueue():
+        push_ids(OUTBOUND_CONTACTS_QUEUE_KEY, [str(contact_id)])
+        schedule_once(
+            OUTBOUND_CONTACTS_SCHEDULED_KEY,
+            flush_outbound_contacts_task,
+            args=[],
+            countdown=settings.XERO_OUTBOUND_DEBOUNCE,
+        )
+
+    transaction.on_commit(enqueue)
+
+
+@receiver(post_save, sender=Contact)
+def contact_saved(sender, instance, **kwargs):
+    mark_contact_dirty(instance.pk)
+
+
+@receiver(post_save, sender=ContactAddress)
+@receiver(post_save, sender=ContactPhoneNumber)
+@receiver(post_save, sender=ContactPerson)
+@receiver(post_delete, sender=ContactAddress)
+@receiver(post_delete, sender=ContactPhoneNumber)
+@receiver(post_delete, sender=ContactPerson)
+def contact_child_changed(sender, instance, **kwargs):
+    mark_contact_dirty(instance.company_name_id)
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+def contact_version_changed(sender, instance, **kwargs):
+    bump_contacts_version(instance.tenant_id)
+
+
+@receiver(post_save, sender=ContactAddress)
+@receiver(post_save, sender=ContactPhoneNumber)
+@receiver(post_save, sender=ContactPerson)
+@receiver(post_delete, sender=ContactAddress)
+@receiver(post_delete, sender=ContactPhoneNumber)
+@receiver(post_delete, sender=ContactPerson)
+def contact_child_version_changed(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Contact):
+        # Deleted along with its contact, whose own post_delete bumps.
+        return
+    if sender.company_name.is_cached(instance):
+        tenant_pk = instance.company_name.tenant_id
+    else:
+        tenant_pk = Contact.objects.filter(pk=instance.company_name_id).values_list("tenant_id", flat=True).first()
+    bump_contacts_version(tenant_pk)
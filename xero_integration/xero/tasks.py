@@ -1,40 +1,583 @@
 import logging
+from collections import Counter
+from datetime import datetime, timedelta
 
-from celery import shared_task
+from celery import chord, shared_task
 from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+from urllib3.exceptions import HTTPError
+from xero_python.accounting import AccountingApi
+from xero_python.api_client import serialize
+from xero_python.exceptions import ApiException
 
-from .models import Contact
-from .utils import add_address_info, add_contact_person_info, add_phone_info
+from .client import (
+    api_client,
+    default_xero_tenant,
+    get_contacts_page,
+    map_concurrently,
+    refresh_xero_token,
+    sync_xero_tenants,
+    use_token_key,
+    use_xero_tenant,
+)
+from .ledger import PhaseTimer, count_api_calls, count_queries, peak_rss_kb, record_sync_run_metrics
+from .metrics import observe_ingest
+from .models import Contact, SyncRun, XeroTenant
+from .outbound import push_contacts_to_xero
+from .payloads import delete_payload, load_payload, store_payload
+from .queues import (
+    OUTBOUND_CONTACTS_QUEUE_KEY,
+    OUTBOUND_CONTACTS_SCHEDULED_KEY,
+    clear_schedule,
+    pop_ids,
+    push_ids,
+    webhook_contacts_queue_key,
+    webhook_contacts_scheduled_key,
+)
+from .ratelimit import XeroRateLimitExceeded
+from .schedules import adapt_sync_interval, reconcile_tenant_schedules
+from .utils import advance_contacts_watermark, save_contact_info
 
 
 logger = logging.getLogger(__name__)
 
 
+def fail_sync_run(run_id, error: Exception) -> None:
+    SyncRun.objects.filter(pk=run_id).update(
+        status=SyncRun.Status.FAILED,
+        error=str(error),
+        finished_at=timezone.now(),
+    )
+
+
+def finish_sync_run_if_complete(run_id) -> None:
+    """
+    Close the run once every fetched page has been ingested. Runs where
+    some contacts could not be written end as failed.
+
+    Only a run that succeeded moves the tenant's watermark forward. After a
+    failure the next incremental sync fetches the same changes again, so
+    contacts that could not be written are not skipped until a full sync.
+
+    Called both by the fetch job and by every page's chord callback, because
+    either one may be the last to finish.
+    """
+    complete = SyncRun.objects.filter(
+        pk=run_id,
+        status=SyncRun.Status.RUNNING,
+        pages_total=F("pages_done"),
+    )
+    if complete.filter(contacts_failed=0).update(status=SyncRun.Status.SUCCEEDED, finished_at=timezone.now()):
+        run = SyncRun.objects.only("tenant_id", "watermark").get(pk=run_id)
+        if run.tenant_id and run.watermark:
+            advance_contacts_watermark(run.tenant_id, run.watermark)
+    complete.filter(contacts_failed__gt=0).update(status=SyncRun.Status.FAILED, finished_at=timezone.now())
+
+
+def record_task_metrics(run_id, timer: PhaseTimer, api_calls: dict, queries: dict) -> None:
+    record_sync_run_metrics(
+        run_id,
+        durations=timer.durations,
+        api_calls=api_calls["count"],
+        db_queries=queries["count"],
+        peak_rss=peak_rss_kb(),
+    )
+
+
+@shared_task
+def refresh_xero_token_task():
+    """
+    Refresh every stored token ahead of ``expires_at`` so API calls never
+    have to refresh them inline. Scheduled by celery beat.
+    """
+    token_keys = set(
+        XeroTenant.objects.filter(is_active=True).exclude(token_key="").values_list("token_key", flat=True)
+    )
+    # None is the most recently authorized token, which may not have any
+    # tenants yet.
+    for token_key in [None, *token_keys]:
+        with use_token_key(token_key):
+            try:
+                refresh_xero_token(margin=settings.XERO_TOKEN_REFRESH_MARGIN)
+            except Exception:
+                logger.exception("Failed to refresh Xero token %s", token_key or "(latest)")
+
+
+def start_sync_run(tenant: XeroTenant, trigger: str = SyncRun.Trigger.MANUAL, full_sync: bool = False) -> SyncRun:
+    """Create a sync run for ``tenant`` and enqueue it."""
+    sync_run = SyncRun.objects.create(tenant_id=tenant.tenant_id, trigger=trigger, full_sync=full_sync)
+    sync_xero_contacts_job.apply_async(args=[str(sync_run.pk)], kwargs={"full_sync": full_sync})
+    return sync_run
+
+
 @shared_task
-def sync_xero_contacts_task(contacts):
+def schedule_tenant_syncs_task():
+    """
+    Refresh the organisations each stored token is connected to, then make
+    sure every active tenant has its periodic sync task and disable the ones
+    of disconnected tenants. Scheduled by celery beat, and run after each
+    authorisation so new organisations are picked up straight away.
+    """
+    token_keys = set(
+        XeroTenant.objects.filter(is_active=True).exclude(token_key="").values_list("token_key", flat=True)
+    )
+    for token_key in [None, *token_keys]:
+        with use_token_key(token_key):
+            try:
+                sync_xero_tenants()
+            except Exception:
+                logger.exception("Failed to refresh the Xero tenants of token %s", token_key or "(latest)")
+    reconcile_tenant_schedules()
+
+
+@shared_task
+def sync_tenant_contacts_task(tenant_id):
+    """
+    Start a scheduled contact sync of the tenant, unless it is no longer
+    connected or already has one pending or running. Each tenant's own
+    periodic task calls this, see ``schedules.schedule_tenant_sync``.
+
+    Runs older than ``XERO_SYNC_RUN_TIMEOUT`` are assumed lost and no longer
+    block new ones.
+    """
+    tenant = XeroTenant.objects.filter(tenant_id=tenant_id, is_active=True).first()
+    if tenant is None:
+        return
+    busy = SyncRun.objects.filter(
+        tenant_id=tenant_id,
+        status__in=[SyncRun.Status.PENDING, SyncRun.Status.RUNNING],
+        created_at__gte=timezone.now() - timedelta(seconds=settings.XERO_SYNC_RUN_TIMEOUT),
+    )
+    if not busy.exists():
+        start_sync_run(tenant, trigger=SyncRun.Trigger.SCHEDULED)
+
+
+@shared_task
+def sync_xero_contacts_job(run_id, full_sync=False):
+    """
+    Start fetching a sync run's contacts: resolve its tenant, make sure the
+    tenant's token is fresh and enqueue the first page.
+    ``full_sync`` ignores the tenant's watermark.
+
+    The time spent per phase, the API calls and the queries made here are
+    recorded on the run, whether or not this succeeds.
+    """
+    SyncRun.objects.filter(pk=run_id).update(status=SyncRun.Status.RUNNING, started_at=timezone.now())
+    timer = PhaseTimer()
+    with count_queries() as queries, count_api_calls() as api_calls:
+        try:
+            with timer.phase("tenant"):
+                tenant_id = SyncRun.objects.values_list("tenant_id", flat=True).get(pk=run_id)
+                # Runs created without a tenant sync the default organisation.
+                tenant = XeroTenant.objects.get(tenant_id=tenant_id) if tenant_id else default_xero_tenant()
+                if tenant is None:
+                    raise XeroTenant.DoesNotExist("No Xero organisation is connected")
+            SyncRun.objects.filter(pk=run_id).update(tenant_id=tenant.tenant_id)
+            with timer.phase("token"), use_xero_tenant(tenant):
+                # Refresh up front so the first API call does not pay for it.
+                refresh_xero_token(margin=settings.XERO_TOKEN_REFRESH_MARGIN)
+        except Exception as e:
+            fail_sync_run(run_id, e)
+            raise
+        finally:
+            record_task_metrics(run_id, timer, api_calls, queries)
+
+    modified_since = None if full_sync else tenant.contacts_modified_since
+    fetch_contacts_page_task.apply_async(
+        args=[run_id, 1],
+        kwargs={"modified_since": modified_since.isoformat() if modified_since else None},
+    )
+
+
+@shared_task(bind=True, max_retries=None)
+def fetch_contacts_page_task(self, run_id, page, modified_since=None, watermark=None):
+    """
+    Fetch one page of a sync run's contacts and enqueue its ingest task.
+
+    A full page enqueues the fetch of the next one rather than fetching it
+    here. The next page therefore waits behind the work other tenants have
+    queued, so the workers take turns between organisations and a large one
+    cannot starve the rest. A tenant out of rate-limit budget is retried once
+    it has budget again, without holding a worker in the meantime. The
+    last page records the run's watermark, adapts the tenant's sync
+    interval and closes the run if its pages are all ingested.
+
+    Args:
+        run_id: The SyncRun's primary key.
+        page (int): The page to fetch, starting at 1.
+        modified_since (str, optional): ISO timestamp sent as If-Modified-Since.
+        watermark (str, optional): ISO timestamp of the latest UpdatedDateUTC
+            seen on earlier pages.
+    """
+    run = SyncRun.objects.only("status", "tenant_id").get(pk=run_id)
+    if run.status != SyncRun.Status.RUNNING:
+        return
+    tenant = XeroTenant.objects.get(tenant_id=run.tenant_id)
+    modified_since = datetime.fromisoformat(modified_since) if modified_since else None
+    watermark = datetime.fromisoformat(watermark) if watermark else modified_since
+    # The SDK sends any argument that is passed, even None, so only include
+    # the header when there is a watermark.
+    filters = {"if_modified_since": modified_since} if modified_since else {}
+
+    timer = PhaseTimer()
+    with count_queries() as queries, count_api_calls() as api_calls, use_xero_tenant(tenant):
+        try:
+            with timer.phase("fetch"):
+                contacts_page = get_contacts_page(AccountingApi(api_client), tenant.tenant_id, page, **filters)
+            contacts = contacts_page.contacts or []
+            for contact in contacts:
+                if contact.updated_date_utc and (watermark is None or contact.updated_date_utc > watermark):
+                    watermark = contact.updated_date_utc
+            if contacts:
+                with timer.phase("serialize"):
+                    payload_ref = store_payload(serialize(contacts_page))
+                sync_xero_contacts_task.apply_async(
+                    args=[payload_ref],
+                    kwargs={"run_id": str(run_id), "tenant_pk": tenant.pk},
+                )
+                SyncRun.objects.filter(pk=run_id).update(contacts_fetched=F("contacts_fetched") + len(contacts))
+        except XeroRateLimitExceeded as e:
+            raise self.retry(exc=e, countdown=e.wait)
+        except Exception as e:
+            fail_sync_run(run_id, e)
+            raise
+        finally:
+            record_task_metrics(run_id, timer, api_calls, queries)
+
+    if len(contacts) == settings.XERO_CONTACTS_PAGE_SIZE:
+        fetch_contacts_page_task.apply_async(
+            args=[run_id, page + 1],
+            kwargs={
+                "modified_since": modified_since.isoformat() if modified_since else None,
+                "watermark": watermark.isoformat() if watermark else None,
+            },
+        )
+        return
+
+    now = timezone.now()
+    if modified_since is not None and tenant.last_synced_at is not None:
+        # An incremental sync only fetches the contacts changed since the
+        # previous one, which gives the tenant's rate of change.
+        changes = SyncRun.objects.values_list("contacts_fetched", flat=True).get(pk=run_id)
+        adapt_sync_interval(tenant, changes, now - tenant.last_synced_at)
+    XeroTenant.objects.filter(pk=tenant.pk).update(last_synced_at=now)
+    SyncRun.objects.filter(pk=run_id).update(
+        pages_total=page if contacts else page - 1,
+        watermark=watermark if watermark != modified_since else None,
+    )
+    finish_sync_run_if_complete(run_id)
+
+
+def page_contacts(payload: dict) -> list[dict]:
+    """The contacts of a stored page that have a ContactID, ordered by it."""
+    return sorted(
+        (contact for contact in payload.get("Contacts") or [] if contact.get("ContactID")),
+        key=lambda contact: contact["ContactID"],
+    )
+
+
+@shared_task
+def sync_xero_contacts_task(payload_ref, run_id=None, tenant_pk=None):
+    """
+    Ingest one page of contacts, stored under ``payload_ref`` by
+    ``store_payload``. The page is split into chunks of
+    ``XERO_SYNC_CHUNK_SIZE`` contacts ordered by ContactID, and the chunks
+    are ingested in parallel by a chord whose callback merges their results
+    and deletes the page.
+
+    Chunk tasks are sent the page reference and their offsets, never the
+    contacts themselves. ``tenant_pk`` is the XeroTenant the contacts
+    belong to.
+    """
     try:
-        print("======== Syncing contacts =======")
-        settings.SYNC_XERO_SIGNALS = False
-        print("================================")
-        print("Is Signal On: ", settings.SYNC_XERO_SIGNALS)
-        contacts = contacts.get("Contacts")
-        for contact in contacts:
-            is_contact_supplier = contact.get("IsSupplier")
-            is_contact_customer = contact.get("IsCustomer")
-
-            contact_obj, created = Contact.objects.update_or_create(
-                xero_contact_id=contact.get("ContactID"),
-                defaults={
-                    "name": contact.get("Name"),
-                    "email": contact.get("EmailAddress", ""),
-                    "is_supplier": is_contact_supplier,
-                    "is_customer": is_contact_customer,
-                },
-            )
-            add_phone_info(contact, contact_obj)
-            add_address_info(contact, contact_obj)
-            add_contact_person_info(contact, contact_obj)
-    finally:
-        settings.SYNC_XERO_SIGNALS = True
-        print("================================")
-        print("Is Signal On: ", settings.SYNC_XERO_SIGNALS)
+        total = len(page_contacts(load_payload(payload_ref)))
+    except Exception as e:
+        if run_id:
+            fail_sync_run(run_id, e)
+        raise
+    chunk_size = settings.XERO_SYNC_CHUNK_SIZE
+    chunks = [
+        ingest_contacts_chunk_task.s(payload_ref, start, min(start + chunk_size, total), tenant_pk)
+        for start in range(0, total, chunk_size)
+    ]
+    callback = merge_ingest_results_task.s(run_id=run_id, payload_refs=[payload_ref])
+    if not chunks:
+        # A chord with an empty header never calls its body.
+        callback.delay([])
+        return
+    chord(chunks)(callback)
+
+
+@shared_task(bind=True, max_retries=3)
+def ingest_contacts_chunk_task(self, payload_ref, start, stop, tenant_pk=None):
+    """
+    Ingest contacts ``start`` to ``stop`` of a stored page in a single
+    transaction.
+
+    Transient database errors are retried for this chunk alone. Any other
+    error, or retries running out, is returned as a failed result that
+    names the chunk, so ``retry_failed_chunks_task`` can run it again.
+    Raising would make the chord fail the whole page.
+    """
+    contacts = []
+    with count_queries() as queries:
+        try:
+            tenant = XeroTenant.objects.get(pk=tenant_pk) if tenant_pk else None
+            contacts = page_contacts(load_payload(payload_ref))[start:stop]
+            result = save_contact_info({"Contacts": contacts}, chunk_size=len(contacts) or None, tenant=tenant)
+        except (OperationalError, InterfaceError) as e:
+            if self.request.retries < self.max_retries:
+                raise self.retry(exc=e, countdown=2 ** self.request.retries)
+            result = failed_ingest_result(contacts, stop - start, e)
+        except Exception as e:
+            result = failed_ingest_result(contacts, stop - start, e)
+        if result.get("failed"):
+            result["failed_chunks"] = [
+                {"payload_ref": payload_ref, "start": start, "stop": stop, "tenant_pk": tenant_pk}
+            ]
+    result["db_queries"] = queries["count"]
+    result["peak_rss_kb"] = peak_rss_kb()
+    return result
+
+
+def failed_ingest_result(contacts: list[dict], count: int, error: Exception) -> dict:
+    contact_ids = [contact["ContactID"] for contact in contacts]
+    logger.exception("Failed to ingest %s contacts", count, exc_info=error)
+    observe_ingest({"failed": count}, {})
+    return {
+        "created": 0,
+        "updated": 0,
+        "skipped": 0,
+        "failed": count,
+        "unknown_countries": {},
+        "timings": {},
+        "errors": [{"count": count, "contact_ids": contact_ids, "error": str(error)}],
+    }
+
+
+def merge_ingest_results(results: list[dict]) -> dict:
+    """Add up the results of several ingest chunks."""
+    merged = {
+        "created": 0,
+        "updated": 0,
+        "skipped": 0,
+        "failed": 0,
+        "db_queries": 0,
+        "peak_rss_kb": 0,
+        "unknown_countries": Counter(),
+        "timings": Counter(),
+        "errors": [],
+        "failed_chunks": [],
+    }
+    for result in results:
+        for key in ("created", "updated", "skipped", "failed", "db_queries"):
+            merged[key] += result.get(key, 0)
+        merged["peak_rss_kb"] = max(merged["peak_rss_kb"], result.get("peak_rss_kb", 0))
+        merged["unknown_countries"].update(result.get("unknown_countries", {}))
+        merged["timings"].update(result.get("timings", {}))
+        merged["errors"].extend(result.get("errors", []))
+        merged["failed_chunks"].extend(result.get("failed_chunks", []))
+    merged["unknown_countries"] = dict(merged["unknown_countries"])
+    merged["timings"] = dict(merged["timings"])
+    return merged
+
+
+@shared_task
+def merge_ingest_results_task(results, run_id=None, payload_refs=None):
+    """
+    Chord callback: merge chunk results into their sync run, record the
+    chunks that failed on it and delete the stored pages no failed chunk
+    still needs. Those are kept until ``XERO_PAYLOAD_TTL`` runs out, for
+    ``retry_failed_chunks_task``.
+    """
+    result = merge_ingest_results(results)
+    if run_id:
+        if result["failed_chunks"]:
+            with transaction.atomic():
+                run = SyncRun.objects.select_for_update().only("failed_chunks").get(pk=run_id)
+                run.failed_chunks = [*run.failed_chunks, *result["failed_chunks"]]
+                run.save(update_fields=["failed_chunks"])
+        record_sync_run_metrics(
+            run_id,
+            durations=result["timings"],
+            db_queries=result["db_queries"],
+            peak_rss=result["peak_rss_kb"],
+            error="".join(f"{error['count']} contacts: {error['error']}\n" for error in result["errors"]),
+            pages_done=1,
+            contacts_created=result["created"],
+            contacts_updated=result["updated"],
+            contacts_skipped=result["skipped"],
+            contacts_failed=result["failed"],
+        )
+        finish_sync_run_if_complete(run_id)
+    needed = {chunk["payload_ref"] for chunk in result["failed_chunks"]} if run_id else set()
+    for payload_ref in set(payload_refs or []) - needed:
+        delete_payload(payload_ref)
+    return result
+
+
+def retryable_sync_runs(queryset=None):
+    """
+    Failed runs that ``retry_failed_chunks_task`` can complete: every page
+    was fetched and merged, so the chunks recorded as failed are all that
+    is missing. A run whose fetch failed lacks pages that only a new sync
+    fetches.
+    """
+    queryset = SyncRun.objects.all() if queryset is None else queryset
+    return queryset.filter(status=SyncRun.Status.FAILED, pages_total=F("pages_done")).exclude(failed_chunks=[])
+
+
+@shared_task
+def retry_failed_chunks_task(run_id):
+    """
+    Ingest the chunks of a failed sync run that could not be written
+    again, from their stored pages, and close the run once they are done.
+    Runs that are not in ``retryable_sync_runs`` are left as they are.
+
+    The run is reopened with its failed count reduced by the retried
+    chunks, and the retry's chord counts as one more page, so a retry
+    where every chunk succeeds ends the run as succeeded and moves the
+    tenant's watermark forward. The run's error log is kept. Chunks whose
+    page has expired fail again, and only a new sync fetches them.
+    """
+    with transaction.atomic():
+        run = retryable_sync_runs().select_for_update().filter(pk=run_id).first()
+        if run is None:
+            logger.warning("Sync run %s has no failed chunks that can be retried", run_id)
+            return
+        chunks = run.failed_chunks
+        SyncRun.objects.filter(pk=run_id).update(
+            status=SyncRun.Status.RUNNING,
+            finished_at=None,
+            error=Concat(F("error"), Value(f"Retrying {len(chunks)} failed chunks\n")),
+            failed_chunks=[],
+            contacts_failed=F("contacts_failed") - sum(chunk["stop"] - chunk["start"] for chunk in chunks),
+            pages_total=F("pages_done") + 1,
+        )
+
+    signatures = [
+        ingest_contacts_chunk_task.s(chunk["payload_ref"], chunk["start"], chunk["stop"], chunk["tenant_pk"])
+        for chunk in chunks
+    ]
+    callback = merge_ingest_results_task.s(
+        run_id=str(run_id), payload_refs=[chunk["payload_ref"] for chunk in chunks]
+    )
+    chord(signatures)(callback)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether retrying the same work later may succeed."""
+    if isinstance(error, ApiException):
+        return error.status is None or error.status == 429 or error.status >= 500
+    return isinstance(error, (OperationalError, InterfaceError, HTTPError, ConnectionError, TimeoutError))
+
+
+@shared_task(bind=True, max_retries=5)
+def process_contact_webhook_events(self, tenant_id):
+    """
+    Fetch the contacts queued by webhook events for ``tenant_id`` in batches
+    of ``XERO_WEBHOOK_FETCH_BATCH_SIZE`` IDs per ``get_contacts`` call and
+    ingest them. Up to ``XERO_API_POOL_THREADS`` batches are fetched at once.
+
+    Batches that could not be saved are put back on the queue. The task is
+    retried once the tenant has rate-limit budget again, and with backoff
+    after transient database or network errors, since no new event may
+    come to schedule another run.
+    """
+    # Events arriving from here on schedule a new run rather than being
+    # folded into this one after it has finished draining.
+    clear_schedule(webhook_contacts_scheduled_key(tenant_id))
+    queue_key = webhook_contacts_queue_key(tenant_id)
+    tenant = XeroTenant.objects.filter(tenant_id=tenant_id, is_active=True).first()
+    if tenant is None:
+        logger.warning("Dropping contact events for unknown or disconnected tenant %s", tenant_id)
+        while pop_ids(queue_key, settings.XERO_WEBHOOK_FETCH_BATCH_SIZE):
+            pass
+        return
+    accounting_api = AccountingApi(api_client)
+
+    def fetch_contacts(contact_ids):
+        return accounting_api.get_contacts(xero_tenant_id=tenant_id, i_ds=contact_ids, include_archived=True)
+
+    with use_xero_tenant(tenant):
+        while True:
+            batches = []
+            while len(batches) < settings.XERO_API_POOL_THREADS and (
+                contact_ids := pop_ids(queue_key, settings.XERO_WEBHOOK_FETCH_BATCH_SIZE)
+            ):
+                batches.append(contact_ids)
+            if not batches:
+                break
+            try:
+                for contacts in map_concurrently(fetch_contacts, batches):
+                    save_contact_info(serialize(contacts), tenant=tenant)
+                    batches.pop(0)
+            except Exception as e:
+                # Put the unsaved batches back so a retry or the next event
+                # picks them up.
+                for contact_ids in batches:
+                    push_ids(queue_key, contact_ids)
+                if isinstance(e, XeroRateLimitExceeded):
+                    raise self.retry(exc=e, countdown=e.wait, max_retries=None)
+                if is_transient_error(e):
+                    raise self.retry(exc=e, countdown=5 * 2 ** self.request.retries)
+                raise
+
+
+def push_contacts_by_tenant(contacts) -> dict:
+    """
+    Push contacts to the organisations they belong to. Contacts without a
+    tenant are pushed to the default one, and belong to it from then on.
+    Contacts of disconnected tenants are left alone.
+
+    Returns:
+        dict: Number of contacts ``pushed`` and ``failed``.
+    """
+    totals = Counter(pushed=0, failed=0)
+    tenant_pks = set(contacts.values_list("tenant_id", flat=True).distinct())
+    default = None
+    if None in tenant_pks:
+        tenant_pks.discard(None)
+        default = default_xero_tenant()
+        if default:
+            tenant_pks.add(default.pk)
+    for tenant in XeroTenant.objects.filter(is_active=True, pk__in=tenant_pks):
+        tenant_contacts = contacts.filter(tenant=tenant)
+        if default and tenant.pk == default.pk:
+            tenant_contacts = contacts.filter(Q(tenant=tenant) | Q(tenant__isnull=True))
+        with use_xero_tenant(tenant):
+            totals.update(push_contacts_to_xero(tenant_contacts, tenant, api_client))
+    return dict(totals)
+
+
+@shared_task
+def push_xero_contacts_task(contact_ids=None):
+    """
+    Push local contacts to Xero. Pushes the given ``contact_ids``, or every
+    contact that has not been linked to Xero yet.
+    """
+    contacts = Contact.objects.all()
+    if contact_ids is not None:
+        contacts = contacts.filter(pk__in=contact_ids)
+    else:
+        contacts = contacts.filter(xero_contact_id__isnull=True)
+    return push_contacts_by_tenant(contacts)
+
+
+@shared_task
+def flush_outbound_contacts_task():
+    """
+    Push the contacts marked dirty by local edits since the last flush.
+    Scheduled with a debounce, so a burst of edits becomes one push.
+    """
+    clear_schedule(OUTBOUND_CONTACTS_SCHEDULED_KEY)
+
+    while contact_ids := pop_ids(OUTBOUND_CONTACTS_QUEUE_KEY, settings.XERO_OUTBOUND_FLUSH_SIZE):
+        try:
+            push_contacts_by_tenant(Contact.objects.filter(pk__in=contact_ids))
+        except Exception:
+            push_ids(OUTBOUND_CONTACTS_QUEUE_KEY, contact_ids)
+            raise
@@ -1,3 +1,1078 @@
-from django.test import TestCase
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from phonenumber_field.phonenumber import PhoneNumber
+from xero_python.accounting import Contact as XeroContact
+from xero_python.accounting import Contacts as XeroContacts
+from xero_python.accounting import ValidationError
+from xero_python.exceptions import ApiException
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401, fakeredis runs Lua scripts with it
+except ImportError:
+    fakeredis = None
+
+from xero_integration.xero import client, importer, outbound, ratelimit, signals, tasks, utils
+from xero_integration.xero.api import encode_cursor
+from xero_integration.xero.ratelimit import XeroRateLimiter, XeroRateLimitExceeded
+from xero_integration.xero.schedules import next_sync_interval
+from commons.utils import ValidatedPhoneNumber
+from xero_integration.xero.models import Contact, ContactPhoneNumber, SyncRun, XeroTenant
+from xero_integration.xero.tasks import (
+    fetch_contacts_page_task,
+    finish_sync_run_if_complete,
+    merge_ingest_results_task,
+    retry_failed_chunks_task,
+)
+from xero_integration.xero.utils import (
+    bulk_upsert_contacts,
+    country_code_for,
+    normalize_phone_number,
+    parse_phone_number,
+    reconcile_children,
+    save_contact_info,
+    suppress_xero_sync,
+    transform_contact,
+    xero_sync_enabled,
+)
+from xero_integration.xero.webhooks import is_valid_webhook_signature
+
+
+# Contact versions are cached and local changes are queued for Xero in
+# Redis, so the tests use a local cache and leave outbound pushes off.
+TEST_SETTINGS = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "SYNC_XERO_SIGNALS": False,
+    "XERO_READ_API_KEY": "test-key",
+}
+
+
+def xero_contact(index: int, **fields) -> dict:
+    return {
+        "ContactID": f"{index:08d}-0000-0000-0000-000000000000",
+        "Name": f"Contact {index}",
+        "EmailAddress": f"contact{index}@example.com",
+        "Phones": [{"PhoneType": "DEFAULT", "PhoneNumber": "+6494001234"}],
+        **fields,
+    }
+
+
+def records_for(*contacts) -> dict:
+    return {contact["ContactID"]: transform_contact(contact) for contact in contacts}
+
+
+@override_settings(**TEST_SETTINGS)
+class BulkUpsertContactsTests(TestCase):
+    def setUp(self):
+        self.tenant = XeroTenant.objects.create(tenant_id="tenant-1")
+
+    def test_counts_created_and_updated(self):
+        bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+
+        contact_objs, created, updated, _ = bulk_upsert_contacts(
+            records_for(xero_contact(1, EmailAddress="new@example.com"), xero_contact(2)),
+            self.tenant,
+        )
+
+        self.assertEqual((created, updated), (1, 1))
+        self.assertEqual(set(contact_objs), {xero_contact(1)["ContactID"], xero_contact(2)["ContactID"]})
+        self.assertEqual(Contact.objects.get(xero_contact_id=xero_contact(1)["ContactID"]).email, "new@example.com")
+
+    def test_returns_stored_ids(self):
+        bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+
+        contact_objs, *_ = bulk_upsert_contacts(
+            records_for(xero_contact(1, Name="Renamed"), xero_contact(2)), self.tenant
+        )
+
+        for xero_contact_id, contact_obj in contact_objs.items():
+            self.assertEqual(contact_obj.pk, Contact.objects.get(xero_contact_id=xero_contact_id).pk)
+
+
+@override_settings(**TEST_SETTINGS)
+class SaveContactInfoTests(TestCase):
+    def setUp(self):
+        self.tenant = XeroTenant.objects.create(tenant_id="tenant-1")
+
+    def test_writes_in_chunks(self):
+        contacts = {"Contacts": [xero_contact(index) for index in range(5)]}
+
+        with mock.patch.object(utils, "bulk_upsert_contacts", wraps=bulk_upsert_contacts) as upsert:
+            result = save_contact_info(contacts, chunk_size=2, tenant=self.tenant)
+
+        self.assertEqual([len(call.args[0]) for call in upsert.call_args_list], [2, 2, 1])
+        self.assertEqual((result["created"], result["updated"]), (5, 0))
+        self.assertEqual(Contact.objects.filter(tenant=self.tenant).count(), 5)
+        self.assertEqual(ContactPhoneNumber.objects.count(), 5)
+
+    def test_last_occurrence_of_a_contact_wins(self):
+        result = save_contact_info(
+            {"Contacts": [xero_contact(1), xero_contact(1, Name="Renamed"), {"Name": "No ContactID"}]},
+            tenant=self.tenant,
+        )
+
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(Contact.objects.get().name, "Renamed")
+
+
+class CountryCodeTests(TestCase):
+    def test_resolves_names_aliases_and_codes(self):
+        for value, code in [
+            ("New Zealand", "NZ"),
+            ("  new   ZEALAND ", "NZ"),
+            ("NZ", "NZ"),
+            ("NZL", "NZ"),
+            ("UK", "GB"),
+            ("Vietnam", "VN"),
+            ("Viet Nam", "VN"),
+            ("South Korea", "KR"),
+            ("Korea, Republic of", "KR"),
+            ("Korea (the Republic of)", "KR"),
+            ("Korea, Democratic People's Republic of", "KP"),
+            ("Iran, Islamic Republic of", "IR"),
+            ("Tanzania, United Republic of", "TZ"),
+            ("Virgin Islands, British", "VG"),
+            ("Swaziland", "SZ"),
+        ]:
+            with self.subTest(value=value):
+                self.assertEqual(country_code_for(value), code)
+
+    def test_unknown_country(self):
+        self.assertIsNone(country_code_for("Narnia"))
+
+    def test_unknown_countries_are_tallied(self):
+        unknown_countries = Counter()
+        record = transform_contact(
+            xero_contact(1, Addresses=[{"AddressType": "STREET", "City": "Cair Paravel", "Country": "Narnia"}]),
+            unknown_countries,
+        )
+
+        self.assertIsNone(record["addresses"]["STREET"]["country"])
+        self.assertEqual(unknown_countries, {"Narnia": 1})
+
+
+@override_settings(**TEST_SETTINGS)
+class SyncStatusTests(TestCase):
+    def setUp(self):
+        self.run = SyncRun.objects.create(tenant_id="tenant-1", status=SyncRun.Status.RUNNING, pages_done=2)
+        self.url = reverse("sync_xero_contacts_status", args=[self.run.pk])
+
+    def test_requires_api_key_or_staff(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.assertEqual(self.client.get(self.url, HTTP_X_API_KEY="wrong").status_code, 401)
+        self.client.force_login(User.objects.create_user("user"))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_reports_progress(self):
+        body = self.client.get(self.url, HTTP_X_API_KEY="test-key").json()
+
+        self.assertEqual(
+            (body["job_id"], body["status"], body["tenant_id"], body["pages_done"]),
+            (str(self.run.pk), "RUNNING", "tenant-1", 2),
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class RefreshXeroTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # The Redis cache's lock, shared by every thread here.
+        lock = threading.Lock()
+        patcher = mock.patch.object(LocMemCache, "lock", lambda *args, **kwargs: lock, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def store_token(self, access_token: str, expires_in: float) -> dict:
+        token = {"access_token": access_token, "refresh_token": "refresh", "expires_at": time.time() + expires_in}
+        client.store_xero_oauth2_token(token)
+        return client.obtain_xero_oauth2_token()
+
+    def refresh_to(self, access_token: str):
+        def refresh():
+            # Slow enough for every caller to queue on the lock.
+            time.sleep(0.1)
+            return self.store_token(access_token, 1800)
+
+        return mock.patch.object(client.api_client, "refresh_oauth2_token", side_effect=refresh)
+
+    def test_returns_cached_token_when_not_expiring(self):
+        token = self.store_token("current", 1800)
+
+        with self.refresh_to("new") as refresh:
+            self.assertEqual(client.refresh_xero_token(margin=60), token)
+
+        refresh.assert_not_called()
+
+    def test_refreshes_expiring_token(self):
+        self.store_token("current", 30)
+
+        with self.refresh_to("new") as refresh:
+            token = client.refresh_xero_token(margin=60)
+
+        refresh.assert_called_once()
+        self.assertEqual(token["access_token"], "new")
+
+    def test_force_refreshes(self):
+        self.store_token("current", 1800)
+
+        with self.refresh_to("new") as refresh:
+            client.refresh_xero_token(force=True)
+
+        refresh.assert_called_once()
+
+    def test_without_token(self):
+        with self.refresh_to("new") as refresh:
+            self.assertIsNone(client.refresh_xero_token(margin=60))
+
+        refresh.assert_not_called()
+
+    def test_concurrent_callers_refresh_once(self):
+        self.store_token("current", 30)
+        results = []
+
+        def call():
+            results.append(client.refresh_xero_token(margin=60)["access_token"])
+
+        with self.refresh_to("new") as refresh:
+            threads = [threading.Thread(target=call) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        refresh.assert_called_once()
+        self.assertEqual(results, ["new"] * 4)
+
+
+@override_settings(WEBHOOK_KEY="webhook-key")
+class WebhookSignatureTests(TestCase):
+    body = b'{"events":[],"firstEventSequence":0,"lastEventSequence":0,"entropy":"x"}'
+
+    def sign(self, body: bytes, key: str = "webhook-key") -> str:
+        return base64.b64encode(hmac.new(key.encode(), body, hashlib.sha256).digest()).decode()
+
+    def test_valid_signature(self):
+        self.assertTrue(is_valid_webhook_signature(self.body, self.sign(self.body)))
+
+    def test_invalid_signatures(self):
+        for signature in [self.sign(self.body, "other-key"), self.sign(self.body + b" "), "not base64", ""]:
+            with self.subTest(signature=signature):
+                self.assertFalse(is_valid_webhook_signature(self.body, signature))
+
+    def test_missing_signature(self):
+        self.assertFalse(is_valid_webhook_signature(self.body, None))
+
+    @override_settings(WEBHOOK_KEY=None)
+    def test_rejects_everything_without_a_webhook_key(self):
+        self.assertFalse(is_valid_webhook_signature(self.body, self.sign(self.body)))
+
+
+class FakeClock:
+    """Stands in for the ``time`` module, with sleeps that pass instantly."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(round(seconds, 2))
+        self.now += seconds
+
+
+@skipUnless(fakeredis, "fakeredis and lupa are needed to run the limiter's Lua scripts")
+@override_settings(
+    XERO_RATE_LIMIT_PER_MINUTE=5,
+    XERO_RATE_LIMIT_CONCURRENCY=2,
+    XERO_RATE_LIMIT_PER_DAY=100,
+    XERO_RATE_LIMIT_MAX_WAIT=30,
+)
+class XeroRateLimiterTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = XeroRateLimiter()
+        redis = fakeredis.FakeRedis()
+        patches = ExitStack()
+        patches.enter_context(mock.patch.object(ratelimit, "get_redis_connection", return_value=redis))
+        patches.enter_context(mock.patch.object(ratelimit, "time", self.clock))
+        self.addCleanup(patches.close)
+
+    def call(self, tenant_id: str = "tenant-1") -> None:
+        with self.limiter.slot(tenant_id):
+            pass
+
+    def test_allows_the_per_minute_limit(self):
+        for _ in range(5):
+            self.call()
+        self.assertEqual(self.clock.sleeps, [])
+
+        with self.assertRaises(XeroRateLimitExceeded) as raised:
+            self.call()
+        self.assertEqual(raised.exception.wait, 60)
+
+        # Other tenants have their own budget.
+        self.call("tenant-2")
+
+    @override_settings(XERO_RATE_LIMIT_MAX_WAIT=90)
+    def test_window_slides(self):
+        for _ in range(5):
+            self.call()
+            self.clock.now += 10
+
+        # The first call leaves the window 60s after it was made.
+        self.call()
+        self.assertEqual(self.clock.sleeps, [10])
+
+    def test_concurrency_limit(self):
+        with self.limiter.slot("tenant-1"), self.limiter.slot("tenant-1"):
+            self.assertEqual(self.limiter.try_acquire("tenant-1", "third"), 0.05)
+        self.assertEqual(self.limiter.try_acquire("tenant-1", "third"), 0)
+
+    def test_429_pauses_the_tenant(self):
+        self.limiter.record_response(
+            "tenant-1", {"Retry-After": "20", "X-Rate-Limit-Problem": "minute"}, status=429
+        )
+
+        self.call("tenant-2")
+        self.assertEqual(self.clock.sleeps, [])
+        self.call()
+        self.assertEqual(self.clock.sleeps, [20])
+
+    def test_429_longer_than_max_wait(self):
+        self.limiter.record_response("tenant-1", {"Retry-After": "45"}, status=429)
+
+        with self.assertRaises(XeroRateLimitExceeded) as raised:
+            self.call()
+        self.assertEqual(raised.exception.wait, 45)
+
+    def test_minute_remaining_header(self):
+        self.call()
+        # Other clients of the organisation made two more calls.
+        self.limiter.record_response("tenant-1", {"X-MinLimit-Remaining": "2"})
+
+        self.call()
+        self.call()
+        with self.assertRaises(XeroRateLimitExceeded):
+            self.call()
+
+
+@override_settings(**TEST_SETTINGS, XERO_PUSH_BATCH_SIZE=2)
+class PushContactsTests(TestCase):
+    def setUp(self):
+        self.tenant = XeroTenant.objects.create(tenant_id="tenant-1")
+        self.linked = Contact.objects.create(
+            tenant=self.tenant, name="Linked", xero_contact_id="11111111-0000-0000-0000-000000000000"
+        )
+        self.new = Contact.objects.create(name="New")
+        ContactPhoneNumber.objects.create(company_name=self.new, phone_label="MOBILE", phone_number="+64211234567")
+        self.rejected = Contact.objects.create(name="Rejected")
+        self.sent = []
+
+    def update_or_create_contacts(self, xero_tenant_id, contacts, summarize_errors):
+        """Answer like Xero: one result per contact, in the order sent."""
+        self.sent.extend(contacts.contacts)
+        results = []
+        for contact in contacts.contacts:
+            if contact.name == "Rejected":
+                results.append(
+                    XeroContact(
+                        name=contact.name,
+                        has_validation_errors=True,
+                        validation_errors=[ValidationError(message="Name is invalid")],
+                    )
+                )
+            else:
+                results.append(XeroContact(name=contact.name, contact_id=contact.contact_id or uuid.uuid4()))
+        return XeroContacts(contacts=results)
+
+    def push(self):
+        api_client = mock.Mock(pool_threads=1)
+        with mock.patch.object(outbound, "AccountingApi") as accounting_api:
+            accounting_api.return_value.update_or_create_contacts.side_effect = self.update_or_create_contacts
+            return outbound.push_contacts_to_xero(Contact.objects.all(), self.tenant, api_client)
+
+    def test_maps_results_back_to_contacts(self):
+        self.assertEqual(self.push(), {"pushed": 2, "failed": 1})
+
+        for contact in (self.linked, self.new, self.rejected):
+            contact.refresh_from_db()
+        self.assertEqual(self.linked.xero_contact_id, "11111111-0000-0000-0000-000000000000")
+        self.assertIsNotNone(self.new.xero_contact_id)
+        self.assertEqual(self.new.tenant, self.tenant)
+        self.assertIsNone(self.rejected.xero_contact_id)
+        self.assertIsNone(self.rejected.tenant)
+
+    def test_builds_payloads(self):
+        self.push()
+
+        sent = {contact.name: contact for contact in self.sent}
+        self.assertEqual(set(sent), {"Linked", "New", "Rejected"})
+        self.assertEqual(sent["Linked"].contact_id, "11111111-0000-0000-0000-000000000000")
+        self.assertIsNone(sent["New"].contact_id)
+        self.assertEqual(
+            [(phone.phone_type, phone.phone_country_code, phone.phone_number) for phone in sent["New"].phones],
+            [("MOBILE", "64", "211234567")],
+        )
+
+
+@override_settings(**{**TEST_SETTINGS, "SYNC_XERO_SIGNALS": True}, XERO_OUTBOUND_DEBOUNCE=30)
+class OutboundQueueTests(TestCase):
+    def setUp(self):
+        patches = ExitStack()
+        self.push_ids = patches.enter_context(mock.patch.object(signals, "push_ids"))
+        self.schedule_once = patches.enter_context(mock.patch.object(signals, "schedule_once"))
+        self.addCleanup(patches.close)
+
+    def queued(self) -> list[str]:
+        return [contact_id for call in self.push_ids.call_args_list for contact_id in call.args[1]]
+
+    def test_saved_contact_is_queued_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            contact = Contact.objects.create(name="Contact")
+            self.push_ids.assert_not_called()
+
+        self.assertEqual(self.queued(), [str(contact.pk)])
+        self.schedule_once.assert_called_with(
+            signals.OUTBOUND_CONTACTS_SCHEDULED_KEY,
+            signals.flush_outbound_contacts_task,
+            args=[],
+            countdown=30,
+        )
+
+    def test_changed_child_queues_its_contact(self):
+        with suppress_xero_sync():
+            contact = Contact.objects.create(name="Contact")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ContactPhoneNumber.objects.create(company_name=contact, phone_label="MOBILE", phone_number="+64211234567")
+
+        self.assertEqual(self.queued(), [str(contact.pk)])
+
+    def test_suppressed_changes_are_not_queued(self):
+        with self.captureOnCommitCallbacks(execute=True), suppress_xero_sync():
+            Contact.objects.create(name="Contact")
+
+        self.push_ids.assert_not_called()
+        self.assertTrue(xero_sync_enabled())
+
+    def test_rolled_back_changes_are_not_queued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Contact.objects.create(name="Contact")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.push_ids.assert_not_called()
+
+    @override_settings(SYNC_XERO_SIGNALS=False)
+    def test_global_switch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Contact.objects.create(name="Contact")
+
+        self.push_ids.assert_not_called()
+
+    def test_suppression_is_local_to_the_context(self):
+        seen = {}
+        with suppress_xero_sync():
+            with suppress_xero_sync():
+                pass
+            seen["nested"] = xero_sync_enabled()
+            thread = threading.Thread(target=lambda: seen.update(thread=xero_sync_enabled()))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(seen, {"nested": False, "thread": True})
+        self.assertTrue(xero_sync_enabled())
+
+
+@override_settings(**TEST_SETTINGS)
+class ReconcileChildrenTests(TestCase):
+    def setUp(self):
+        self.contact = Contact.objects.create(name="Contact")
+
+    def reconcile(self, desired: dict) -> dict:
+        return reconcile_children(
+            ContactPhoneNumber,
+            [self.contact.pk],
+            {(self.contact.pk, label): row for label, row in desired.items()},
+            key=lambda obj: (obj.company_name_id, obj.phone_label),
+            fields=["phone_number"],
+        )
+
+    def phones(self) -> dict:
+        return {
+            phone.phone_label: str(phone.phone_number)
+            for phone in ContactPhoneNumber.objects.filter(company_name=self.contact)
+        }
+
+    def test_creates_updates_and_deletes(self):
+        ContactPhoneNumber.objects.create(company_name=self.contact, phone_label="DEFAULT", phone_number="+6494001234")
+        ContactPhoneNumber.objects.create(company_name=self.contact, phone_label="FAX", phone_number="+6494001235")
+        ContactPhoneNumber.objects.create(company_name=self.contact, phone_label="DDI", phone_number="+6494001236")
+
+        result = self.reconcile(
+            {
+                "DEFAULT": {"phone_label": "DEFAULT", "phone_number": "+6494001234"},
+                "FAX": {"phone_label": "FAX", "phone_number": "+6494009999"},
+                "MOBILE": {"phone_label": "MOBILE", "phone_number": "+64211234567"},
+            }
+        )
+
+        self.assertEqual(result, {"created": 1, "updated": 1, "deleted": 1})
+        self.assertEqual(
+            self.phones(), {"DEFAULT": "+6494001234", "FAX": "+6494009999", "MOBILE": "+64211234567"}
+        )
+
+    def test_deletes_duplicate_keys(self):
+        ContactPhoneNumber.objects.create(company_name=self.contact, phone_label="DEFAULT", phone_number="+6494001234")
+        ContactPhoneNumber.objects.create(company_name=self.contact, phone_label="DEFAULT", phone_number="+6494001235")
+
+        result = self.reconcile({"DEFAULT": {"phone_label": "DEFAULT", "phone_number": "+6494001234"}})
+
+        self.assertEqual(result["deleted"], 1)
+        self.assertEqual(ContactPhoneNumber.objects.filter(company_name=self.contact).count(), 1)
+
+    def test_unchanged_rows_are_not_written(self):
+        ContactPhoneNumber.objects.create(company_name=self.contact, phone_label="DEFAULT", phone_number="+6494001234")
+
+        with self.assertNumQueries(1):
+            result = self.reconcile({"DEFAULT": {"phone_label": "DEFAULT", "phone_number": "+6494001234"}})
+
+        self.assertEqual(result, {"created": 0, "updated": 0, "deleted": 0})
+
+    def test_leaves_other_contacts_alone(self):
+        other = Contact.objects.create(name="Other")
+        ContactPhoneNumber.objects.create(company_name=other, phone_label="DEFAULT", phone_number="+6494001234")
+
+        self.reconcile({})
+
+        self.assertEqual(ContactPhoneNumber.objects.filter(company_name=other).count(), 1)
+
+
+@override_settings(**TEST_SETTINGS)
+class ContactFingerprintTests(TestCase):
+    def setUp(self):
+        self.tenant = XeroTenant.objects.create(tenant_id="tenant-1")
+
+    def fingerprint(self, contact: dict) -> str:
+        return transform_contact(contact)["fields"]["sync_fingerprint"]
+
+    def test_ignores_unstored_fields_and_child_order(self):
+        phones = [
+            {"PhoneType": "DEFAULT", "PhoneNumber": "+6494001234"},
+            {"PhoneType": "MOBILE", "PhoneNumber": "+64211234567"},
+        ]
+        fingerprint = self.fingerprint(xero_contact(1, Phones=phones))
+
+        self.assertEqual(self.fingerprint(xero_contact(1, Phones=phones[::-1])), fingerprint)
+        self.assertEqual(self.fingerprint(xero_contact(1, Phones=phones, UpdatedDateUTC="/Date(0)/")), fingerprint)
+        self.assertNotEqual(self.fingerprint(xero_contact(1, Phones=phones[:1])), fingerprint)
+
+    def test_skips_unchanged_contacts(self):
+        contact_objs, *_ = bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+        self.assertEqual(
+            Contact.objects.get().sync_fingerprint, contact_objs[xero_contact(1)["ContactID"]].sync_fingerprint
+        )
+
+        # The two reads, and no write.
+        with self.assertNumQueries(2):
+            contact_objs, created, updated, skipped = bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+
+        self.assertEqual((contact_objs, created, updated, skipped), ({}, 0, 0, 1))
+
+    def test_rewrites_contact_moved_to_another_tenant(self):
+        bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+        other = XeroTenant.objects.create(tenant_id="tenant-2")
+
+        _, created, updated, skipped = bulk_upsert_contacts(records_for(xero_contact(1)), other)
+
+        self.assertEqual((created, updated, skipped), (0, 1, 0))
+        self.assertEqual(Contact.objects.get().tenant, other)
+
+    def test_skipped_contacts_keep_their_children(self):
+        save_contact_info({"Contacts": [xero_contact(1), xero_contact(2)]}, tenant=self.tenant)
+
+        result = save_contact_info({"Contacts": [xero_contact(1), xero_contact(2, Phones=[])]}, tenant=self.tenant)
+
+        self.assertEqual((result["created"], result["updated"], result["skipped"]), (0, 1, 1))
+        self.assertEqual(
+            list(ContactPhoneNumber.objects.values_list("company_name__xero_contact_id", flat=True)),
+            [xero_contact(1)["ContactID"]],
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class NormalizePhoneNumberTests(TestCase):
+    def test_valid_numbers(self):
+        for parts in [
+            ("64", "9", "4001234"),
+            ("+64", "09", "400 1234"),
+            (None, None, "+64 9 400 1234"),
+            (None, None, "09 400 1234", "NZ"),
+        ]:
+            with self.subTest(parts=parts):
+                phone_number = normalize_phone_number(*parts)
+                self.assertIsInstance(phone_number, ValidatedPhoneNumber)
+                self.assertEqual(str(phone_number), "+6494001234")
+
+    def test_possible_number_is_kept_in_e164(self):
+        phone_number = normalize_phone_number("1", "", "555-1234")
+
+        self.assertIsInstance(phone_number, PhoneNumber)
+        self.assertFalse(phone_number.is_valid())
+        self.assertEqual(str(phone_number), "+15551234")
+
+    def test_impossible_number_is_kept_as_sent(self):
+        self.assertEqual(normalize_phone_number("44", "", "12"), "4412")
+        self.assertEqual(normalize_phone_number(None, None, "ext 12"), "ext 12")
+
+    def test_parses_are_memoized(self):
+        parse_phone_number.cache_clear()
+
+        for _ in range(3):
+            normalize_phone_number("64", "9", "4001234")
+
+        self.assertEqual((parse_phone_number.cache_info().misses, parse_phone_number.cache_info().hits), (1, 2))
+
+    def test_saved_numbers(self):
+        phones = [
+            {"PhoneType": "DEFAULT", "PhoneCountryCode": "64", "PhoneAreaCode": "9", "PhoneNumber": "4001234"},
+            {"PhoneType": "MOBILE", "PhoneNumber": "021 123 4567"},
+            {"PhoneType": "FAX", "PhoneCountryCode": "1", "PhoneNumber": "555-1234"},
+        ]
+        addresses = [{"AddressType": "STREET", "Country": "New Zealand"}]
+
+        save_contact_info({"Contacts": [xero_contact(1, Phones=phones, Addresses=addresses)]})
+
+        self.assertEqual(
+            dict(ContactPhoneNumber.objects.values_list("phone_label", "phone_number")),
+            {"DEFAULT": "+6494001234", "MOBILE": "+64211234567", "FAX": "+15551234"},
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class MergeIngestResultsTests(TestCase):
+    watermark = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def setUp(self):
+        self.tenant = XeroTenant.objects.create(tenant_id="tenant-1")
+        self.run = SyncRun.objects.create(
+            tenant_id=self.tenant.tenant_id,
+            status=SyncRun.Status.RUNNING,
+            pages_total=1,
+            watermark=self.watermark,
+        )
+
+    def chunk_result(self, created=0, failed=0, start=0) -> dict:
+        result = {"created": created, "updated": 0, "skipped": 0, "failed": failed, "db_queries": 3}
+        if failed:
+            result["errors"] = [{"count": failed, "contact_ids": [], "error": "boom"}]
+            result["failed_chunks"] = [
+                {"payload_ref": "page-1", "start": start, "stop": start + failed, "tenant_pk": self.tenant.pk}
+            ]
+        return result
+
+    def merge(self, results):
+        with mock.patch("xero_integration.xero.tasks.delete_payload") as delete_payload:
+            merge_ingest_results_task(results, run_id=str(self.run.pk), payload_refs=["page-1"])
+        self.run.refresh_from_db()
+        self.tenant.refresh_from_db()
+        return delete_payload
+
+    def test_success_closes_run_and_advances_watermark(self):
+        delete_payload = self.merge([self.chunk_result(created=2), self.chunk_result(created=3)])
+
+        self.assertEqual(self.run.status, SyncRun.Status.SUCCEEDED)
+        self.assertEqual((self.run.pages_done, self.run.contacts_created, self.run.db_queries), (1, 5, 6))
+        self.assertEqual(self.tenant.contacts_modified_since, self.watermark)
+        delete_payload.assert_called_once_with("page-1")
+
+    def test_failed_chunk_fails_run_and_keeps_payload(self):
+        delete_payload = self.merge([self.chunk_result(created=2), self.chunk_result(failed=2, start=2)])
+
+        self.assertEqual(self.run.status, SyncRun.Status.FAILED)
+        self.assertEqual((self.run.contacts_created, self.run.contacts_failed), (2, 2))
+        self.assertEqual(
+            self.run.failed_chunks,
+            [{"payload_ref": "page-1", "start": 2, "stop": 4, "tenant_pk": self.tenant.pk}],
+        )
+        self.assertIn("2 contacts: boom", self.run.error)
+        self.assertIsNone(self.tenant.contacts_modified_since)
+        delete_payload.assert_not_called()
+
+    def test_run_stays_open_until_every_page_is_ingested(self):
+        SyncRun.objects.filter(pk=self.run.pk).update(pages_total=2)
+
+        self.merge([self.chunk_result(created=1)])
+
+        self.assertEqual(self.run.status, SyncRun.Status.RUNNING)
+        self.assertIsNone(self.tenant.contacts_modified_since)
+
+    def test_run_stays_open_while_pages_are_fetched(self):
+        SyncRun.objects.filter(pk=self.run.pk).update(pages_total=None)
+
+        finish_sync_run_if_complete(self.run.pk)
+
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.status, SyncRun.Status.RUNNING)
+
+
+@override_settings(**TEST_SETTINGS)
+class RetryFailedChunksTests(TestCase):
+    watermark = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def setUp(self):
+        self.tenant = XeroTenant.objects.create(tenant_id="tenant-1")
+        self.chunk = {"payload_ref": "page-1", "start": 0, "stop": 2, "tenant_pk": self.tenant.pk}
+        self.run = SyncRun.objects.create(
+            tenant_id=self.tenant.tenant_id,
+            status=SyncRun.Status.FAILED,
+            pages_total=1,
+            pages_done=1,
+            contacts_created=3,
+            contacts_failed=2,
+            failed_chunks=[self.chunk],
+            error="2 contacts: boom\n",
+            watermark=self.watermark,
+        )
+
+    def retry(self):
+        with mock.patch("xero_integration.xero.tasks.chord") as chord:
+            retry_failed_chunks_task(str(self.run.pk))
+        self.run.refresh_from_db()
+        return chord
+
+    def test_reopens_run_and_retries_its_chunks(self):
+        chord = self.retry()
+
+        (signatures,), _ = chord.call_args
+        self.assertEqual([signature.args for signature in signatures], [("page-1", 0, 2, self.tenant.pk)])
+        self.assertEqual(self.run.status, SyncRun.Status.RUNNING)
+        self.assertEqual((self.run.pages_total, self.run.contacts_failed, self.run.failed_chunks), (2, 0, []))
+        self.assertEqual(self.run.error, "2 contacts: boom\nRetrying 1 failed chunks\n")
+
+        with mock.patch("xero_integration.xero.tasks.delete_payload") as delete_payload:
+            merge_ingest_results_task([{"created": 2}], run_id=str(self.run.pk), payload_refs=["page-1"])
+
+        self.run.refresh_from_db()
+        self.tenant.refresh_from_db()
+        self.assertEqual(self.run.status, SyncRun.Status.SUCCEEDED)
+        self.assertEqual(self.run.contacts_created, 5)
+        self.assertEqual(self.tenant.contacts_modified_since, self.watermark)
+        delete_payload.assert_called_once_with("page-1")
+
+    def test_does_not_retry_a_run_whose_fetch_failed(self):
+        # Page 1 was ingested with a failed chunk, then fetching page 2 failed.
+        SyncRun.objects.filter(pk=self.run.pk).update(status=SyncRun.Status.RUNNING, pages_total=None)
+        with mock.patch(
+            "xero_integration.xero.tasks.get_contacts_page", side_effect=ApiException(status=400, reason="Bad Request")
+        ), self.assertRaises(ApiException):
+            fetch_contacts_page_task.apply(args=[str(self.run.pk), 2], throw=True)
+        self.run.refresh_from_db()
+        self.assertEqual(self.run.status, SyncRun.Status.FAILED)
+        error = self.run.error
+
+        chord = self.retry()
+
+        chord.assert_not_called()
+        self.assertEqual(self.run.status, SyncRun.Status.FAILED)
+        self.assertEqual(self.run.failed_chunks, [self.chunk])
+        self.assertEqual(self.run.error, error)
+        self.assertIn("Bad Request", self.run.error)
+        self.tenant.refresh_from_db()
+        self.assertIsNone(self.tenant.contacts_modified_since)
+
+    def test_does_not_retry_a_run_with_unmerged_pages(self):
+        SyncRun.objects.filter(pk=self.run.pk).update(pages_total=2)
+
+        self.retry().assert_not_called()
+
+        self.assertEqual(self.run.status, SyncRun.Status.FAILED)
+
+
+@override_settings(**TEST_SETTINGS)
+class ContactNameClashTests(TestCase):
+    def setUp(self):
+        self.tenant = XeroTenant.objects.create(tenant_id="tenant-1")
+        bulk_upsert_contacts(records_for(xero_contact(9, Name="Contact 1")), self.tenant)
+
+    def contact(self) -> Contact:
+        return Contact.objects.get(xero_contact_id=xero_contact(1)["ContactID"])
+
+    def test_keeps_suffix_while_the_name_is_taken(self):
+        bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+        self.assertEqual((self.contact().name, self.contact().xero_name), ("Contact 1 [00000001]", "Contact 1"))
+
+        _, created, updated, skipped = bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+
+        self.assertEqual((created, updated, skipped), (0, 0, 1))
+        self.assertEqual(self.contact().name, "Contact 1 [00000001]")
+
+    def test_drops_suffix_once_the_clash_is_gone(self):
+        bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+        bulk_upsert_contacts(records_for(xero_contact(9, Name="Renamed")), self.tenant)
+
+        _, created, updated, skipped = bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+
+        self.assertEqual((created, updated, skipped), (0, 1, 0))
+        self.assertEqual(self.contact().name, "Contact 1")
+
+    def test_pushes_the_xero_name(self):
+        bulk_upsert_contacts(records_for(xero_contact(1)), self.tenant)
+        contact = self.contact()
+
+        self.assertEqual(outbound.xero_contact_name(contact), "Contact 1")
+
+        contact.name = "Edited locally"
+        self.assertEqual(outbound.xero_contact_name(contact), "Edited locally")
+
+
+@override_settings(**TEST_SETTINGS)
+class ScheduleTenantSyncsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kept = XeroTenant.objects.create(tenant_id="tenant-1", token_key="token-a")
+        self.disconnected = XeroTenant.objects.create(tenant_id="tenant-2", token_key="token-a")
+
+    def get_connections(self):
+        if client.active_token_key() != "token-a":
+            raise ApiException(status=401, reason="Unauthorized")
+        return [mock.Mock(tenant_type="ORGANISATION", tenant_id="tenant-1", tenant_name="Kept", id="connection-1")]
+
+    def test_refreshes_tenants_of_each_token_before_reconciling(self):
+        with mock.patch.object(client, "IdentityApi") as identity_api, mock.patch.object(
+            tasks, "reconcile_tenant_schedules"
+        ) as reconcile:
+            identity_api.return_value.get_connections.side_effect = self.get_connections
+            tasks.schedule_tenant_syncs_task()
+
+        self.assertEqual(identity_api.return_value.get_connections.call_count, 2)
+        self.kept.refresh_from_db()
+        self.disconnected.refresh_from_db()
+        self.assertEqual((self.kept.is_active, self.kept.name), (True, "Kept"))
+        self.assertFalse(self.disconnected.is_active)
+        reconcile.assert_called_once()
+
+
+@override_settings(**TEST_SETTINGS)
+class ImportBatchWithOrmTests(TestCase):
+    def setUp(self):
+        self.tenant = XeroTenant.objects.create(tenant_id="tenant-1")
+
+    def import_batch(self, *contacts) -> dict:
+        result = importer.import_batch_with_orm(list(contacts), self.tenant)
+        return {key: result[key] for key in ("created", "updated", "skipped", "renamed")}
+
+    def test_creates_then_skips_unchanged_contacts(self):
+        self.assertEqual(
+            self.import_batch(xero_contact(1), xero_contact(2)),
+            {"created": 2, "updated": 0, "skipped": 0, "renamed": 0},
+        )
+        self.assertEqual(
+            self.import_batch(xero_contact(1), xero_contact(2, EmailAddress="new@example.com")),
+            {"created": 0, "updated": 1, "skipped": 1, "renamed": 0},
+        )
+
+    def test_disambiguates_clashing_names(self):
+        Contact.objects.create(tenant=self.tenant, name="Contact 1")
+
+        result = self.import_batch(xero_contact(1), xero_contact(2, Name="Contact 1"))
+
+        self.assertEqual(result, {"created": 2, "updated": 0, "skipped": 0, "renamed": 2})
+        self.assertEqual(
+            set(Contact.objects.filter(xero_contact_id__isnull=False).values_list("name", "xero_name")),
+            {("Contact 1 [00000001]", "Contact 1"), ("Contact 1 [00000002]", "Contact 1")},
+        )
+
+    def test_last_occurrence_of_a_contact_wins(self):
+        contacts = importer.dedupe_batch(
+            [xero_contact(1), xero_contact(2), xero_contact(1, Name="Renamed"), {"Name": "No ContactID"}]
+        )
+
+        self.assertEqual([contact["Name"] for contact in contacts], ["Renamed", "Contact 2"])
+
+
+class IterJsonContactsTests(TestCase):
+    def contacts(self, text: str) -> list:
+        # A tiny read size makes values straddle reads.
+        return [contact["ContactID"] for contact in importer.iter_json_contacts(StringIO(text), read_size=3)]
+
+    def test_reads_serialized_contacts_documents(self):
+        document = json.dumps({"Id": "x", "Contacts": [{"ContactID": "a", "Balance": 12.5}, {"ContactID": "b"}]})
+
+        self.assertEqual(self.contacts(f"{document}\n{document}\n"), ["a", "b", "a", "b"])
+
+    def test_reads_json_lines_and_lists(self):
+        self.assertEqual(self.contacts('{"ContactID": "a"}\n{"ContactID": "b"}\n'), ["a", "b"])
+        self.assertEqual(self.contacts(' [ {"ContactID": "a"} , {"ContactID": "b"} ] '), ["a", "b"])
+        self.assertEqual(self.contacts("[]"), [])
+
+    def test_rejects_other_values(self):
+        with self.assertRaises(ValueError):
+            self.contacts('"not a contact"')
+        with self.assertRaises(ValueError):
+            self.contacts('[{"ContactID": "a"} {"ContactID": "b"}]')
+
+
+@override_settings(XERO_SYNC_INTERVAL_MIN=5 * 60, XERO_SYNC_INTERVAL_MAX=6 * 60 * 60, XERO_SYNC_TARGET_CHANGES=100)
+class NextSyncIntervalTests(TestCase):
+    def test_keeps_interval_on_target(self):
+        self.assertEqual(next_sync_interval(900, 100, timedelta(seconds=900)), 900)
+
+    def test_moves_halfway_in_log_scale(self):
+        # 400 changes an hour put the target at 15 minutes.
+        self.assertEqual(next_sync_interval(3600, 400, timedelta(hours=1)), 1800)
+        # No change targets the longest interval.
+        self.assertEqual(next_sync_interval(5 * 60 * 60, 0, timedelta(hours=5)), 19740)
+
+    def test_rounds_to_whole_minutes(self):
+        self.assertEqual(next_sync_interval(1000, 100, timedelta(seconds=1000)), 1020)
+
+    def test_clamps_to_limits(self):
+        self.assertEqual(next_sync_interval(300, 10000, timedelta(minutes=1)), 5 * 60)
+        self.assertEqual(next_sync_interval(6 * 60 * 60, 1, timedelta(days=7)), 6 * 60 * 60)
+
+
+@override_settings(**TEST_SETTINGS)
+class ReadApiTests(TestCase):
+    def setUp(self):
+        self.tenant = XeroTenant.objects.create(tenant_id="tenant-1")
+        self.other_tenant = XeroTenant.objects.create(tenant_id="tenant-2")
+        save_contact_info({"Contacts": [xero_contact(index) for index in range(5)]}, tenant=self.tenant)
+        save_contact_info({"Contacts": [xero_contact(index) for index in range(5, 7)]}, tenant=self.other_tenant)
+        self.url = reverse("api_contacts_list")
+
+    def get(self, url, **extra):
+        return self.client.get(url, HTTP_X_API_KEY="test-key", **extra)
+
+    def test_requires_api_key_or_staff(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.assertEqual(self.client.get(self.url, HTTP_X_API_KEY="wrong").status_code, 401)
+        self.client.force_login(User.objects.create_user("user"))
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+        self.client.force_login(User.objects.create_user("staff", is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.get(self.url).status_code, 200)
+
+    def test_cursor_pages_through_tenant_contacts(self):
+        seen, cursor = [], None
+        while True:
+            params = {"tenant": "tenant-1", "limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = self.get(self.url, data=params)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            seen.extend(contact["id"] for contact in body["results"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+        expected = sorted(str(pk) for pk in Contact.objects.filter(tenant=self.tenant).values_list("pk", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_cursor_after_last_contact_is_empty(self):
+        last = Contact.objects.order_by("-id").first()
+
+        body = self.get(self.url, data={"cursor": encode_cursor(last.pk)}).json()
+
+        self.assertEqual(body, {"results": [], "next_cursor": None})
+
+    def test_invalid_parameters(self):
+        for params in ({"cursor": "!"}, {"limit": "0"}, {"limit": "x"}, {"fields": "name,secret"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(self.url, data=params).status_code, 400)
+        self.assertEqual(self.get(self.url, data={"tenant": "unknown"}).status_code, 404)
+
+    def test_fields(self):
+        body = self.get(self.url, data={"fields": "name,phones,tenant", "limit": 1}).json()
+
+        self.assertEqual(set(body["results"][0]), {"id", "name", "phones", "tenant"})
+        self.assertEqual(body["results"][0]["phones"], [{"label": "DEFAULT", "number": "+6494001234"}])
+
+    def test_detail(self):
+        contact = Contact.objects.filter(tenant=self.tenant).first()
+        url = reverse("api_contact_detail", args=[contact.pk])
+
+        body = self.get(url, data={"fields": "email"}).json()
+
+        self.assertEqual(body, {"id": str(contact.pk), "email": contact.email})
+        self.assertEqual(self.get(reverse("api_contact_detail", args=[uuid.uuid4()])).status_code, 404)
+
+    def test_etag_revalidation(self):
+        response = self.get(self.url, data={"tenant": "tenant-1"})
+        etag = response["ETag"]
+        self.assertIn("X-Api-Key", response["Vary"])
+
+        response = self.get(self.url, data={"tenant": "tenant-1"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Other query parameters are a different response.
+        response = self.get(self.url, data={"tenant": "tenant-1", "limit": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # Changes to another tenant's contacts keep the ETag.
+        with self.captureOnCommitCallbacks(execute=True):
+            save_contact_info({"Contacts": [xero_contact(5, Name="Renamed")]}, tenant=self.other_tenant)
+        response = self.get(self.url, data={"tenant": "tenant-1"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            save_contact_info({"Contacts": [xero_contact(1, Name="Renamed")]}, tenant=self.tenant)
+        response = self.get(self.url, data={"tenant": "tenant-1"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_when_a_contact_leaves_the_tenant(self):
+        etag = self.get(self.url, data={"tenant": "tenant-1"})["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            save_contact_info({"Contacts": [xero_contact(1)]}, tenant=self.other_tenant)
+
+        response = self.get(self.url, data={"tenant": "tenant-1"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(**TEST_SETTINGS)
+class ContactChildVersionTests(TestCase):
+    def setUp(self):
+        self.contact = Contact.objects.create(tenant=XeroTenant.objects.create(tenant_id="tenant-1"), name="Contact")
+
+    def test_uses_the_loaded_contact(self):
+        with mock.patch.object(signals, "bump_contacts_version") as bump, self.assertNumQueries(1):
+            ContactPhoneNumber.objects.create(company_name=self.contact, phone_number="+6494001234")
+
+        bump.assert_called_once_with(self.contact.tenant_id)
+
+    def test_cascade_delete_bumps_once(self):
+        ContactPhoneNumber.objects.create(company_name=self.contact, phone_number="+6494001234")
+        ContactPhoneNumber.objects.create(company_name=self.contact, phone_label="MOBILE", phone_number="+64211234567")
+
+        with mock.patch.object(signals, "bump_contacts_version") as bump:
+            self.contact.delete()
+
+        bump.assert_called_once_with(self.contact.tenant_id)
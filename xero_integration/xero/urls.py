@@ -5,5 +5,13 @@ urlpatterns = [
     path("authorize/", views.authorize, name="authorize"),
     path("callback/", views.callback, name="callback"),
     path("sync_contacts/", views.sync_xero_contacts, name="sync_xero_contacts"),
+    path(
+        "sync_contacts/<uuid:run_id>/status/",
+        views.sync_xero_contacts_status,
+        name="sync_xero_contacts_status",
+    ),
+    path("webhooks/", views.xero_webhook, name="xero_webhook"),
     path("create_contacts/", views.create_contacts, name="create_contacts"),
+    path("api/contacts/", views.contacts_list, name="api_contacts_list"),
+    path("api/contacts/<uuid:contact_id>/", views.contact_detail, name="api_contact_detail"),
 ]
\ No newline at end of file
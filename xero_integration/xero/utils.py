@@ -1,164 +1,717 @@
-from xero_integration.xero.models import Contact, ContactAddress, ContactPerson, ContactPhoneNumber
-from django_countries import countries
+import hashlib
+import json
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import translation
 
-def save_contact_info(contacts: dict):
+from xero_integration.xero.ledger import PhaseTimer
+from xero_integration.xero.metrics import observe_ingest
+from xero_integration.xero.models import Contact, ContactAddress, ContactPerson, ContactPhoneNumber, XeroTenant
+from xero_integration.xero.versions import bump_contacts_version
+from django_countries import Countries, countries
+from django_countries.data import COUNTRIES
+from phonenumber_field.phonenumber import PhoneNumber
+from phonenumbers import NumberParseException, PhoneNumberFormat, format_number, is_possible_number, is_valid_number
+
+from commons.utils import ValidatedPhoneNumber
+
+
+logger = logging.getLogger(__name__)
+
+# Set while the current thread/task writes data that came from Xero, so those
+# writes are not queued to be pushed straight back.
+_xero_sync_suppressed: ContextVar[bool] = ContextVar("xero_sync_suppressed", default=False)
+
+# Country spellings Xero users commonly enter that differ from the
+# django-countries names, keyed by their normalized form.
+COUNTRY_ALIASES = {
+    "usa": "US",
+    "united states of america": "US",
+    "america": "US",
+    "uk": "GB",
+    "great britain": "GB",
+    "britain": "GB",
+    "england": "GB",
+    "scotland": "GB",
+    "wales": "GB",
+    "northern ireland": "GB",
+    "united kingdom of great britain and northern ireland": "GB",
+    "uae": "AE",
+    "holland": "NL",
+    "the netherlands": "NL",
+    "czech republic": "CZ",
+    "russia": "RU",
+    "south korea": "KR",
+    "korea": "KR",
+    "north korea": "KP",
+    "vietnam": "VN",
+    "laos": "LA",
+    "iran": "IR",
+    "syria": "SY",
+    "bolivia": "BO",
+    "venezuela": "VE",
+    "tanzania": "TZ",
+    "moldova": "MD",
+    "macedonia": "MK",
+    "swaziland": "SZ",
+    "burma": "MM",
+    "ivory coast": "CI",
+    "cote d'ivoire": "CI",
+    "cape verde": "CV",
+    "east timor": "TL",
+    "brunei": "BN",
+    "turkey": "TR",
+    "vatican": "VA",
+    "palestine": "PS",
+    "taiwan": "TW",
+    "hong kong sar": "HK",
+}
+
+# Distinct (number, region) parses kept in memory. Switchboard numbers
+# repeat across many contacts.
+PHONE_PARSE_CACHE_SIZE = 8192
+
+# Contact columns overwritten from the Xero payload when a row already exists.
+CONTACT_SYNC_FIELDS = ["tenant", "name", "xero_name", "email", "website", "is_supplier", "is_customer", "sync_fingerprint"]
+
+
+def contact_fields(contact: dict) -> dict:
+    """
+    Map a serialized Xero contact to ``Contact`` column values.
+
+    Args:
+        contact (dict): A single contact from the Xero ``Contacts`` payload.
+
+    Returns:
+        dict: Field values keyed by ``Contact`` field name.
+    """
+    return {
+        "xero_contact_id": contact.get("ContactID"),
+        "name": contact.get("Name"),
+        "xero_name": contact.get("Name") or "",
+        "email": contact.get("EmailAddress", ""),
+        "website": contact.get("Website", ""),
+        "is_supplier": bool(contact.get("IsSupplier")),
+        "is_customer": bool(contact.get("IsCustomer")),
+    }
+
+
+def transform_contact(contact: dict, unknown_countries: Counter | None = None) -> dict:
+    """
+    Turn a serialized Xero contact into the rows it should be stored as.
+
+    Args:
+        contact (dict): A single contact from the Xero ``Contacts`` payload.
+        unknown_countries (Counter, optional): Tally of unrecognised country values.
+
+    Returns:
+        dict: ``fields`` for the ``Contact`` row, including its
+        ``sync_fingerprint``, and the ``phones``, ``addresses`` and
+        ``persons`` rows as built by ``phone_rows``, ``address_rows`` and
+        ``person_rows``.
+    """
+    addresses = address_rows(contact, unknown_countries)
+    region = phone_region(addresses)
+    record = {
+        "fields": contact_fields(contact),
+        "phones": phone_rows(contact, region),
+        "addresses": addresses,
+        "persons": person_rows(contact, region),
+    }
+    record["fields"]["sync_fingerprint"] = contact_fingerprint(record)
+    return record
+
+
+def contact_fingerprint(record: dict) -> str:
+    """
+    Hash everything that would be written for a contact, so an unchanged
+    contact can be recognised without reading its rows.
+
+    Hashing the transformed rows rather than the raw payload ignores fields
+    that are not stored. It also means changes to the mapping code cause the
+    next sync to rewrite the affected contacts.
+    """
+    def canonical(value) -> str:
+        return json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+
+    content = {
+        "fields": {k: v for k, v in record["fields"].items() if k != "sync_fingerprint"},
+        # Order-insensitive: Xero does not guarantee the order of child lists.
+        "children": {
+            name: sorted(canonical(row) for row in record[name].values())
+            for name in ("phones", "addresses", "persons")
+        },
+    }
+    return hashlib.sha256(canonical(content).encode()).hexdigest()
+
+
+def bulk_upsert_contacts(records: dict, tenant: XeroTenant | None = None) -> tuple[dict, int, int, int]:
+    """
+    Insert or update a chunk of contacts with a single
+    ``INSERT ... ON CONFLICT (xero_contact_id) DO UPDATE`` statement.
+
+    Existing primary keys and fingerprints are looked up first. Contacts whose
+    fingerprint is unchanged are skipped. The returned objects carry the ids
+    that are actually stored, which the child tables need. Contacts that
+    move from another tenant bump that tenant's contacts version.
+
+    Xero only keeps names unique among active contacts, so an archived
+    contact can share its name with a live one. A contact whose name is
+    already used by another contact of the tenant is stored under
+    ``disambiguated_name`` rather than failing the whole chunk on the
+    unique constraint, with its Xero name kept in ``xero_name``. Once the
+    clash is gone the contact is written again under its own name, even if
+    its fingerprint has not changed.
+
+    Args:
+        records (dict): ``transform_contact`` results keyed by Xero ContactID.
+        tenant (XeroTenant, optional): The organisation the contacts belong to.
+
+    Returns:
+        tuple: ``({xero_contact_id: Contact}, created, updated, skipped)``,
+        where the dict only holds the contacts that were written.
+    """
+    tenant_pk = tenant.pk if tenant else None
+    existing = {
+        xero_contact_id: (pk, fingerprint, tenant_id, name)
+        for xero_contact_id, pk, fingerprint, tenant_id, name in Contact.objects.filter(
+            xero_contact_id__in=records
+        ).values_list("xero_contact_id", "pk", "sync_fingerprint", "tenant_id", "name")
+    }
+    # Names held by the tenant's contacts outside this chunk.
+    taken_names = set(
+        Contact.objects.filter(
+            tenant_id=tenant_pk,
+            name__in=[record["fields"]["name"] for record in records.values()],
+        )
+        .exclude(xero_contact_id__in=records)
+        .values_list("name", flat=True)
+    )
+
+    contact_objs = {}
+    updated = skipped = 0
+    moved_from = set()
+    for xero_contact_id, record in records.items():
+        contact_obj = Contact(tenant_id=tenant_pk, **record["fields"])
+        if xero_contact_id in existing:
+            contact_obj.pk, fingerprint, tenant_id, name = existing[xero_contact_id]
+            # A disambiguated name is only kept while the clash lasts.
+            name_current = name == contact_obj.name or (
+                contact_obj.name in taken_names and name == disambiguated_name(contact_obj.name, xero_contact_id)
+            )
+            if fingerprint == contact_obj.sync_fingerprint and tenant_id == tenant_pk and name_current:
+                taken_names.add(name)
+                skipped += 1
+                continue
+            if tenant_id != tenant_pk:
+                moved_from.add(tenant_id)
+            updated += 1
+        contact_objs[xero_contact_id] = contact_obj
+
+    for xero_contact_id, contact_obj in contact_objs.items():
+        if contact_obj.name and contact_obj.name in taken_names:
+            name = disambiguated_name(contact_obj.name, xero_contact_id)
+            logger.warning(
+                "Contact %s shares its name %r with another contact, storing it as %r",
+                xero_contact_id,
+                contact_obj.name,
+                name,
+            )
+            contact_obj.name = name
+        taken_names.add(contact_obj.name)
+
+    Contact.objects.bulk_create(
+        contact_objs.values(),
+        update_conflicts=True,
+        unique_fields=["xero_contact_id"],
+        update_fields=CONTACT_SYNC_FIELDS,
+    )
+    if moved_from:
+        # The caller bumps the version of the tenant the contacts moved to.
+        bump_contacts_version(*moved_from)
+    # A concurrent ingest may have inserted one of the new contacts first,
+    # in which case the conflict kept its row and the id generated here was
+    # never stored.
+    new_ids = [xero_contact_id for xero_contact_id in contact_objs if xero_contact_id not in existing]
+    if new_ids:
+        for xero_contact_id, pk in Contact.objects.filter(xero_contact_id__in=new_ids).values_list(
+            "xero_contact_id", "pk"
+        ):
+            contact_objs[xero_contact_id].pk = pk
+    return contact_objs, len(contact_objs) - updated, updated, skipped
+
+
+def disambiguated_name(name: str, xero_contact_id: str) -> str:
+    """``name`` made unique by the start of the contact's Xero ContactID."""
+    suffix = f" [{xero_contact_id[:8]}]"
+    return name[: Contact._meta.get_field("name").max_length - len(suffix)] + suffix
+
+
+def save_contact_info(contacts: dict, chunk_size: int | None = None, tenant: XeroTenant | None = None) -> dict:
     """
     Save contact information to the database.
 
+    Contacts are written in chunks of ``chunk_size`` (``XERO_SYNC_CHUNK_SIZE``
+    by default), each chunk in its own transaction. Contacts whose content
+    fingerprint matches the stored one are skipped. Nothing written here is
+    queued to be pushed back to Xero.
+
     Args:
         contacts (dict): A dictionary containing contact information.
+        chunk_size (int, optional): Number of contacts upserted per statement.
+        tenant (XeroTenant, optional): The organisation the contacts belong to.
+
+    Returns:
+        dict: Number of contacts ``created``, ``updated`` and ``skipped``, how
+        often each unrecognised country value was seen
+        (``unknown_countries``), and the seconds spent transforming and
+        writing them (``timings``).
+    """
+    chunk_size = chunk_size or settings.XERO_SYNC_CHUNK_SIZE
+    contacts = [contact for contact in contacts.get("Contacts") or [] if contact.get("ContactID")]
+    created = updated = skipped = 0
+    unknown_countries = Counter()
+    timer = PhaseTimer()
+
+    for start in range(0, len(contacts), chunk_size):
+        # ON CONFLICT cannot touch the same row twice in one statement, so
+        # the last occurrence of a ContactID wins.
+        with timer.phase("transform"):
+            records = {
+                contact["ContactID"]: transform_contact(contact, unknown_countries)
+                for contact in contacts[start:start + chunk_size]
+            }
+        with timer.phase("write"), suppress_xero_sync(), transaction.atomic():
+            contact_objs, chunk_created, chunk_updated, chunk_skipped = bulk_upsert_contacts(records, tenant)
+            sync_contact_children(records, contact_objs)
+        created += chunk_created
+        updated += chunk_updated
+        skipped += chunk_skipped
+
+    observe_ingest({"created": created, "updated": updated, "skipped": skipped}, timer.durations)
+    if created or updated:
+        bump_contacts_version(tenant.pk if tenant else None)
+    if unknown_countries:
+        logger.warning("Addresses saved without a country, unrecognised values: %s", dict(unknown_countries))
+    return {
+        "created": created,
+        "updated": updated,
+        "skipped": skipped,
+        "unknown_countries": dict(unknown_countries),
+        "timings": dict(timer.durations),
+    }
+
+
+@contextmanager
+def suppress_xero_sync():
+    """
+    Stop changes made inside the block from being pushed to Xero.
+
+    Only affects the current context, unlike flipping
+    ``settings.SYNC_XERO_SIGNALS``, so concurrent work in other threads or
+    greenlets keeps syncing.
+    """
+    token = _xero_sync_suppressed.set(True)
+    try:
+        yield
+    finally:
+        _xero_sync_suppressed.reset(token)
+
+
+def xero_sync_enabled() -> bool:
+    """Return whether local changes should currently be pushed to Xero."""
+    return settings.SYNC_XERO_SIGNALS and not _xero_sync_suppressed.get()
+
+
+def normalize_country_key(value: str) -> str:
+    """Collapse whitespace and case so lookups ignore formatting differences."""
+    return " ".join(str(value).split()).casefold()
+
+
+def country_name_variants(name: str) -> set[str]:
+    """
+    The spellings of an ISO 3166 country name: as written, and with a
+    qualifier after a comma rather than in brackets, with or without
+    "the", so "Korea (the Republic of)" also matches "Korea, Republic of".
+    """
+    variants = {name}
+    match = re.fullmatch(r"(.+?)\s*\((.+)\)", name)
+    if match:
+        variants.add(f"{match[1]}, {match[2]}")
+    for variant in list(variants):
+        variants.add(variant.replace(", the ", ", "))
+    return variants
+
+
+@lru_cache(maxsize=1)
+def country_code_index() -> dict[str, str]:
+    """
+    Build the lookup table from country names, aliases and ISO alpha-2 and
+    alpha-3 codes to alpha-2 codes. Built once per process.
+
+    Both the common names django-countries displays, such as "Vietnam", and
+    the ISO names they replace, such as "Viet Nam", are included.
+
+    Returns:
+        dict: Alpha-2 country codes keyed by normalized name or code.
+    """
+    index = {normalize_country_key(alias): code for alias, code in COUNTRY_ALIASES.items()}
+    # Xero sends English names, whatever language is active in this process.
+    with translation.override("en"):
+        for code, name in countries:
+            names = {str(name), str(COUNTRIES.get(code, name)), *map(str, Countries.OLD_NAMES.get(code, ()))}
+            for variant in set().union(*map(country_name_variants, names)):
+                index[normalize_country_key(variant)] = code
+            index[normalize_country_key(code)] = code
+            alpha3 = countries.alpha3(code)
+            if alpha3:
+                index[normalize_country_key(alpha3)] = code
+    return index
+
+
+def country_code_for(value: str) -> str | None:
+    """
+    Resolve a Xero country value to an ISO alpha-2 code.
+
+    Args:
+        value (str): A country name, alias, or alpha-2/alpha-3 code.
+
+    Returns:
+        str | None: The alpha-2 code, or None if the value is not recognised.
+    """
+    return country_code_index().get(normalize_country_key(value))
+
+
+def get_contacts_watermark(tenant_id: str) -> datetime | None:
+    """
+    Return the latest contact ``UpdatedDateUTC`` synced for a tenant.
+
+    Args:
+        tenant_id (str): The Xero tenant ID.
+
+    Returns:
+        datetime | None: The watermark, or None if the tenant was never synced.
+    """
+    return (
+        XeroTenant.objects.filter(tenant_id=tenant_id)
+        .values_list("contacts_modified_since", flat=True)
+        .first()
+    )
+
+
+def advance_contacts_watermark(tenant_id: str, modified_since: datetime) -> None:
+    """
+    Move the tenant's contact watermark forward to ``modified_since``.
+
+    The watermark never moves backwards, so concurrent syncs finishing out of
+    order cannot cause already-synced changes to be skipped or refetched.
+
+    Args:
+        tenant_id (str): The Xero tenant ID.
+        modified_since (datetime): The latest ``UpdatedDateUTC`` that was synced.
 
     Returns:
         None
     """
-    contacts = contacts.get("Contacts")
-    for contact in contacts:
-        is_contact_supplier = contact.get("IsSupplier")
-        is_contact_customer = contact.get("IsCustomer")
-
-        contact_obj, created = Contact.objects.update_or_create(
-            xero_contact_id=contact.get("ContactID"),
-            defaults={
-                "name": contact.get("Name"),
-                "email": contact.get("EmailAddress", ""),
-                "website": contact.get("Website", ""),
-                "is_supplier": is_contact_supplier,
-                "is_customer": is_contact_customer,
-            },
-        )
+    XeroTenant.objects.filter(
+        Q(contacts_modified_since__isnull=True) | Q(contacts_modified_since__lt=modified_since),
+        tenant_id=tenant_id,
+    ).update(contacts_modified_since=modified_since)
+
+
+@lru_cache(maxsize=PHONE_PARSE_CACHE_SIZE)
+def parse_phone_number(raw: str, region: str | None) -> PhoneNumber | None:
+    """
+    Parse and validate a phone number, memoized per ``(raw, region)``.
+
+    Returns:
+        PhoneNumber | None: A ValidatedPhoneNumber if the number is valid,
+        a PhoneNumber in E.164 form if it is only possible, such as a local
+        number without its area code, or None if it is neither.
+    """
+    try:
+        phone_number = ValidatedPhoneNumber.from_string(raw, region=region)
+    except NumberParseException:
+        return None
+    if not is_possible_number(phone_number):
+        return None
+    if is_valid_number(phone_number):
+        return phone_number
+    # Numbers that are not valid are stored as they were typed, so make
+    # that the E.164 form.
+    return PhoneNumber.from_string(format_number(phone_number, PhoneNumberFormat.E164))
 
-        add_phone_info(contact, contact_obj)
-        add_address_info(contact, contact_obj)
-        add_contact_person_info(contact, contact_obj)
 
-def add_phone_info(contact, contact_obj):
+def normalize_phone_number(country_code, area_code, number, region: str | None = None):
     """
-    Add phone information to a contact object.
+    Combine Xero's phone parts into one E.164 number.
+
+    Args:
+        country_code: Xero ``PhoneCountryCode``, with or without a leading +.
+        area_code: Xero ``PhoneAreaCode``, possibly with a trunk prefix.
+        number: Xero ``PhoneNumber``.
+        region (str, optional): ISO country code used when there is no
+            country code, usually the contact's address country.
+
+    Returns:
+        PhoneNumber | str: The parsed number, see ``parse_phone_number``,
+        or the parts joined as Xero sent them if they do not form a possible
+        number.
+    """
+    number = str(number).strip()
+    country_code = "".join(ch for ch in str(country_code or "") if ch.isdigit())
+    area_code = str(area_code or "").strip()
+
+    if number.startswith("+"):
+        raw = number
+    elif country_code:
+        raw = f"+{country_code} {area_code} {number}"
+    else:
+        raw = f"{area_code} {number}"
+
+    phone_number = parse_phone_number(" ".join(raw.split()), region)
+    if phone_number is not None:
+        return phone_number
+    # Keep the number rather than drop it, as ingest always has.
+    return f"{country_code}{area_code}{number}"
+
+
+def phone_region(addresses: dict) -> str | None:
+    """Pick the region hint for a contact's phones from its address rows."""
+    for address_type in (ContactAddress.AddressTypes.STREET, ContactAddress.AddressTypes.POBOX):
+        if addresses.get(address_type, {}).get("country"):
+            return addresses[address_type]["country"]
+    return next((row["country"] for row in addresses.values() if row.get("country")), None)
+
+
+def phone_rows(contact: dict, region: str | None = None) -> dict:
+    """
+    Build the phone rows a contact should have, keyed by phone label.
 
     Args:
         contact (dict): The contact information containing phone details.
-        contact_obj (Contact): The contact object to which the phone information will be added.
+        region (str, optional): Region hint for numbers without a country code.
 
     Returns:
-        None
+        dict: ``ContactPhoneNumber`` field values keyed by ``phone_label``.
     """
+    rows = {}
     for phone_info in contact.get("Phones", []):
         phone_number = phone_info.get("PhoneNumber")
-        phone_country_code = phone_info.get("PhoneCountryCode")
-        phone_area_code = phone_info.get("PhoneAreaCode")
-
         if phone_number and phone_number != "":
-            phone_number_str: str = ""
-            if phone_country_code:
-                phone_number_str += str(phone_country_code)
-
-            if phone_area_code:
-                phone_number_str += str(phone_area_code)
-
-            phone_number_str += str(phone_number)
+            phone_label = phone_info.get("PhoneType")
+            rows[phone_label] = {
+                "phone_label": phone_label,
+                "phone_number": normalize_phone_number(
+                    phone_info.get("PhoneCountryCode"),
+                    phone_info.get("PhoneAreaCode"),
+                    phone_number,
+                    region,
+                ),
+            }
+    return rows
 
-            contact_phonenumber, created = ContactPhoneNumber.objects.update_or_create(
-                company_name=contact_obj,
-                phone_label=phone_info.get("PhoneType"),
-                defaults={
-                    "phone_number": phone_number_str,
-                },
-            )
 
-def add_address_info(contact: list, contact_obj: Contact):
+def address_rows(contact: dict, unknown_countries: Counter | None = None) -> dict:
     """
-    Add address information to the contact object.
+    Build the address rows a contact should have, keyed by address type.
+
+    Country values that cannot be resolved to a code are left out of the
+    address and tallied in ``unknown_countries``.
 
     Args:
         contact (dict): The contact information.
-        contact_obj (Contact): The contact object.
+        unknown_countries (Counter, optional): Tally of unrecognised country values.
 
     Returns:
-        None
+        dict: ``ContactAddress`` field values keyed by ``address_type``.
     """
+    rows = {}
     for address in contact.get("Addresses", []):
-        # Create a dictionary of fields that are not empty
         fields: dict = {
-            "address_line1": address.get("AddressLine1"),
-            "address_line2": address.get("AddressLine2"),
-            "address_line3": address.get("AddressLine3"),
-            "address_line4": address.get("AddressLine4"),
-            "address_type": address.get("AddressType"),
-            "city": address.get("City"),
-            "region": address.get("Region"),
-            "postal_code": address.get("PostalCode"),
-            "country": address.get("Country"),
+            "address_line1": address.get("AddressLine1") or "",
+            "address_line2": address.get("AddressLine2") or "",
+            "address_line3": address.get("AddressLine3") or "",
+            "address_line4": address.get("AddressLine4") or "",
+            "city": address.get("City") or "",
+            "region": address.get("Region") or "",
+            "postal_code": address.get("PostalCode") or "",
+            "country": None,
         }
 
         # Convert country name to country code
-        if fields["country"]:
-            for code, name in countries:
-                if name == fields["country"]:
-                    fields["country"] = code
-                    break
-
-        fields = {k: v for k, v in fields.items() if v is not None and v != ""}  # Remove empty fields
-
-        if fields:  # If there are any non-empty fields
-            contact_address, created = ContactAddress.objects.update_or_create(
-                company_name=contact_obj,
-                address_type=fields.get("address_type"),
-                defaults=fields,
-            )
+        if address.get("Country"):
+            fields["country"] = country_code_for(address["Country"])
+            if fields["country"] is None and unknown_countries is not None:
+                unknown_countries[address["Country"]] += 1
+
+        address_type = address.get("AddressType")
+        if address_type or any(fields.values()):  # If there are any non-empty fields
+            fields["address_type"] = address_type or ContactAddress.AddressTypes.POBOX
+            rows[fields["address_type"]] = fields
+    return rows
 
 
-def add_contact_person_info(contact: dict, contact_obj: Contact) -> None:
-    # Check if the contact has either FirstName, LastName, or EmailAddress
+def person_key(email, first_name, last_name) -> tuple:
+    """Identify a contact person by email and name, ignoring case."""
+    return ((email or "").casefold(), (first_name or "").casefold(), (last_name or "").casefold())
+
+
+def person_rows(contact: dict, region: str | None = None) -> dict:
+    """
+    Build the contact person rows a contact should have: the contact's own
+    first/last name and email as the primary person, plus its
+    ``ContactPersons``.
+
+    Args:
+        contact (dict): The contact information.
+        region (str, optional): Region hint for phone numbers.
+
+    Returns:
+        dict: ``ContactPerson`` field values keyed by ``person_key``.
+    """
+    rows = {}
+    for contact_person in contact.get("ContactPersons", []):
+        fields = {
+            "job_title": contact_person.get("JobTitle", ""),
+            "first_name": contact_person.get("FirstName", ""),
+            "last_name": contact_person.get("LastName", ""),
+            # ContactPerson.save() stores blank emails as NULL; bulk writes skip save().
+            "email": contact_person.get("EmailAddress") or None,
+            "phone": (
+                normalize_phone_number(None, None, contact_person["PhoneNumber"], region)
+                if contact_person.get("PhoneNumber")
+                else None
+            ),
+            "primary_contact": contact_person.get("PrimaryContact", False),
+        }
+        rows[person_key(fields["email"], fields["first_name"], fields["last_name"])] = fields
+
     first_name = contact.get("FirstName", "")
     last_name = contact.get("LastName", "")
     email = contact.get("EmailAddress", "")
-
     if first_name or last_name or email:
         # If so, save it as a primary contact person
-        ContactPerson.objects.update_or_create(
-            company_name=contact_obj,
-            defaults={
-                "job_title": contact.get("JobTitle", ""),
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": email,
-                "primary_contact": True,
-            },
-        )
+        key = person_key(email, first_name, last_name)
+        rows[key] = {
+            **rows.get(key, {"phone": None}),
+            "job_title": contact.get("JobTitle", ""),
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": email or None,
+            "primary_contact": True,
+        }
+    return rows
 
-    # Proceed with the original logic for the contact persons
-    contact_persons = contact.get("ContactPersons", [])
-    existing_contact_persons = ContactPerson.objects.filter(
-        company_name=contact_obj,
-        job_title__in=[cp.get("JobTitle", "") for cp in contact_persons],
-        first_name__in=[cp.get("FirstName", "") for cp in contact_persons],
-        last_name__in=[cp.get("LastName", "") for cp in contact_persons],
-        email__in=[cp.get("EmailAddress") for cp in contact_persons],
-        phone__in=[cp.get("PhoneNumber", "") for cp in contact_persons],
-    )
 
-    existing_contact_persons_dict = {cp.email: cp for cp in existing_contact_persons}
-
-    for contact_person in contact_persons:
-        email = contact_person.get("EmailAddress")
-        if email in existing_contact_persons_dict:
-            # Update existing contact person
-            existing_cp = existing_contact_persons_dict[email]
-            existing_cp.job_title = contact_person.get("JobTitle", "")
-            existing_cp.first_name = contact_person.get("FirstName", "")
-            existing_cp.last_name = contact_person.get("LastName", "")
-            existing_cp.phone = contact_person.get("PhoneNumber", "")
-            existing_cp.primary_contact = contact_person.get("PrimaryContact", False)
-            existing_cp.save()
+def value_changed(current, new) -> bool:
+    """Compare a stored field value with a new one, treating "" and None alike."""
+    if current in (None, ""):
+        return new not in (None, "")
+    return current != new
+
+
+def reconcile_children(model, contact_ids: list, desired: dict, key, fields: list[str]) -> dict:
+    """
+    Make a child table match ``desired`` for a chunk of contacts.
+
+    Existing rows are loaded with one query and diffed in memory. The
+    changes are then written with one ``bulk_create``, one ``bulk_update``
+    and one delete. Rows that are no longer in ``desired``, including
+    duplicates of a key, are deleted.
+
+    Args:
+        model: The child model, with a ``company_name`` foreign key to ``Contact``.
+        contact_ids (list): Primary keys of the contacts in the chunk.
+        desired (dict): Field values keyed by ``(contact_id, row_key)``.
+        key: Callable returning the ``(contact_id, row_key)`` of an existing row.
+        fields (list): The fields held in ``desired``'s values.
+
+    Returns:
+        dict: Number of rows ``created``, ``updated`` and ``deleted``.
+    """
+    existing, stale = {}, []
+    for obj in model.objects.filter(company_name_id__in=contact_ids):
+        row_key = key(obj)
+        if row_key in desired and row_key not in existing:
+            existing[row_key] = obj
         else:
-            # Create new contact person
-            ContactPerson.objects.create(
-                company_name=contact_obj,
-                job_title=contact_person.get("JobTitle", ""),
-                first_name=contact_person.get("FirstName", ""),
-                last_name=contact_person.get("LastName", ""),
-                email=email,
-                phone=contact_person.get("PhoneNumber", ""),
-                primary_contact=contact_person.get("PrimaryContact", False),
-            )
+            stale.append(obj.pk)
+
+    to_create, to_update = [], []
+    for row_key, values in desired.items():
+        obj = existing.get(row_key)
+        if obj is None:
+            to_create.append(model(company_name_id=row_key[0], **values))
+        elif any(value_changed(getattr(obj, field), value) for field, value in values.items()):
+            for field, value in values.items():
+                setattr(obj, field, value)
+            to_update.append(obj)
+
+    model.objects.bulk_create(to_create)
+    model.objects.bulk_update(to_update, fields)
+    if stale:
+        model.objects.filter(pk__in=stale).delete()
+    return {"created": len(to_create), "updated": len(to_update), "deleted": len(stale)}
+
+
+def sync_contact_children(records: dict, contact_objs: dict) -> None:
+    """
+    Reconcile phones, addresses and contact persons for a chunk of contacts
+    with three reads and at most nine writes, whatever the chunk size.
+
+    Args:
+        records (dict): ``transform_contact`` results keyed by Xero ContactID.
+        contact_objs (dict): The ``Contact`` objects that were written, keyed
+            by Xero ContactID. Other records are left untouched.
+
+    Returns:
+        None
+    """
+    if not contact_objs:
+        return
+
+    contact_ids = [contact_obj.pk for contact_obj in contact_objs.values()]
+    phones, addresses, persons = {}, {}, {}
+    for xero_contact_id, contact_obj in contact_objs.items():
+        record = records[xero_contact_id]
+        contact_id = contact_obj.pk
+        phones.update(((contact_id, label), row) for label, row in record["phones"].items())
+        addresses.update(
+            ((contact_id, address_type), row) for address_type, row in record["addresses"].items()
+        )
+        persons.update(((contact_id, row_key), row) for row_key, row in record["persons"].items())
+
+    reconcile_children(
+        ContactPhoneNumber,
+        contact_ids,
+        phones,
+        key=lambda obj: (obj.company_name_id, obj.phone_label),
+        fields=["phone_number"],
+    )
+    reconcile_children(
+        ContactAddress,
+        contact_ids,
+        addresses,
+        key=lambda obj: (obj.company_name_id, obj.address_type),
+        fields=[
+            "address_line1", "address_line2", "address_line3", "address_line4",
+            "city", "region", "postal_code", "country",
+        ],
+    )
+    reconcile_children(
+        ContactPerson,
+        contact_ids,
+        persons,
+        key=lambda obj: (obj.company_name_id, person_key(obj.email, obj.first_name, obj.last_name)),
+        fields=["job_title", "first_name", "last_name", "email", "phone", "primary_contact"],
+    )
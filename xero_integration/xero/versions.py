@@ -0,0 +1,52 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import XeroTenant
+
+
+# Changes to any tenant's contacts also change this version, which the
+# endpoints that are not scoped to one tenant use.
+ALL_CONTACTS_VERSION_KEY = "xero:contacts:version:all"
+
+
+def contacts_version_key(tenant_pk) -> str:
+    return f"xero:contacts:version:{tenant_pk or 'none'}"
+
+
+def contacts_version(tenant_pk=None, all_tenants: bool = False) -> str:
+    """
+    The current version of a tenant's contacts, or of every tenant's
+    contacts. A version missing from the cache is replaced by a new one,
+    so losing the cache can only invalidate, never revive, a version.
+    """
+    key = ALL_CONTACTS_VERSION_KEY if all_tenants else contacts_version_key(tenant_pk)
+    return cache.get_or_set(key, lambda: uuid.uuid4().hex, timeout=None)
+
+
+def bump_contacts_version(*tenant_pks) -> None:
+    """
+    Give the tenants' contacts a new version once the current transaction
+    commits, so readers holding the old one refetch them.
+    """
+    def bump():
+        keys = [ALL_CONTACTS_VERSION_KEY, *{contacts_version_key(tenant_pk) for tenant_pk in tenant_pks}]
+        cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def tenant_pk_for(tenant_id: str):
+    """
+    The primary key of the tenant with Xero tenant ID ``tenant_id``, or None
+    if there is no such tenant. Cached once found, since neither ever
+    changes.
+    """
+    key = f"xero:tenant:pk:{tenant_id}"
+    tenant_pk = cache.get(key)
+    if tenant_pk is None:
+        tenant_pk = XeroTenant.objects.filter(tenant_id=tenant_id).values_list("pk", flat=True).first()
+        if tenant_pk is not None:
+            cache.set(key, tenant_pk, timeout=None)
+    return tenant_pk
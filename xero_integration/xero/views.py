@@ -1,34 +1,41 @@
 from functools import wraps
-from typing import Any
-from django.shortcuts import redirect
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
 from authlib.integrations.django_client import OAuth, DjangoOAuth2App
 from django.conf import settings
 from authlib.integrations.requests_client import OAuth2Session
-from xero_python.api_client import ApiClient, serialize
-from xero_python.api_client.configuration import Configuration
-from xero_python.identity import IdentityApi
-from xero_python.accounting import AccountingApi
-from commons.utils import CustomOAuth2Token
-from .tasks import sync_xero_contacts_task
-from django.core.cache import cache
+from .api import (
+    InvalidQuery,
+    contacts_etag,
+    contacts_queryset,
+    decode_cursor,
+    encode_cursor,
+    parse_fields,
+    parse_limit,
+    serialize_contact,
+)
+from .client import (
+    obtain_xero_oauth2_token,
+    store_authorized_token,
+)
+from .ledger import PHASE_FIELDS
+from .metrics import METRICS_ENABLED, metrics_registry
+from .models import Contact, SyncRun, XeroTenant
+from .tasks import push_xero_contacts_task, schedule_tenant_syncs_task, start_sync_run
+from .webhooks import enqueue_webhook_events, is_valid_webhook_signature
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
+from .versions import tenant_pk_for
+import json
 import logging
 
 
 logger = logging.getLogger(__name__)
 
-api_client = ApiClient(
-    Configuration(
-        debug=True,
-        oauth2_token=CustomOAuth2Token(
-            client_id=settings.CLIENT_ID,
-            client_secret=settings.CLIENT_SECRET,
-        ),
-    ),
-    pool_threads=1,
-)
-
-
 oauth = OAuth()
 
 oauth2_client = OAuth2Session(
@@ -59,38 +66,10 @@ oauth.register(
 
 xero: DjangoOAuth2App = oauth.xero
 
-@api_client.oauth2_token_getter
-def obtain_xero_oauth2_token():
-    token = cache.get("token")
-    logger.info("Cached token: %s", token)
-    if token:
-        return token["token"]
-    return None
-
-
-@api_client.oauth2_token_saver
-def store_xero_oauth2_token(token):
-    # oauth2_token = {
-    #     "id_token": token.get("id_token"),
-    #     "access_token": token.get("access_token"),
-    #     "refresh_token": token.get("refresh_token"),
-    #     "token_type": token.get("token_type"),
-    #     "expires_in": token.get("expires_in"),
-    #     "expires_at": token.get("expires_at"),
-    #     "scope": token.get("scope"),
-    # }
-    store_token = {
-        "token": token,
-        "modified": True
-    }
-    cache.set("token", store_token)
-    logger.info("Stored token: %s", store_token)
-
 def xero_token_required(function):
     @wraps(function)
     def decorator(*args, **kwargs):
         xero_token = obtain_xero_oauth2_token()
-        logger.info("Xero token required: %s", xero_token)
         if not xero_token:
             return redirect("authorize")
 
@@ -98,6 +77,27 @@ def xero_token_required(function):
 
     return decorator
 
+
+def read_api_access_required(function):
+    """
+    Allow requests carrying ``XERO_READ_API_KEY`` in an ``X-Api-Key`` header,
+    or from a logged in staff user. The key is checked first, so requests
+    with it never load a session or user.
+    """
+    @wraps(function)
+    def decorator(request, *args, **kwargs):
+        api_key = request.headers.get("X-Api-Key")
+        if api_key and settings.XERO_READ_API_KEY:
+            if not constant_time_compare(api_key, settings.XERO_READ_API_KEY):
+                return JsonResponse({"error": "Invalid API key"}, status=401)
+        elif not (request.user.is_authenticated and request.user.is_staff):
+            return JsonResponse({"error": "Authentication required"}, status=401)
+        response = function(request, *args, **kwargs)
+        patch_vary_headers(response, ["X-Api-Key", "Cookie"])
+        return response
+
+    return decorator
+
 def authorize(request):
     if not obtain_xero_oauth2_token():
         redirect_uri = "http://localhost:8000/xero/callback/"
@@ -113,55 +113,162 @@ def authorize(request):
 def callback(request):
     try:
         response = oauth.xero.authorize_access_token(request)
-        logger.info("Token response on callback: %s", response)
         if response is None or response.get("access_token") is None:
             return f"Access denied: {response}"
-        store_xero_oauth2_token(response)
+        store_authorized_token(response)
+        schedule_tenant_syncs_task.delay()
         return redirect("admin:index")
     except Exception as e:
         raise
 
-def get_xero_tenant_id():
-    token = obtain_xero_oauth2_token()
-    logger.info("Token: %s", token)
-    if not token:
-        return None
-
-    identity_api: IdentityApi = IdentityApi(api_client)
-    logger.info("Identity API: %s", identity_api.api_client)
-    for connection in identity_api.get_connections():
-        if connection.tenant_type == "ORGANISATION":
-            return connection.tenant_id
-
 @xero_token_required
 def sync_xero_contacts(request):
-    tenant_id = get_xero_tenant_id()
-    logger.info("Tenant ID: %s", tenant_id)
-    accounting_api = AccountingApi(api_client)
-    contacts = accounting_api.get_contacts(xero_tenant_id=tenant_id)
-    contacts = serialize(contacts)
-    sync_xero_contacts_task.apply_async(args=[contacts])
-    return redirect("admin:index")
+    """
+    Queue a contact sync of every connected organisation, or of the one
+    given as ``?tenant=<tenant ID>``, and return the job IDs straight away.
+    Pass ``?full=1`` to ignore the watermarks and re-download every contact.
+    """
+    full_sync = request.GET.get("full") in ("1", "true")
+    tenants = XeroTenant.objects.filter(is_active=True)
+    if request.GET.get("tenant"):
+        tenants = tenants.filter(tenant_id=request.GET["tenant"])
+    sync_runs = [start_sync_run(tenant, full_sync=full_sync) for tenant in tenants]
+    return JsonResponse(
+        {
+            "jobs": [
+                {
+                    "job_id": str(sync_run.pk),
+                    "tenant_id": sync_run.tenant_id,
+                    "status": sync_run.status,
+                    "status_url": reverse("sync_xero_contacts_status", args=[sync_run.pk]),
+                }
+                for sync_run in sync_runs
+            ]
+        },
+        status=202 if sync_runs else 404,
+    )
+
+
+@read_api_access_required
+def sync_xero_contacts_status(request, run_id):
+    sync_run = get_object_or_404(SyncRun, pk=run_id)
+    return JsonResponse(
+        {
+            "job_id": str(sync_run.pk),
+            "status": sync_run.status,
+            "tenant_id": sync_run.tenant_id,
+            "trigger": sync_run.trigger,
+            "full_sync": sync_run.full_sync,
+            "pages_total": sync_run.pages_total,
+            "pages_done": sync_run.pages_done,
+            "contacts_fetched": sync_run.contacts_fetched,
+            "contacts_created": sync_run.contacts_created,
+            "contacts_updated": sync_run.contacts_updated,
+            "contacts_skipped": sync_run.contacts_skipped,
+            "contacts_failed": sync_run.contacts_failed,
+            "failed_chunks": len(sync_run.failed_chunks),
+            "timings": {phase: getattr(sync_run, field) for phase, field in PHASE_FIELDS.items()},
+            "api_calls": sync_run.api_calls,
+            "db_queries": sync_run.db_queries,
+            "peak_rss_kb": sync_run.peak_rss_kb,
+            "error": sync_run.error,
+            "created_at": sync_run.created_at,
+            "started_at": sync_run.started_at,
+            "finished_at": sync_run.finished_at,
+        }
+    )
+
+def metrics(request):
+    """Expose Prometheus metrics, when enabled with XERO_METRICS_ENABLED."""
+    if not METRICS_ENABLED:
+        raise Http404
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    return HttpResponse(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
+
+@csrf_exempt
+@require_POST
+def xero_webhook(request):
+    """
+    Receive Xero webhook deliveries, including the intent-to-receive check.
+    Events are only queued here; fetching happens in Celery.
+    """
+    if not is_valid_webhook_signature(request.body, request.headers.get("x-xero-signature", "")):
+        return HttpResponse(status=401)
+    payload = json.loads(request.body or b"{}")
+    enqueue_webhook_events(payload.get("events", []))
+    return HttpResponse(status=200)
 
 @xero_token_required
 def create_contacts(request):
-    tenant_id = get_xero_tenant_id()
-    contact_data: list[dict[str, Any]] = []
-    contact_data.append({
-        "contact_id": "1234567890",
-        "name": "John Doe",
-        "email_address": "john.doe@example.com",
-        "is_supplier": True,
-        "is_customer": False,
-    })
-    accounting_api = AccountingApi(api_client)
+    """Queue a push of every contact not yet linked to Xero."""
+    push_xero_contacts_task.apply_async()
+    return redirect("admin:index")
+
+
+@read_api_access_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=contacts_etag)
+def contacts_list(request):
+    """
+    List synced contacts, ordered by ID, a page at a time.
+
+    Query parameters:
+        tenant: Only list the contacts of this Xero tenant ID.
+        fields: Comma separated fields to return, all by default.
+        limit: Contacts per page, ``XERO_READ_API_PAGE_SIZE`` by default.
+        cursor: The ``next_cursor`` of the previous page.
+
+    Pages are found by seeking past the cursor's contact ID on the
+    ``(tenant, id)`` index, so every page costs the same however deep it
+    is, and the related rows are loaded with one query per relation.
+    Unchanged pages are answered with 304 from their ETag alone.
+    """
     try:
-        result = accounting_api.create_contacts(
-            xero_tenant_id=tenant_id,
-            contacts=contact_data,
-            summarize_errors=False
-        )
-        logger.info("Result: %s", result)
-    except Exception as e:
-        logger.error("Error: %s", e)
-    return redirect("admin:index")
\ No newline at end of file
+        fields = parse_fields(request.GET.get("fields"))
+        limit = parse_limit(request.GET.get("limit"))
+        cursor = request.GET.get("cursor")
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidQuery as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    contacts = contacts_queryset(fields).order_by("id")
+    tenant_id = request.GET.get("tenant")
+    if tenant_id:
+        tenant_pk = tenant_pk_for(tenant_id)
+        if tenant_pk is None:
+            return JsonResponse({"error": f"Unknown tenant {tenant_id}"}, status=404)
+        contacts = contacts.filter(tenant_id=tenant_pk)
+    if after:
+        contacts = contacts.filter(id__gt=after)
+
+    page = list(contacts[: limit + 1])
+    next_cursor = encode_cursor(page[limit - 1].id) if len(page) > limit else None
+    return JsonResponse(
+        {
+            "results": [serialize_contact(contact, fields) for contact in page[:limit]],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+def contact_etag(request, contact_id):
+    return contacts_etag(request, contact_id=contact_id)
+
+
+@read_api_access_required
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=contact_etag)
+def contact_detail(request, contact_id):
+    """Return one synced contact. Takes the same ``fields`` as the list."""
+    try:
+        fields = parse_fields(request.GET.get("fields"))
+    except InvalidQuery as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    try:
+        contact = contacts_queryset(fields).get(pk=contact_id)
+    except Contact.DoesNotExist:
+        return JsonResponse({"error": "Contact not found"}, status=404)
+    return JsonResponse(serialize_contact(contact, fields))
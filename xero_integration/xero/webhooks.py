@@ -0,0 +1,41 @@
+import base64
+import hashlib
+import hmac
+from collections import defaultdict
+
+from django.conf import settings
+
+from .queues import push_ids, schedule_once, webhook_contacts_queue_key, webhook_contacts_scheduled_key
+from .tasks import process_contact_webhook_events
+
+
+def is_valid_webhook_signature(body: bytes, signature: str) -> bool:
+    """
+    Check the ``x-xero-signature`` header, a base64 HMAC-SHA256 of the raw
+    request body keyed with the webhook key, in constant time.
+    """
+    if not settings.WEBHOOK_KEY or not signature:
+        return False
+    digest = hmac.new(settings.WEBHOOK_KEY.encode(), body, hashlib.sha256).digest()
+    return hmac.compare_digest(base64.b64encode(digest), signature.encode())
+
+
+def enqueue_webhook_events(events: list[dict]) -> None:
+    """
+    Queue the ContactIDs from a webhook delivery and schedule one debounced
+    fetch per tenant. Only touches Redis, so it is safe to call inside
+    Xero's 5 second response window.
+    """
+    contact_ids = defaultdict(set)
+    for event in events:
+        if event.get("eventCategory") == "CONTACT" and event.get("resourceId"):
+            contact_ids[event["tenantId"]].add(event["resourceId"])
+
+    for tenant_id, ids in contact_ids.items():
+        push_ids(webhook_contacts_queue_key(tenant_id), ids)
+        schedule_once(
+            webhook_contacts_scheduled_key(tenant_id),
+            process_contact_webhook_events,
+            args=[tenant_id],
+            countdown=settings.XERO_WEBHOOK_DEBOUNCE,
+        )